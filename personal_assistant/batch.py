@@ -0,0 +1,208 @@
+"""Пакетный режим: команды JSON-строками на входе, результаты JSON-строками на выходе.
+
+    python personal_assistant.py --batch commands.jsonl > results.jsonl
+    python batch.py - < commands.jsonl
+
+Команда: {"id": 1, "manager": "tasks", "op": "create", "args": {"title": "..."}}.
+manager - notes, tasks, contacts или finance; op - create, update, delete, get,
+query или changes (у finance ещё report и analytics). Ответ: {"id": 1, "ok": true, "result": ...}
+или {"id": 1, "ok": false, "error": "..."}. Данные загружаются один раз, а
+изменения сохраняются группами по group_size команд.
+"""
+import contextlib
+import json
+import sys
+from itertools import islice
+
+from task_query import due_day
+
+GROUP_SIZE = 1000
+# имя в командах -> (имя менеджера в get_manager, атрибут со словарём записей)
+MANAGERS = {
+    'notes': ('manager', 'notes'),
+    'tasks': ('task', 'tasks'),
+    'contacts': ('contact', 'contacts'),
+    'finance': ('finance', 'records'),
+}
+
+
+def day_arg(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    day = due_day(value)
+    if day is None:
+        raise ValueError(f'Неверный формат даты в {name}: {value}')
+    return day
+
+
+def page(records, args):
+    """Срез limit/offset без копирования всей коллекции."""
+    offset = args.get('offset', 0)
+    limit = args.get('limit')
+    return list(islice(records, offset, None if limit is None else offset + limit))
+
+
+def query_notes(manager, args):
+    text = args.get('text')
+    if text:
+        offset = args.get('offset', 0)
+        return manager.search_notes(text, offset + args.get('limit', 20))[offset:]
+    return page(manager.notes.values(), args)
+
+
+def query_tasks(manager, args):
+    return manager.query(args.get('done'), args.get('priority'), day_arg(args, 'due_from'), day_arg(args, 'due_to'),
+                         args.get('sort', True), args.get('limit'), args.get('offset', 0))
+
+
+def query_contacts(manager, args):
+    return manager.find_contacts(args.get('text', ''), args.get('page', 1), args.get('per_page', 20))
+
+
+def query_finance(manager, args):
+    return page(manager.filter_records(args.get('date'), args.get('category')), args)
+
+
+def report_finance(manager, args):
+    return manager.ledger.report(day_arg(args, 'start'), day_arg(args, 'end'))
+
+
+def analytics_finance(manager, args):
+    """args: kind - series, deltas, rolling, pivot или dashboard, остальное - параметры метода."""
+    args = dict(args)
+    kind = args.pop('kind', 'dashboard')
+    if kind not in ('series', 'deltas', 'rolling', 'pivot', 'dashboard'):
+        raise ValueError(f'Неизвестный вид аналитики {kind}')
+    # аналитика считается по сохранённым данным, поэтому группа сначала записывается
+    if manager.storage.before_query is not None:
+        manager.storage.before_query()
+    return getattr(manager.analytics, kind)(**args)
+
+
+def query_changes(manager, args):
+    """Изменения после номера since в ленте epoch; changes = None - история неполная или
+    лента началась заново после перезапуска, нужно перечитать всё."""
+    # накопленные в группе изменения сначала записываются, чтобы попасть в ленту
+    if manager.storage.before_query is not None:
+        manager.storage.before_query()
+    changes = manager.changes.changes_since(args.get('since', 0), args.get('epoch'))
+    return {'seq': manager.changes.seq, 'epoch': manager.changes.epoch,
+            'changes': None if changes is None else [change._asdict() for change in changes]}
+
+
+QUERIES = {
+    'notes': query_notes,
+    'tasks': query_tasks,
+    'contacts': query_contacts,
+    'finance': query_finance,
+}
+
+
+def to_json(result):
+    if hasattr(result, 'to_dict'):
+        return result.to_dict()
+    if isinstance(result, list):
+        return [to_json(item) for item in result]
+    return result
+
+
+def execute(manager, records, kind, op, args):
+    """Выполняет одну команду над менеджером; ошибки - исключениями."""
+    if op == 'create':
+        return manager.create(**args)
+    if op in ('update', 'delete', 'get'):
+        args = dict(args)
+        record_id = args.pop('id', None)
+        if record_id is None:
+            raise ValueError('Не указан id')
+        if op == 'update':
+            result = manager.update(record_id, **args)
+        elif op == 'delete':
+            result = manager.delete(record_id)
+        else:
+            result = records.get(record_id)
+        if not result:
+            raise KeyError(f'Запись {record_id} не найдена')
+        return result
+    if op == 'query':
+        return QUERIES[kind](manager, args)
+    if op == 'changes':
+        return query_changes(manager, args)
+    if op == 'report' and kind == 'finance':
+        return report_finance(manager, args)
+    if op == 'analytics' and kind == 'finance':
+        return analytics_finance(manager, args)
+    raise ValueError(f'Неизвестная операция {op}')
+
+
+def run_command(line, number, get_manager, groups):
+    """Одна строка команды -> ответ. Первая команда менеджера открывает его группу сохранения."""
+    command_id = number
+    try:
+        command = json.loads(line)
+        command_id = command.get('id', number)
+        kind = command['manager']
+        if kind not in MANAGERS:
+            raise ValueError(f'Неизвестный менеджер {kind}')
+        name, attribute = MANAGERS[kind]
+        manager = get_manager(name)
+        if kind not in groups:
+            groups[kind] = manager.batch().__enter__()
+        result = execute(manager, getattr(manager, attribute), kind, command.get('op'), command.get('args') or {})
+        return {'id': command_id, 'ok': True, 'result': to_json(result)}
+    except Exception as e:
+        message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+        return {'id': command_id, 'ok': False, 'error': message or type(e).__name__}
+
+
+def close_groups(groups):
+    for group in groups.values():
+        group.__exit__(None, None, None)
+    groups.clear()
+
+
+def run_batch(lines, output, get_manager, group_size=GROUP_SIZE):
+    """Выполняет команды из lines и пишет ответы в output; возвращает число ошибок.
+
+    Сообщения менеджеров (print) уходят в stderr, чтобы не смешиваться с ответами.
+    """
+    errors = 0
+    groups = {}
+    used = set()
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                response = run_command(line, number, get_manager, groups)
+                errors += not response['ok']
+                used.update(groups)
+                output.write(json.dumps(response, ensure_ascii=False) + '\n')
+                if number % group_size == 0:
+                    close_groups(groups)
+        finally:
+            close_groups(groups)
+            if 'notes' in used:
+                get_manager('manager').save_search_index()
+            output.flush()
+    return errors
+
+
+def main(argv=None, get_manager=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if get_manager is None:
+        from personal_assistant import get_manager
+
+    path = argv[0] if argv else '-'
+    lines = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        errors = run_batch(lines, sys.stdout, get_manager)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Пакетное вычисление формулы калькулятора: векторный проход против цикла по строкам.
+
+    python benchmarks/calculator_batch.py [--size 1000000] [--formula 'amount * (1 + rate) / fx']
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from expression import compile_expression  # noqa: E402
+
+
+def per_row(expression, amounts, rate, fx):
+    values = []
+    errors = []
+    for amount, fx_value in zip(amounts.tolist(), fx.tolist()):
+        try:
+            values.append(expression(amount=amount, rate=rate, fx=fx_value))
+            errors.append(False)
+        except (ArithmeticError, ValueError):
+            values.append(float('nan'))
+            errors.append(True)
+    return np.array(values), np.array(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--formula', default='amount * (1 + rate) / fx')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(-5000, 5000, args.size).round(2)
+    # каждый тысячный курс нулевой, чтобы проверить маску ошибок
+    fx = rng.uniform(50, 120, args.size)
+    fx[::1000] = 0
+    expression = compile_expression(args.formula)
+
+    started = time.perf_counter()
+    vector_values, vector_errors = expression.evaluate_array(amount=amounts, rate=0.2, fx=fx)
+    vector_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    row_values, row_errors = per_row(expression, amounts, 0.2, fx)
+    row_time = time.perf_counter() - started
+
+    assert (vector_errors == row_errors).all()
+    assert np.allclose(vector_values[~vector_errors], row_values[~row_errors])
+    print(f'элементов: {args.size}, ошибок: {int(vector_errors.sum())}')
+    print(f'векторно: {vector_time * 1000:9.1f} мс')
+    print(f'по строкам: {row_time * 1000:9.1f} мс ({row_time / vector_time:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
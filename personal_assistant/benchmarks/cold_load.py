@@ -0,0 +1,94 @@
+"""Холодная загрузка большого файла задач в разных форматах хранения.
+
+Для каждого формата меряются разбор файла (строки или колонки) и создание
+TaskManager целиком, каждый замер - в отдельном процессе.
+
+    python benchmarks/cold_load.py [--size 1000000]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
+
+from serialization import JsonCodec, OrjsonCodec  # noqa: E402
+from storage import SnapshotStorage  # noqa: E402
+
+PRIORITIES = ('Высокий', 'Средний', 'Низкий')
+
+# формат -> (PA_STORAGE, PA_CODEC, данные JSON-файла или None для снимка)
+FORMATS = {
+    'json, отступы': ('json', 'json', lambda rows: json.dumps(rows, indent=4).encode('utf-8')),
+    'json, компактно': ('json', 'json', lambda rows: JsonCodec().dumps(rows)),
+    'orjson': ('json', 'orjson', lambda rows: OrjsonCodec().dumps(rows)),
+    'снимок': ('snapshot', 'auto', None),
+}
+
+TIMER = '''
+import time, contextlib, io
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    from storage import make_storage
+    storage = make_storage('tasks.json', {storage!r})
+    {parse}
+parsed = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    from personal_assistant import TaskManager
+    TaskManager('tasks.json', storage)
+print(parsed - started, time.perf_counter() - parsed)
+'''
+PARSE = {
+    'json': 'storage.read()',
+    'snapshot': ("from serialization import Snapshot\n"
+                 "    with Snapshot('tasks.json.snap') as snapshot:\n"
+                 "        [snapshot.column(name) for name in snapshot.fields]"),
+}
+
+
+def make_rows(size):
+    rng = random.Random(0)
+    return [{'id': i, 'title': f'Задача номер {i}', 'description': 'позвонить и уточнить детали' if i % 3 else '',
+             'done': i % 4 == 0, 'priority': PRIORITIES[i % 3],
+             'due_date': f'{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(2023, 2026)}'
+             if i % 5 else None}
+            for i in range(1, size + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    args = parser.parse_args()
+    rows = make_rows(args.size)
+    print(f'задач: {args.size}')
+    baseline = None
+    for name, (storage, codec, dump) in FORMATS.items():
+        data_dir = tempfile.mkdtemp(prefix='pa_cold_')
+        try:
+            path = os.path.join(data_dir, 'tasks.json')
+            if dump is None:
+                SnapshotStorage(path).save(rows)
+            else:
+                with open(path, 'wb') as file:
+                    file.write(dump(rows))
+            size = sum(os.path.getsize(os.path.join(data_dir, file)) for file in os.listdir(data_dir)
+                       if file.endswith(('.json', '.snap')))
+            code = TIMER.format(storage=storage, parse=PARSE[storage])
+            env = dict(os.environ, PYTHONPATH=PACKAGE_DIR, PA_STORAGE=storage, PA_CODEC=codec)
+            result = subprocess.run([sys.executable, '-c', code], cwd=data_dir, env=env,
+                                    capture_output=True, text=True, check=True)
+            parse, manager = map(float, result.stdout.split())
+            baseline = baseline or (parse, manager)
+            print(f'{name:>16}: файл {size / 2 ** 20:6.1f} МБ, разбор {parse:6.2f} с '
+                  f'({baseline[0] / parse:4.1f}x), TaskManager {manager:6.2f} с ({baseline[1] / manager:4.1f}x)')
+        finally:
+            shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Несколько процессов одновременно добавляют задачи в общий файл.
+
+Проверяет, что ни одно изменение не потеряно и id не повторяются, и печатает
+пропускную способность для каждого числа процессов.
+
+    python benchmarks/contention.py [--storage json|journal|sqlite] [--processes 1 2 4 8] [--ops 200]
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(data_dir, storage_mode, worker_id, ops, start):
+    sys.path.insert(0, PACKAGE_DIR)
+    os.environ['PA_STORAGE'] = storage_mode
+    os.chdir(data_dir)
+    from personal_assistant import TaskManager
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = TaskManager('tasks.json')
+        start.wait()
+        for op in range(ops):
+            answers = iter([f'задача {worker_id}-{op}', '', 'Средний', ''])
+            builtins.input = lambda prompt='': next(answers)
+            manager.add_task()
+
+
+def run(storage_mode, processes, ops):
+    data_dir = tempfile.mkdtemp(prefix='pa_contention_')
+    try:
+        with open(os.path.join(data_dir, 'tasks.json'), 'w', encoding='utf-8') as file:
+            json.dump([], file)
+        start = multiprocessing.Event()
+        workers = [multiprocessing.Process(target=worker, args=(data_dir, storage_mode, n, ops, start))
+                   for n in range(processes)]
+        for process in workers:
+            process.start()
+        # даём процессам загрузиться, чтобы мерить только запись
+        time.sleep(1)
+        started = time.perf_counter()
+        start.set()
+        for process in workers:
+            process.join()
+        seconds = time.perf_counter() - started
+
+        sys.path.insert(0, PACKAGE_DIR)
+        os.environ['PA_STORAGE'] = storage_mode
+        from storage import make_storage
+        rows = make_storage(os.path.join(data_dir, 'tasks.json'), storage_mode, 'tasks').load()
+        ids = [row['id'] for row in rows]
+        titles = {row['title'] for row in rows}
+        expected = processes * ops
+        lost = expected - len(titles)
+        duplicates = len(ids) - len(set(ids))
+        print(f'{storage_mode:>8} {processes:>3} проц.: {expected / seconds:8.0f} оп/с, '
+              f'потеряно {lost}, повторных id {duplicates}')
+    finally:
+        shutil.rmtree(data_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--storage', default='json', choices=('json', 'journal', 'sqlite'))
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--ops', type=int, default=200, help='добавлений на процесс')
+    args = parser.parse_args()
+    for processes in args.processes:
+        run(args.storage, processes, args.ops)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Синтетические данные для замеров: заметки, задачи, контакты и финансы.
+
+Данные детерминированы: одинаковые seed и size дают одинаковые файлы. Текст
+русский, категории и приоритеты распределены неравномерно, даты - за
+несколько лет с перекосом к последним месяцам. Файлы пишутся потоком, так что
+10 млн записей не требуют держать их все в памяти.
+
+    python benchmarks/datagen.py --out КАТАЛОГ [--size 100000] [--kinds notes tasks contacts finance] [--csv]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+
+WORDS = (
+    'проект отчёт встреча бюджет клиент договор задача план неделя месяц квартал звонок письмо '
+    'документ презентация сервер релиз тест ошибка исправление обзор идея список покупка молоко '
+    'хлеб врач запись оплата счёт налог ремонт квартира машина страховка отпуск билет гостиница '
+    'поезд самолёт подарок день рождения семья дети школа курс книга статья лекция экзамен '
+    'спорт зал бег тренировка команда совещание дедлайн приоритет черновик согласование подпись '
+    'банк кредит вклад перевод зарплата премия аренда коммунальные интернет телефон ноутбук'
+).split()
+MALE_NAMES = ('Александр', 'Дмитрий', 'Сергей', 'Андрей', 'Алексей', 'Иван', 'Михаил', 'Никита', 'Павел',
+              'Артём', 'Владимир', 'Максим', 'Егор')
+FEMALE_NAMES = ('Мария', 'Анна', 'Елена', 'Ольга', 'Наталья', 'Татьяна', 'Екатерина', 'Ирина', 'Светлана',
+                'Юлия', 'Ксения', 'Дарья', 'Полина')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+              'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов', 'Егоров',
+              'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин')
+TRANSLIT = dict(zip('абвгдеёжзийклмнопрстуфхцчшщъыьэюя',
+                    ['a', 'b', 'v', 'g', 'd', 'e', 'e', 'zh', 'z', 'i', 'y', 'k', 'l', 'm', 'n', 'o', 'p',
+                     'r', 's', 't', 'u', 'f', 'kh', 'ts', 'ch', 'sh', 'sch', '', 'y', '', 'e', 'yu', 'ya']))
+DOMAINS = ('mail.ru', 'yandex.ru', 'gmail.com', 'inbox.ru', 'example.org')
+PRIORITIES = (('Высокий', 2), ('Средний', 5), ('Низкий', 3))
+# (категория, вес, минимальная и максимальная сумма); доходы положительные
+CATEGORIES = (
+    ('Продукты', 30, -6000, -150), ('Транспорт', 15, -1500, -40), ('Кафе', 12, -3500, -200),
+    ('Жильё', 4, -60000, -15000), ('Связь', 3, -1200, -300), ('Здоровье', 5, -8000, -300),
+    ('Развлечения', 8, -7000, -300), ('Одежда', 5, -15000, -800), ('Подарки', 3, -10000, -500),
+    ('Зарплата', 4, 40000, 250000), ('Подработка', 2, 3000, 40000), ('Кэшбэк', 2, 50, 3000),
+)
+PRIORITY_NAMES = [name for name, weight in PRIORITIES]
+PRIORITY_WEIGHTS = list(accumulate(weight for name, weight in PRIORITIES))
+CATEGORY_WEIGHTS = list(accumulate(weight for name, weight, low, high in CATEGORIES))
+START = date(2021, 1, 1)
+END = date(2025, 12, 31)
+KINDS = ('notes', 'tasks', 'contacts', 'finance')
+FIELDS = {
+    'notes': ('id', 'title', 'content', 'timestamp'),
+    'tasks': ('id', 'title', 'description', 'done', 'priority', 'due_date'),
+    'contacts': ('id', 'name', 'phone', 'email'),
+    'finance': ('id', 'amount', 'category', 'date', 'description'),
+}
+FILES = {'notes': 'notes.json', 'tasks': 'tasks.json', 'contacts': 'contacts.json', 'finance': 'finance.json'}
+
+
+def words(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def recent_day(rng):
+    """День между START и END; последние месяцы встречаются чаще (треугольное распределение)."""
+    span = (END - START).days
+    return START + timedelta(days=int(rng.triangular(0, span, span)))
+
+
+def day_str(day):
+    return f'{day.day:02d}-{day.month:02d}-{day.year:04d}'
+
+
+def note(rng, record_id):
+    return {'id': record_id, 'title': words(rng, 2, 5).capitalize(), 'content': words(rng, 8, 40),
+            'timestamp': f'{day_str(recent_day(rng))} {rng.randrange(24):02d}:{rng.randrange(60):02d}:'
+                         f'{rng.randrange(60):02d}'}
+
+
+def task(rng, record_id):
+    due = recent_day(rng) + timedelta(days=rng.randint(-30, 90)) if rng.random() < 0.8 else None
+    return {'id': record_id, 'title': words(rng, 2, 6).capitalize(),
+            'description': words(rng, 0, 15), 'done': rng.random() < 0.35,
+            'priority': rng.choices(PRIORITY_NAMES, cum_weights=PRIORITY_WEIGHTS)[0],
+            'due_date': due and day_str(due)}
+
+
+def contact(rng, record_id):
+    last = rng.choice(LAST_NAMES)
+    if rng.random() < 0.5:
+        first = rng.choice(MALE_NAMES)
+    else:
+        first = rng.choice(FEMALE_NAMES)
+        last += 'а'
+    login = ''.join(TRANSLIT.get(char, char) for char in f'{first}.{last}'.lower())
+    return {'id': record_id, 'name': f'{first} {last}',
+            'phone': f'+7 9{rng.randrange(100):02d} {rng.randrange(1000):03d}-{rng.randrange(100):02d}-'
+                     f'{rng.randrange(100):02d}' if rng.random() < 0.9 else None,
+            'email': f'{login}{rng.randrange(1000)}@{rng.choice(DOMAINS)}' if rng.random() < 0.7 else None}
+
+
+def finance(rng, record_id):
+    name, weight, low, high = rng.choices(CATEGORIES, cum_weights=CATEGORY_WEIGHTS)[0]
+    return {'id': record_id, 'amount': round(rng.uniform(low, high), 2), 'category': name,
+            'date': day_str(recent_day(rng)), 'description': words(rng, 0, 4)}
+
+
+MAKERS = {'notes': note, 'tasks': task, 'contacts': contact, 'finance': finance}
+
+
+def generate(kind, size, seed=0):
+    """Записи вида kind словарями, с id от 1 до size."""
+    # своя последовательность у каждого вида: число задач не меняет заметки
+    rng = random.Random(f'{seed}:{kind}')
+    make = MAKERS[kind]
+    for record_id in range(1, size + 1):
+        yield make(rng, record_id)
+
+
+def write_json(path, rows, chunk=10000):
+    """JSON-массив потоком, компактно (как serialization.JsonCodec для больших файлов)."""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[')
+        first = True
+        batch = []
+        for row in rows:
+            batch.append(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+            if len(batch) == chunk:
+                file.write(('' if first else ',') + ','.join(batch))
+                first = False
+                batch = []
+        if batch:
+            file.write(('' if first else ',') + ','.join(batch))
+        file.write(']')
+
+
+def write_csv(path, kind, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS[kind])
+        writer.writerows([row[name] for name in FIELDS[kind]] for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--out', required=True, help='каталог для файлов данных')
+    parser.add_argument('--size', type=int, default=100_000, help='записей каждого вида (до 10 млн)')
+    parser.add_argument('--kinds', nargs='+', default=list(KINDS), choices=KINDS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', action='store_true', help='ещё и CSV-файлы для импорта')
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    for kind in args.kinds:
+        write_json(os.path.join(args.out, FILES[kind]), generate(kind, args.size, args.seed))
+        if args.csv:
+            write_csv(os.path.join(args.out, f'{kind}.csv'), kind, generate(kind, args.size, args.seed))
+        print(f'{kind}: {args.size} записей')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Нагрузочный тест HTTP API (server.py): несколько keep-alive соединений, запросы конвейером.
+
+Поднимает сервер в отдельном процессе на временном каталоге данных, если не
+указан --url готового сервера.
+
+    python benchmarks/http_load.py [--connections 16] [--requests 20000] [--pipeline 8] [--writes 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_request(rng, writes):
+    if rng.random() < writes:
+        body = json.dumps({'title': f'задача {rng.randrange(10 ** 6)}', 'priority': 'Средний'},
+                          ensure_ascii=False).encode('utf-8')
+        head = f'POST /tasks HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+        return head.encode('latin-1') + body
+    target = rng.choice(['/tasks?done=false&limit=10', '/tasks/1', '/notes?limit=5', '/contacts?text=a'])
+    return f'GET {target} HTTP/1.1\r\nHost: x\r\n\r\n'.encode('latin-1')
+
+
+async def read_response(reader):
+    length = 0
+    status = int((await reader.readline()).split()[1])
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, count, pipeline, writes, seed, latencies, statuses):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    done = 0
+    while done < count:
+        depth = min(pipeline, count - done)
+        started = time.perf_counter()
+        writer.write(b''.join(make_request(rng, writes) for _ in range(depth)))
+        await writer.drain()
+        for _ in range(depth):
+            status = await read_response(reader)
+            statuses[status] = statuses.get(status, 0) + 1
+        latencies.append((time.perf_counter() - started) / depth)
+        done += depth
+    writer.close()
+
+
+async def run(host, port, args):
+    latencies = []
+    statuses = {}
+    per_connection = args.requests // args.connections
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, per_connection, args.pipeline, args.writes, n, latencies, statuses)
+                           for n in range(args.connections)))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    total = per_connection * args.connections
+    print(f'запросов: {total}, соединений: {args.connections}, конвейер: {args.pipeline}, '
+          f'доля записей: {args.writes}')
+    print(f'{total / seconds:8.0f} запросов/с, статусы: {statuses}')
+    print(f'задержка на запрос: p50 {latencies[len(latencies) // 2] * 1000:.2f} мс, '
+          f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} мс')
+
+
+def wait_for_port(host, port, timeout=10):
+    import socket
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('сервер не запустился')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', help='адрес уже запущенного сервера, например http://127.0.0.1:8765')
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--pipeline', type=int, default=1, help='запросов в полёте на соединение')
+    parser.add_argument('--writes', type=float, default=0.2, help='доля POST-запросов')
+    parser.add_argument('--port', type=int, default=8799)
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        asyncio.run(run(url.hostname, url.port, args))
+        return
+    data_dir = tempfile.mkdtemp(prefix='pa_http_')
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+    server = subprocess.Popen([sys.executable, os.path.join(PACKAGE_DIR, 'server.py'), '--port', str(args.port)],
+                              cwd=data_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port('127.0.0.1', args.port)
+        asyncio.run(run('127.0.0.1', args.port, args))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
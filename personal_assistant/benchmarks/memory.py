@@ -0,0 +1,119 @@
+"""Память, занятая загруженными записями: прежние классы со словарём атрибутов
+против компактных (__slots__, общие строки приоритетов и категорий, даты числами).
+
+Записи создаются из JSON кусками, как при загрузке файла, а tracemalloc
+считает только то, что остаётся после разбора.
+
+    python benchmarks/memory.py [--size 1000000] [--kinds tasks notes finance]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from personal_assistant import FinanceRecord, Note, Task  # noqa: E402
+
+CHUNK = 10000
+PRIORITIES = ('Высокий', 'Средний', 'Низкий')
+CATEGORIES = ('Еда', 'Транспорт', 'Жильё', 'Развлечения', 'Зарплата', 'Здоровье')
+
+
+class LegacyNote:
+    def __init__(self, id, title, content, timestamp=None):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.timestamp = timestamp
+
+
+class LegacyTask:
+    def __init__(self, id, title, description="", done=False, priority="Средний", due_date=None):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.done = done
+        self.priority = priority
+        self.due_date = due_date
+
+
+class LegacyFinanceRecord:
+    def __init__(self, id, amount, category, date, description=""):
+        self.id = id
+        self.amount = amount
+        self.category = category
+        self.date = date
+        self.description = description
+
+
+def day(rng):
+    return f'{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(2020, 2025)}'
+
+
+def rows(kind, size):
+    """Куски JSON-текста с записями данного вида; данные одинаковы при каждом вызове."""
+    rng = random.Random(0)
+    for start in range(0, size, CHUNK):
+        chunk = []
+        for i in range(start, min(start + CHUNK, size)):
+            if kind == 'tasks':
+                chunk.append({'id': i, 'title': f'задача {i}', 'description': '', 'done': i % 4 == 0,
+                              'priority': PRIORITIES[i % 3], 'due_date': day(rng) if i % 5 else None})
+            elif kind == 'notes':
+                chunk.append({'id': i, 'title': f'заметка {i}', 'content': f'текст {i}',
+                              'timestamp': f'{day(rng)} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00'})
+            else:
+                chunk.append({'id': i, 'amount': round(rng.uniform(-5000, 5000), 2),
+                              'category': CATEGORIES[i % len(CATEGORIES)], 'date': day(rng), 'description': ''})
+        yield json.dumps(chunk, ensure_ascii=False)
+
+
+def build(record_type, chunks):
+    records = []
+    for text in chunks:
+        records.extend(record_type(**row) for row in json.loads(text))
+    return records
+
+
+def measure(record_type, chunks):
+    """(байт после загрузки, секунд на загрузку); время меряется без tracemalloc, он сильно замедляет."""
+    started = time.perf_counter()
+    records = build(record_type, chunks)
+    seconds = time.perf_counter() - started
+    del records
+    gc.collect()
+    tracemalloc.start()
+    records = build(record_type, chunks)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return used, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--kinds', nargs='+', default=['tasks', 'notes', 'finance'],
+                        choices=('tasks', 'notes', 'finance'))
+    args = parser.parse_args()
+    classes = {'tasks': (LegacyTask, Task), 'notes': (LegacyNote, Note),
+               'finance': (LegacyFinanceRecord, FinanceRecord)}
+    print(f'записей: {args.size}')
+    for kind in args.kinds:
+        legacy, compact = classes[kind]
+        chunks = list(rows(kind, args.size))
+        before, before_time = measure(legacy, chunks)
+        after, after_time = measure(compact, chunks)
+        print(f'{kind:>8}: было {before / 2 ** 20:7.1f} МБ ({before / args.size:5.0f} Б/зап., {before_time:.2f} с), '
+              f'стало {after / 2 ** 20:7.1f} МБ ({after / args.size:5.0f} Б/зап., {after_time:.2f} с), '
+              f'экономия {1 - after / before:.0%}')
+
+
+if __name__ == '__main__':
+    main()
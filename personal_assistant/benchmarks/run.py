@@ -0,0 +1,246 @@
+"""Набор замеров для всех менеджеров на синтетических данных (datagen.py).
+
+Сценарии: load (создание менеджера с чтением файла), insert (добавления одной
+группой сохранения), lookup (поиск), filter (выборки), report (финансовые
+отчёты), save (полная перезапись файла), import и export (CSV). Результаты
+пишутся в JSON, а --compare сравнивает их с прошлым запуском.
+
+    python benchmarks/run.py [--size 100000] [--storage json] [--output results.json]
+    python benchmarks/run.py --size 100000 --compare baseline.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
+
+import datagen  # noqa: E402
+from storage import make_storage  # noqa: E402
+
+# сравнение с прошлым запуском: медленнее на столько - регрессия
+REGRESSION = 0.10
+SCENARIOS = ('load', 'lookup', 'filter', 'report', 'insert', 'save', 'export', 'import')
+MANAGER_NAMES = {'notes': 'NoteManager', 'tasks': 'TaskManager', 'contacts': 'ContactManager',
+                 'finance': 'FinanceManager'}
+
+
+def timed(function, ops=1):
+    gc.collect()
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+    return seconds, ops
+
+
+def random_day(rng):
+    return datagen.START + timedelta(days=rng.randrange((datagen.END - datagen.START).days))
+
+
+def scenario_load(pa, kind, path):
+    holder = {}
+
+    def load():
+        holder['manager'] = getattr(pa, MANAGER_NAMES[kind])(path)
+    result = timed(load)
+    return result, holder['manager']
+
+
+def scenario_insert(manager, kind, ops, rng):
+    makers = {
+        'notes': lambda i: manager.create(f'Новая заметка {i}', datagen.words(rng, 5, 20)),
+        'tasks': lambda i: manager.create(f'Новая задача {i}', datagen.words(rng, 0, 10), 'Средний',
+                                          datagen.day_str(random_day(rng))),
+        'contacts': lambda i: manager.create(f'Контакт {i}', f'+7 900 000-{i // 100 % 100:02d}-{i % 100:02d}'),
+        'finance': lambda i: manager.create(-round(rng.uniform(100, 5000), 2), 'Продукты',
+                                            datagen.day_str(random_day(rng))),
+    }
+    make = makers[kind]
+
+    def insert():
+        with manager.batch():
+            for i in range(ops):
+                make(i)
+    return timed(insert, ops)
+
+
+def scenario_lookup(manager, kind, ops, rng):
+    if kind == 'notes':
+        queries = [' '.join(rng.sample(datagen.WORDS, 2)) for _ in range(ops)]
+        return timed(lambda: [manager.search_notes(query) for query in queries], ops)
+    if kind == 'contacts':
+        queries = [rng.choice(datagen.LAST_NAMES)[:5] for _ in range(ops)]
+        return timed(lambda: [manager.find_contacts(query) for query in queries], ops)
+    records = manager.tasks if kind == 'tasks' else manager.records
+    ids = [rng.randint(1, max(len(records), 1)) for _ in range(ops)]
+    return timed(lambda: [records.get(record_id) for record_id in ids], ops)
+
+
+def scenario_filter(manager, kind, ops, rng):
+    if kind == 'tasks':
+        priorities = [name for name, weight in datagen.PRIORITIES]
+        filters = [(rng.choice(['Выполнено', 'Не выполнено', 'Все']), rng.choice(priorities + ['Все']))
+                   for _ in range(ops)]
+        return timed(lambda: [manager.query(**manager.task_filters(status, priority), sort=True, limit=20)
+                              for status, priority in filters], ops)
+    if kind == 'finance':
+        categories = [name for name, *rest in datagen.CATEGORIES]
+        filters = [(datagen.day_str(random_day(rng)), rng.choice(categories)) for _ in range(ops)]
+        return timed(lambda: [manager.filter_records(day, category) for day, category in filters], ops)
+    return None
+
+
+def scenario_report(manager, kind, ops, rng):
+    if kind != 'finance':
+        return None
+    ranges = []
+    for _ in range(ops):
+        start = random_day(rng)
+        ranges.append((start.toordinal(), (start + timedelta(days=rng.choice([7, 30, 90, 365]))).toordinal()))
+    return timed(lambda: [manager.ledger.report(start, end) for start, end in ranges], ops)
+
+
+def scenario_save(manager, kind):
+    save = {'notes': 'save_note', 'tasks': 'save_tasks', 'contacts': 'save_contact', 'finance': 'save_records'}[kind]
+    return timed(getattr(manager, save))
+
+
+def scenario_export(manager, kind, work_dir):
+    return timed(lambda: manager.export_to_csv(os.path.join(work_dir, f'export_{kind}.csv')))
+
+
+def scenario_import(pa, kind, work_dir, csv_path, size):
+    target = os.path.join(work_dir, f'import_{kind}')
+    os.makedirs(target)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = getattr(pa, MANAGER_NAMES[kind])(os.path.join(target, datagen.FILES[kind]))
+    return timed(lambda: manager.import_from_csv(csv_path), size)
+
+
+def run_kind(pa, kind, args, work_dir):
+    path = os.path.join(work_dir, datagen.FILES[kind])
+    csv_path = os.path.join(work_dir, f'{kind}.csv')
+    if args.storage == 'json':
+        datagen.write_json(path, datagen.generate(kind, args.size, args.seed))
+    else:
+        # журнал, снимок и SQLite получают данные в своём формате
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_storage(path, args.storage, kind).save(list(datagen.generate(kind, args.size, args.seed)))
+    datagen.write_csv(csv_path, kind, datagen.generate(kind, args.size, args.seed))
+    rng = random.Random(f'{args.seed}:run:{kind}')
+
+    results = {}
+    results['load'], manager = scenario_load(pa, kind, path)
+    # порядок важен: insert меняет данные, поэтому идёт после чтений
+    scenarios = {
+        'lookup': lambda: scenario_lookup(manager, kind, args.ops, rng),
+        'filter': lambda: scenario_filter(manager, kind, args.ops, rng),
+        'report': lambda: scenario_report(manager, kind, args.ops, rng),
+        'insert': lambda: scenario_insert(manager, kind, args.ops, rng),
+        'save': lambda: scenario_save(manager, kind),
+        'export': lambda: scenario_export(manager, kind, work_dir),
+        'import': lambda: scenario_import(pa, kind, work_dir, csv_path, args.size),
+    }
+    for name, scenario in scenarios.items():
+        if name in args.scenarios:
+            results[name] = scenario()
+    rows = []
+    for name, result in results.items():
+        if result is None or name not in args.scenarios:
+            continue
+        seconds, ops = result
+        rows.append({'manager': kind, 'scenario': name, 'ops': ops, 'seconds': round(seconds, 6),
+                     'ops_per_sec': round(ops / seconds, 1) if seconds else None})
+    return rows
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PACKAGE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = {(row['manager'], row['scenario']): row for row in json.load(file)['results']}
+    regressions = 0
+    for row in results:
+        old = baseline.get((row['manager'], row['scenario']))
+        if old is None or not old['seconds']:
+            continue
+        # сравниваем время на одну операцию: размер прогонов мог отличаться
+        ratio = (row['seconds'] / row['ops']) / (old['seconds'] / old['ops'])
+        mark = ''
+        if ratio > 1 + REGRESSION:
+            mark = '  <- медленнее'
+            regressions += 1
+        print(f"{row['manager']:>9} {row['scenario']:>7}: {ratio:5.2f}x от прошлого{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=100_000, help='записей каждого вида (до 10 млн)')
+    parser.add_argument('--ops', type=int, default=1000, help='операций в сценариях insert, lookup, filter, report')
+    parser.add_argument('--kinds', nargs='+', default=list(datagen.KINDS), choices=datagen.KINDS)
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument('--storage', default=os.environ.get('PA_STORAGE', 'json'),
+                        choices=('json', 'journal', 'snapshot', 'sqlite'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='файл для результатов в JSON (по умолчанию - stdout)')
+    parser.add_argument('--compare', help='результаты прошлого запуска для сравнения')
+    args = parser.parse_args()
+
+    # режим хранения читается при импорте модуля
+    os.environ['PA_STORAGE'] = args.storage
+    import personal_assistant as pa
+
+    work_dir = tempfile.mkdtemp(prefix='pa_bench_')
+    cwd = os.getcwd()
+    results = []
+    try:
+        # индексы и базы менеджеры создают в текущем каталоге
+        os.chdir(work_dir)
+        for kind in args.kinds:
+            rows = run_kind(pa, kind, args, work_dir)
+            for row in rows:
+                print(f"{row['manager']:>9} {row['scenario']:>7}: {row['seconds'] * 1000:10.1f} мс, "
+                      f"{row['ops_per_sec'] or 0:12.0f} оп/с", file=sys.stderr)
+            results.extend(rows)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir)
+
+    report = {
+        'meta': {'date': date.today().isoformat(), 'commit': git_commit(), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'storage': args.storage, 'codec': os.environ.get('PA_CODEC', 'auto'),
+                 'size': args.size, 'ops': args.ops, 'seed': args.seed},
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        return 1 if compare(results, args.compare) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
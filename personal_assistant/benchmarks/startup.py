@@ -0,0 +1,51 @@
+"""Время запуска: импорт модуля, создание всех менеджеров и подсчёт записей без разбора.
+
+Каждый замер - отдельный процесс python, чтобы не мешали уже загруженные модули.
+
+    python benchmarks/startup.py [--data КАТАЛОГ_С_ДАННЫМИ] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'import': 'import personal_assistant',
+    'peek_counts': 'import personal_assistant\npersonal_assistant.peek_counts()',
+    'all_managers': 'import personal_assistant\nfor name in personal_assistant.MANAGERS:\n'
+                    '    personal_assistant.get_manager(name)',
+}
+
+TIMER = '''
+import time, contextlib, io
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+print(time.perf_counter() - started)
+'''
+
+
+def run_once(code, data_dir):
+    body = '\n'.join('    ' + line for line in code.splitlines())
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+    result = subprocess.run([sys.executable, '-c', TIMER.format(body=body)], cwd=data_dir, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data', default='.', help='каталог с notes.json, tasks.json и т.д.')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    for name, code in SCENARIOS.items():
+        times = [run_once(code, args.data) for _ in range(args.runs)]
+        print(f'{name:>14}: медиана {statistics.median(times) * 1000:8.1f} мс, '
+              f'минимум {min(times) * 1000:8.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Лента изменений менеджера: каждое сохранённое изменение получает номер по возрастанию.
+
+Потребители (синхронизация, экспорт, индексы) запоминают последний номер и
+забирают только новое через changes_since, а не сравнивают файлы целиком,
+или подписываются на изменения через subscribe.
+
+Номера живут в памяти и после перезапуска процесса начинаются заново, поэтому
+у каждой ленты есть epoch - случайный идентификатор. Потребитель хранит его
+вместе с номером; другой epoch значит, что лента началась заново.
+"""
+import uuid
+from collections import deque, namedtuple
+from itertools import islice
+
+# op: 'put' (row - запись словарём), 'delete' (row - None) или 'reset' - данные
+# перечитаны с диска, их изменил другой процесс, и нужно забрать всё заново
+Change = namedtuple('Change', 'seq op id row')
+
+HISTORY = 10000
+
+
+class ChangeFeed:
+    def __init__(self, history=HISTORY):
+        self.seq = 0
+        self.epoch = uuid.uuid4().hex
+        self.log = deque(maxlen=history)
+        self.listeners = []
+
+    def append(self, op, record_id=None, row=None):
+        self.seq += 1
+        change = Change(self.seq, op, record_id, row)
+        self.log.append(change)
+        for listener in self.listeners:
+            listener(change)
+        return change
+
+    def add(self, changed=(), deleted=()):
+        """Записывает изменения одного сохранения: changed - словари записей, deleted - id."""
+        for row in changed:
+            self.append('put', row['id'], row)
+        for record_id in deleted:
+            self.append('delete', record_id)
+
+    def reset(self):
+        # первая загрузка - не изменение
+        if self.seq:
+            self.append('reset')
+
+    def changes_since(self, seq, epoch=None):
+        """Изменения с номером больше seq; None, если потребителю нужно перечитать все записи:
+        часть изменений уже вытеснена из истории, epoch от другой ленты или номер из
+        будущего (процесс перезапущен, а epoch потребитель не передал)."""
+        if (epoch is not None and epoch != self.epoch) or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self.log or self.log[0].seq > seq + 1:
+            return None
+        # номера в истории идут подряд, поэтому нужное место вычисляется, а не ищется
+        return list(islice(self.log, seq + 1 - self.log[0].seq, None))
+
+    def subscribe(self, listener):
+        """listener(change) вызывается при каждом изменении."""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
@@ -0,0 +1,188 @@
+"""Похожие контакты и повторы без сравнения всех пар между собой.
+
+Кандидаты отбираются по блокам: общий телефон, общий email или общий ключ
+имени - первые три или последние три буквы каждого слова (слова по алфавиту,
+так что «Иванов Иван» и «Иван Иванов» в одном блоке, а опечатка в середине или
+на одном конце слова ключ не меняет). Пары из блока сравниваются мерой
+Джаро - Винклера, а в больших блоках - только соседи по алфавиту (WINDOW),
+поэтому работа растёт линейно с числом контактов.
+"""
+from functools import lru_cache
+
+# имена одного человека, если больше контакты ничем не связаны
+NAME_MATCH = 0.92
+# имена одного человека при общем телефоне или email
+WEAK_NAME_MATCH = 0.8
+# порог для поиска похожих имён
+SIMILAR = 0.85
+WINDOW = 20
+
+
+def normalize_email(email):
+    return (email or '').strip().casefold()
+
+
+def jaro_winkler(first, second):
+    """Сходство строк от 0 до 1; общее начало (до 4 букв) повышает оценку."""
+    if first == second:
+        return 1.0
+    if not first or not second:
+        return 0.0
+    reach = max(len(first), len(second)) // 2 - 1
+    taken = [False] * len(second)
+    matched = []
+    for i, char in enumerate(first):
+        for j in range(max(0, i - reach), min(len(second), i + reach + 1)):
+            if not taken[j] and second[j] == char:
+                taken[j] = True
+                matched.append(char)
+                break
+    if not matched:
+        return 0.0
+    other = [char for char, used in zip(second, taken) if used]
+    transpositions = sum(a != b for a, b in zip(matched, other)) / 2
+    m = len(matched)
+    jaro = (m / len(first) + m / len(second) + (m - transpositions) / m) / 3
+    prefix = 0
+    for a, b in zip(first[:4], second[:4]):
+        if a != b:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+@lru_cache(maxsize=100000)
+def name_similarity(first, second):
+    """Сходство имён без учёта порядка слов; имена в форме normalize_name. Имена часто
+    повторяются, поэтому результаты кэшируются."""
+    return jaro_winkler(' '.join(sorted(first.split())), ' '.join(sorted(second.split())))
+
+
+def name_keys(name):
+    """Ключи блоков по имени (имя в форме normalize_name)."""
+    words = name.split()
+    if not words:
+        return ()
+    return ('^' + ' '.join(sorted(word[:3] for word in words)), '$' + ' '.join(sorted(word[-3:] for word in words)))
+
+
+def block_keys(key):
+    """key - (имя, телефон, email) в нормальной форме."""
+    name, phone, email = key
+    keys = list(name_keys(name))
+    if phone:
+        keys.append('t' + phone)
+    if email:
+        keys.append('e' + email)
+    return keys
+
+
+def contact_info(key):
+    name, phone, email = key
+    return {phone} - {''}, {email} - {''}
+
+
+def compatible(first, second):
+    """Может ли это быть один человек: first и second - (телефоны, email) групп контактов."""
+    (phones, emails), (other_phones, other_emails) = first, second
+    if phones & other_phones or emails & other_emails:
+        return True
+    return not (phones and other_phones) and not (emails and other_emails)
+
+
+def is_duplicate(first, second):
+    """Одни и те же ли это люди: имена похожи, а телефоны и email не противоречат друг другу."""
+    name, phone, email = first
+    other_name, other_phone, other_email = second
+    shared = (phone and phone == other_phone) or (email and email == other_email)
+    if not shared and ((phone and other_phone) or (email and other_email)):
+        # разные номера или адреса у однофамильцев - разные люди
+        return False
+    return name_similarity(name, other_name) >= (WEAK_NAME_MATCH if shared else NAME_MATCH)
+
+
+class ContactBlocks:
+    """Блоки кандидатов: ключ блока -> id контактов."""
+
+    def __init__(self, keys=None):
+        self.blocks = {}
+        for contact_id, key in (keys or {}).items():
+            self.add(contact_id, key)
+
+    def add(self, contact_id, key):
+        for block in block_keys(key):
+            self.blocks.setdefault(block, set()).add(contact_id)
+
+    def remove(self, contact_id, key):
+        for block in block_keys(key):
+            ids = self.blocks.get(block)
+            if ids is not None:
+                ids.discard(contact_id)
+                if not ids:
+                    del self.blocks[block]
+
+    def candidates(self, blocks):
+        ids = set()
+        for block in blocks:
+            ids.update(self.blocks.get(block, ()))
+        return ids
+
+    def similar(self, name, keys, threshold=SIMILAR):
+        """[(сходство, id)] контактов с похожим именем, лучшие первыми."""
+        scored = []
+        for contact_id in self.candidates(name_keys(name)):
+            score = name_similarity(name, keys[contact_id][0])
+            if score >= threshold:
+                scored.append((score, contact_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+    def match(self, key, keys):
+        """id контакта, повтором которого был бы контакт с ключом key, или None."""
+        best = None
+        for contact_id in self.candidates(block_keys(key)):
+            if is_duplicate(key, keys[contact_id]):
+                score = name_similarity(key[0], keys[contact_id][0])
+                if best is None or (score, -contact_id) > (best[0], -best[1]):
+                    best = (score, contact_id)
+        return best and best[1]
+
+    def duplicates(self, keys):
+        """Группы id повторяющихся контактов, каждая по возрастанию id."""
+        # объединение множеств: в parent только не корневые id, в known - телефоны и email групп
+        parent = {}
+        known = {}
+
+        def root(contact_id):
+            while contact_id in parent:
+                up = parent[contact_id]
+                if up in parent:
+                    parent[contact_id] = parent[up]
+                contact_id = up
+            return contact_id
+
+        for ids in self.blocks.values():
+            if len(ids) < 2:
+                continue
+            # в большом блоке сравниваются только соседи по алфавиту
+            members = sorted(ids, key=lambda contact_id: (keys[contact_id][0], contact_id))
+            for i, first in enumerate(members):
+                for second in members[i + 1:i + 1 + WINDOW]:
+                    first_root, second_root = root(first), root(second)
+                    if first_root == second_root or not is_duplicate(keys[first], keys[second]):
+                        continue
+                    # контакт без телефона и email похож на всех тёзок, но не должен
+                    # склеивать в одну группу тёзок с разными номерами
+                    first_known = known.get(first_root) or contact_info(keys[first_root])
+                    second_known = known.get(second_root) or contact_info(keys[second_root])
+                    if not compatible(first_known, second_known):
+                        continue
+                    top, child = min(first_root, second_root), max(first_root, second_root)
+                    parent[child] = top
+                    known[top] = (first_known[0] | second_known[0], first_known[1] | second_known[1])
+                    known.pop(child, None)
+        groups = {}
+        for contact_id in parent:
+            top = root(contact_id)
+            groups.setdefault(top, [top]).append(contact_id)
+        return sorted(sorted(group) for group in groups.values())
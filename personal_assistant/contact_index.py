@@ -0,0 +1,129 @@
+import bisect
+import re
+from itertools import islice
+
+from contact_dedup import ContactBlocks, normalize_email
+
+
+def normalize_phone(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    # +7 900 ... и 8 900 ... - один и тот же номер
+    if len(digits) == 11 and digits[0] in '78':
+        digits = digits[1:]
+    return digits
+
+
+def normalize_name(name):
+    return ' '.join((name or '').split()).casefold()
+
+
+class ContactIndex:
+    """Вторичные индексы контактов: по номеру телефона, по имени и по началу имени.
+    Блоки для поиска похожих контактов (contact_dedup) строятся при первом обращении."""
+
+    # on_scan(index, число просмотренных контактов) - для статистики (instrumentation.py)
+    on_scan = None
+
+    def __init__(self):
+        self.by_phone = {}
+        self.by_name = {}
+        self.names = []
+        self.keys = {}
+        self._blocks = None
+
+    def add(self, contact):
+        self.add_many([contact])
+
+    def add_many(self, contacts):
+        new_names = []
+        for contact in contacts:
+            name, phone = normalize_name(contact.name), normalize_phone(contact.phone)
+            self.keys[contact.id] = key = (name, phone, normalize_email(contact.email))
+            if self._blocks is not None:
+                self._blocks.add(contact.id, key)
+            self.by_name.setdefault(name, set()).add(contact.id)
+            if phone:
+                self.by_phone.setdefault(phone, set()).add(contact.id)
+            new_names.append((name, contact.id))
+        if len(new_names) == 1:
+            bisect.insort(self.names, new_names[0])
+        else:
+            self.names.extend(new_names)
+            self.names.sort()
+
+    def remove(self, contact_id):
+        name, phone, email = key = self.keys.pop(contact_id)
+        if self._blocks is not None:
+            self._blocks.remove(contact_id, key)
+        self._discard(self.by_name, name, contact_id)
+        self._discard(self.by_phone, phone, contact_id)
+        i = bisect.bisect_left(self.names, (name, contact_id))
+        if i < len(self.names) and self.names[i] == (name, contact_id):
+            del self.names[i]
+
+    def update(self, contact):
+        self.remove(contact.id)
+        self.add(contact)
+
+    @property
+    def blocks(self):
+        if self._blocks is None:
+            self._blocks = ContactBlocks(self.keys)
+        return self._blocks
+
+    def similar(self, query, limit=20):
+        """id контактов с похожим именем (опечатки, другой порядок слов), самые похожие первыми."""
+        return [contact_id for score, contact_id in self.blocks.similar(normalize_name(query), self.keys)[:limit]]
+
+    def match(self, contact):
+        """id сохранённого контакта, повтором которого был бы contact, или None."""
+        key = (normalize_name(contact.name), normalize_phone(contact.phone), normalize_email(contact.email))
+        return self.blocks.match(key, self.keys)
+
+    def duplicates(self):
+        return self.blocks.duplicates(self.keys)
+
+    @staticmethod
+    def _discard(index, key, contact_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(contact_id)
+            if not ids:
+                del index[key]
+
+    def exact(self, query):
+        """id контактов с точно таким номером или именем (без учёта регистра), по возрастанию."""
+        phone = normalize_phone(query)
+        ids = set(self.by_phone.get(phone, ())) if phone else set()
+        ids.update(self.by_name.get(normalize_name(query), ()))
+        return sorted(ids)
+
+    def search(self, query):
+        """id контактов по убыванию релевантности: совпадение номера, имени, начала имени."""
+        seen = set()
+        phone = normalize_phone(query)
+        name = normalize_name(query)
+        exact = sorted(self.by_phone.get(phone, ())) if phone else []
+        exact += sorted(self.by_name.get(name, ()))
+        start = i = bisect.bisect_left(self.names, (name,)) if name else 0
+        try:
+            for contact_id in exact:
+                if contact_id not in seen:
+                    seen.add(contact_id)
+                    yield contact_id
+            if not name:
+                return
+            while i < len(self.names) and self.names[i][0].startswith(name):
+                contact_id = self.names[i][1]
+                i += 1
+                if contact_id not in seen:
+                    seen.add(contact_id)
+                    yield contact_id
+        finally:
+            # поиск обычно бросают после первой страницы - тогда и считается просмотренное
+            if self.on_scan is not None:
+                self.on_scan(len(exact) + i - start)
+
+    def page(self, query, page=1, per_page=20):
+        start = (page - 1) * per_page
+        return list(islice(self.search(query), start, start + per_page))
@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+from itertools import islice
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BATCH_SIZE = 10000
+BUFFER_SIZE = 1 << 20
+COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+def detect_compression(filepath):
+    for extension, compression in COMPRESSIONS.items():
+        if filepath.endswith(extension):
+            return compression
+    return None
+
+
+def open_output(filepath, compression=None):
+    if compression is None:
+        compression = detect_compression(filepath)
+    if compression == 'gzip':
+        # уровень 6 заметно быстрее максимального при почти том же размере
+        return gzip.open(filepath, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError('Для сжатия zstd нужен пакет zstandard')
+        stream = zstandard.ZstdCompressor().stream_writer(open(filepath, 'wb'))
+        return io.TextIOWrapper(stream, encoding='utf-8', newline='', write_through=False)
+    if compression is not None:
+        raise ValueError(f'Неизвестный формат сжатия: {compression}')
+    return open(filepath, 'w', newline='', encoding='utf-8', buffering=BUFFER_SIZE)
+
+
+def export_csv(filepath, fieldnames, rows, compression=None, batch_size=BATCH_SIZE):
+    """Записывает строки (кортежи) в CSV пачками по batch_size. Возвращает число строк.
+
+    rows может быть генератором - весь набор в памяти не собирается.
+    Сжатие определяется по расширению (.gz, .zst) или задаётся явно.
+    """
+    rows = iter(rows)
+    count = 0
+    with open_output(filepath, compression) as file:
+        writer = csv.writer(file)
+        writer.writerow(fieldnames)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            writer.writerows(batch)
+            count += len(batch)
+    return count
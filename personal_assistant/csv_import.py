@@ -0,0 +1,129 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from itertools import islice
+
+CHUNK_SIZE = 10000
+
+
+def read_rows(filepath):
+    with open(filepath, 'r', encoding='utf-8', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+def load_checkpoint(filepath):
+    """Отметка прошлого импорта {'offset': строк, 'digest': хэш этих строк} или None."""
+    try:
+        with open(filepath + '.checkpoint', 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return checkpoint if checkpoint.get('offset') else None
+
+
+def save_checkpoint(filepath, offset, digest):
+    with open(filepath + '.checkpoint', 'w', encoding='utf-8') as file:
+        json.dump({'offset': offset, 'digest': digest.hexdigest()}, file)
+
+
+def hash_row(digest, row):
+    digest.update(json.dumps(row, ensure_ascii=False).encode('utf-8', 'surrogatepass') + b'\n')
+
+
+def resume(filepath, rows, checkpoint, digest):
+    """Пропускает уже импортированные строки, сверяя их с хэшем из отметки. Исправление
+    строк после отметки продолжению не мешает; если же изменились уже импортированные
+    строки, начинать заново нельзя - они были бы импортированы второй раз."""
+    offset = checkpoint['offset']
+    skipped = 0
+    for row in islice(rows, offset):
+        hash_row(digest, row)
+        skipped += 1
+    if skipped != offset or digest.hexdigest() != checkpoint.get('digest'):
+        raise ValueError(f'первые {offset} строк файла уже импортированы, но с тех пор изменились; '
+                         f'проверьте данные и удалите {filepath}.checkpoint, чтобы импортировать файл заново')
+    return offset
+
+
+def clear_checkpoint(filepath):
+    try:
+        os.remove(filepath + '.checkpoint')
+    except FileNotFoundError:
+        pass
+
+
+def print_progress(done, imported, seconds):
+    rate = imported / seconds if seconds else 0
+    print(f'Обработано строк: {done} ({rate:.0f} строк/с)')
+
+
+def stream_import(filepath, convert, commit, chunk_size=CHUNK_SIZE, progress=print_progress, flush=None):
+    """Потоковый импорт CSV порциями по chunk_size строк.
+
+    Каждая порция сначала целиком преобразуется convert, затем передаётся в commit,
+    поэтому ошибка в строке не оставляет порцию наполовину импортированной. После
+    каждой записанной порции сохраняется отметка, и повторный запуск продолжает с неё.
+
+    flush нужен хранилищам, которые при каждом сохранении переписывают файл целиком
+    (режим json): commit тогда только копит порции в памяти, а flush() записывает
+    накопленное. Запись после каждой порции сделала бы импорт квадратичным, поэтому
+    flush вызывается, когда накопилось не меньше, чем уже записано этим импортом, -
+    число перезаписей растёт как логарифм размера файла. Отметка продвигается только
+    вместе с записью; при ошибке накопленные целые порции записываются.
+    Возвращает число импортированных строк.
+    """
+    checkpoint = load_checkpoint(filepath)
+    digest = hashlib.sha256()
+    rows = read_rows(filepath)
+    done = 0
+    started = time.perf_counter()
+    imported = 0
+    # строки, переданные в commit, но ещё не записанные flush
+    staged = 0
+
+    def persist():
+        nonlocal staged
+        if flush is not None and staged:
+            flush()
+        staged = 0
+        save_checkpoint(filepath, done, digest)
+
+    try:
+        if checkpoint:
+            done = resume(filepath, rows, checkpoint, digest)
+            print(f'Продолжение импорта со строки {done + 1}.')
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            records = []
+            for number, row in enumerate(chunk, done + 1):
+                try:
+                    records.append(convert(row))
+                except (KeyError, ValueError, TypeError) as e:
+                    if staged:
+                        persist()
+                    raise ValueError(f'строка {number}: {e!r}') from None
+            commit(records)
+            for row in chunk:
+                hash_row(digest, row)
+            done += len(chunk)
+            imported += len(chunk)
+            staged += len(chunk)
+            if flush is None or staged >= imported - staged:
+                persist()
+            if progress:
+                progress(done, imported, time.perf_counter() - started)
+        if staged:
+            persist()
+    except KeyboardInterrupt:
+        # прерванный импорт продолжится с последней целой порции
+        if staged:
+            persist()
+        raise
+    finally:
+        rows.close()
+    clear_checkpoint(filepath)
+    return imported
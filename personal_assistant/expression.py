@@ -0,0 +1,315 @@
+import math
+import numbers
+import operator
+import re
+from functools import lru_cache, reduce
+
+# numpy нужен только для вычисления над массивами, загружается при первом таком вызове
+np = None
+
+# ограничение числа знаков округления: round(1, -10**7) считает 10**(10**7)
+MAX_ROUND_DIGITS = 20
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def safe_round(number, ndigits=None, round=round):
+    if isinstance(ndigits, numbers.Integral) and abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ExpressionError(f'округлять можно не больше чем до {MAX_ROUND_DIGITS} знаков')
+    return round(number, ndigits) if ndigits is not None else round(number)
+
+
+# разрешённые функции и константы; ничего другого выражение вызвать не может
+FUNCTIONS = {
+    'abs': abs, 'round': safe_round, 'min': min, 'max': max,
+    'sqrt': math.sqrt, 'exp': math.exp, 'log': math.log, 'log10': math.log10,
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'floor': math.floor, 'ceil': math.ceil,
+}
+CONSTANTS = {'pi': math.pi, 'e': math.e}
+BINARY = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '//': operator.floordiv, '%': operator.mod, '**': operator.pow,
+}
+# ограничение размера целого результата степени в битах, иначе 9**9**9 или
+# (9**10000)**10000 считаются бесконечно; 2**65536 - около 20 тысяч цифр
+MAX_POWER_BITS = 1 << 16
+# длиннее Python не переводит строку в целое число
+MAX_DIGITS = 4300
+CACHE_SIZE = 1024
+
+TOKEN_RE = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|([A-Za-z_]\w*)|(\*\*|//|[-+*/%(),]))')
+
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('Для вычисления выражений над массивами нужен numpy') from None
+        np = numpy
+    return np
+
+
+def numpy_functions():
+    return {
+        'abs': np.abs, 'round': lambda x, decimals=0: safe_round(x, decimals, np.round),
+        'min': lambda *args: reduce(np.minimum, args), 'max': lambda *args: reduce(np.maximum, args),
+        'sqrt': np.sqrt, 'exp': np.exp, 'log': lambda x, base=math.e: np.log(x) / math.log(base),
+        'log10': np.log10, 'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+        'floor': np.floor, 'ceil': np.ceil,
+    }
+
+
+def safe_pow(base, exponent):
+    # результат проверяется до вычисления: в нём около exponent * bit_length(base) бит
+    if isinstance(base, int) and isinstance(exponent, int) and \
+            abs(exponent) * max(base.bit_length(), 1) > MAX_POWER_BITS:
+        raise ExpressionError('слишком большая степень')
+    return operator.pow(base, exponent)
+
+
+SCALAR_BINARY = dict(BINARY, **{'**': safe_pow})
+
+
+def tokenize(source):
+    """Строка -> список токенов (вид, значение, позиция); вид - 'num', 'name' или 'op'."""
+    tokens = []
+    pos = 0
+    end = len(source.rstrip())
+    while pos < end:
+        match = TOKEN_RE.match(source, pos)
+        if not match:
+            position = len(source) - len(source[pos:].lstrip())
+            raise ExpressionError(f"неожиданный символ '{source[position]}' в позиции {position + 1}")
+        number, name, op = match.groups()
+        start = match.start(match.lastindex)
+        if number is not None:
+            if len(number) > MAX_DIGITS:
+                raise ExpressionError(f'слишком длинное число в позиции {start + 1}')
+            value = float(number) if any(c in number for c in '.eE') else int(number)
+            tokens.append(('num', value, start))
+        elif name is not None:
+            tokens.append(('name', name, start))
+        else:
+            tokens.append(('op', op, start))
+        pos = match.end()
+    tokens.append(('end', None, end))
+    return tokens
+
+
+class Parser:
+    """Рекурсивный спуск с приоритетами как в Python; результат - дерево из кортежей.
+
+    Узлы: ('num', значение), ('var', имя), ('neg', узел), ('bin', оператор, левый, правый),
+    ('call', имя, аргументы).
+    """
+
+    def __init__(self, source):
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self, *ops):
+        kind, value, position = self.tokens[self.pos]
+        if kind == 'op' and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def expect(self, op):
+        if not self.take(op):
+            kind, value, position = self.peek()
+            found = 'конец выражения' if kind == 'end' else f"'{value}'"
+            raise ExpressionError(f"ожидалось '{op}', найдено {found} в позиции {position + 1}")
+
+    def parse(self):
+        tree = self.sum()
+        kind, value, position = self.peek()
+        if kind != 'end':
+            raise ExpressionError(f"лишний токен '{value}' в позиции {position + 1}")
+        return tree
+
+    def sum(self):
+        tree = self.product()
+        while True:
+            op = self.take('+', '-')
+            if not op:
+                return tree
+            tree = ('bin', op, tree, self.product())
+
+    def product(self):
+        tree = self.unary()
+        while True:
+            op = self.take('*', '/', '//', '%')
+            if not op:
+                return tree
+            tree = ('bin', op, tree, self.unary())
+
+    def unary(self):
+        op = self.take('-', '+')
+        if op == '-':
+            return ('neg', self.unary())
+        if op == '+':
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        tree = self.atom()
+        if self.take('**'):
+            # правоассоциативно и сильнее унарного минуса слева: -2**2 == -4
+            return ('bin', '**', tree, self.unary())
+        return tree
+
+    def atom(self):
+        kind, value, position = self.peek()
+        if kind == 'num':
+            self.pos += 1
+            return ('num', value)
+        if kind == 'name':
+            self.pos += 1
+            if self.take('('):
+                if value not in FUNCTIONS:
+                    raise ExpressionError(f"неизвестная функция '{value}'")
+                args = []
+                if not self.take(')'):
+                    args.append(self.sum())
+                    while self.take(','):
+                        args.append(self.sum())
+                    self.expect(')')
+                return ('call', value, tuple(args))
+            if value in FUNCTIONS:
+                raise ExpressionError(f"функция '{value}' вызывается со скобками")
+            if value in CONSTANTS:
+                return ('num', CONSTANTS[value])
+            return ('var', value)
+        if self.take('('):
+            tree = self.sum()
+            self.expect(')')
+            return tree
+        found = 'конец выражения' if kind == 'end' else f"'{value}'"
+        raise ExpressionError(f"ожидалось число, имя или '(', найдено {found} в позиции {position + 1}")
+
+
+def build(tree, functions, binary):
+    """Дерево -> функция от словаря переменных (замыкания вместо обхода дерева при каждом вычислении)."""
+    kind = tree[0]
+    if kind == 'num':
+        value = tree[1]
+        return lambda env: value
+    if kind == 'var':
+        name = tree[1]
+
+        def variable(env):
+            try:
+                return env[name]
+            except KeyError:
+                raise ExpressionError(f"не задана переменная '{name}'") from None
+        return variable
+    if kind == 'neg':
+        operand = build(tree[1], functions, binary)
+        return lambda env: -operand(env)
+    if kind == 'bin':
+        op = binary[tree[1]]
+        left = build(tree[2], functions, binary)
+        right = build(tree[3], functions, binary)
+        return lambda env: op(left(env), right(env))
+    function = functions[tree[1]]
+    args = [build(arg, functions, binary) for arg in tree[2]]
+    return lambda env: function(*[arg(env) for arg in args])
+
+
+def fold(tree):
+    """Заранее вычисляет поддеревья без переменных."""
+    kind = tree[0]
+    if kind == 'neg':
+        tree = ('neg', fold(tree[1]))
+        children = tree[1:]
+    elif kind == 'bin':
+        tree = ('bin', tree[1], fold(tree[2]), fold(tree[3]))
+        children = tree[2:]
+    elif kind == 'call':
+        children = tuple(fold(arg) for arg in tree[2])
+        tree = ('call', tree[1], children)
+    else:
+        return tree
+    if all(child[0] == 'num' for child in children):
+        try:
+            return ('num', build(tree, FUNCTIONS, SCALAR_BINARY)({}))
+        except ExpressionError:
+            # слишком большая степень или округление - ошибка сразу, а не при каждом вычислении
+            raise
+        except (ArithmeticError, ValueError, TypeError):
+            # ошибку покажем при вычислении, а не при компиляции
+            pass
+    return tree
+
+
+def variables_of(tree):
+    kind = tree[0]
+    if kind == 'num':
+        return set()
+    if kind == 'var':
+        return {tree[1]}
+    if kind == 'neg':
+        return variables_of(tree[1])
+    children = tree[2:] if kind == 'bin' else tree[2]
+    return set().union(*map(variables_of, children))
+
+
+class Expression:
+    """Скомпилированное выражение: разбирается один раз, вычисляется с разными переменными."""
+
+    def __init__(self, source):
+        self.source = source
+        self.tree = fold(Parser(source).parse())
+        self.variables = frozenset(variables_of(self.tree))
+        self.function = build(self.tree, FUNCTIONS, SCALAR_BINARY)
+        self.array_function = None
+
+    def evaluate(self, variables=None, **kwargs):
+        if kwargs:
+            variables = dict(variables or {}, **kwargs)
+        return self.function(variables or {})
+
+    __call__ = evaluate
+
+    def evaluate_array(self, variables=None, **kwargs):
+        """Вычисляет выражение поэлементно над массивами за один векторный проход.
+
+        Возвращает (значения, ошибки): ошибки - булева маска элементов, где
+        получилось деление на ноль, корень из отрицательного и т.п.; в значениях
+        там nan. Массивы приводятся к float64, числа подставляются как есть.
+        """
+        load_numpy()
+        if self.array_function is None:
+            self.array_function = build(self.tree, numpy_functions(), BINARY)
+        env = {name: np.asarray(value, dtype=np.float64) for name, value in dict(variables or {}, **kwargs).items()}
+        with np.errstate(all='ignore'):
+            values = np.array(self.array_function(env), dtype=np.float64)
+            if values.ndim == 0 and env:
+                values = np.broadcast_to(values, np.broadcast_shapes(*(v.shape for v in env.values()))).copy()
+            errors = ~np.isfinite(values)
+            # nan и inf во входных данных ошибкой вычисления не считаются
+            for value in env.values():
+                errors &= np.isfinite(value)
+        values[errors] = np.nan
+        return values, errors
+
+    def __repr__(self):
+        return f'Expression({self.source!r})'
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(source):
+    """Разобранное выражение из LRU-кэша по исходной строке."""
+    return Expression(source)
+
+
+def evaluate(source, variables=None, **kwargs):
+    return compile_expression(source).evaluate(variables, **kwargs)
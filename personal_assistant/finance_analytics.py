@@ -0,0 +1,207 @@
+"""Аналитика финансов для дашбордов: ряды по месяцам и неделям, изменения к
+прошлому периоду, скользящие суммы расходов за 30/90 дней по категориям и
+сводная таблица категория x месяц.
+
+Всё считается одним проходом по дневным суммам леджера (Ledger, колонки
+FinanceColumns и SQLite отдают их готовыми через daily_totals), а не повторными
+отчётами за каждый период. Результаты кэшируются, пока не изменится версия
+леджера, и возвращаются списками словарей - их можно сохранить в CSV или JSON.
+
+    analytics = FinanceAnalytics(finance)
+    analytics.series('month')
+    to_csv(analytics.pivot('month'), 'pivot.csv')
+"""
+import json
+from datetime import date
+
+from csv_export import export_csv
+from ledger import format_day
+
+PERIODS = ('month', 'week')
+WINDOWS = (30, 90)
+VALUES = ('income', 'expenses')
+
+
+def month_label(day):
+    value = date.fromordinal(day)
+    return f'{value.month:02d}-{value.year:04d}'
+
+
+def week_label(day):
+    """Неделя обозначается датой её понедельника."""
+    return format_day(day - date.fromordinal(day).weekday())
+
+
+def period_labels(first, last, period):
+    """Все периоды от дня first до дня last включительно, без пропусков."""
+    if period == 'week':
+        monday = first - date.fromordinal(first).weekday()
+        return [format_day(day) for day in range(monday, last + 1, 7)]
+    start, end = date.fromordinal(first), date.fromordinal(last)
+    labels = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        labels.append(f'{month:02d}-{year:04d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return labels
+
+
+def sum_categories(sums, category=None):
+    """(доходы, расходы) периода по всем категориям или по одной."""
+    if category is not None:
+        return tuple(sums.get(category, (0.0, 0.0)))
+    return sum(income for income, expense in sums.values()), sum(expense for income, expense in sums.values())
+
+
+class FinanceAnalytics:
+    def __init__(self, manager):
+        self.manager = manager
+        self.ledger = None
+        self.version = None
+        self.results = {}
+
+    def cached(self, key, compute):
+        ledger = self.manager.ledger
+        # перечитанные данные - новый леджер, изменения - новая версия
+        if ledger is not self.ledger or ledger.version != self.version:
+            self.ledger, self.version = ledger, ledger.version
+            self.results = {}
+        if key not in self.results:
+            self.results[key] = compute()
+        return self.results[key]
+
+    def buckets(self):
+        """Один проход по дням в порядке дат: суммы по месяцам и неделям и расходы по дням для
+        скользящих окон. {'month': {период: {категория: [доходы, расходы]}}, 'week': ..., 'spend': ...}"""
+        return self.cached('buckets', self._buckets)
+
+    def _buckets(self):
+        daily = self.ledger.daily_totals()
+        result = {'first': None, 'last': None, 'categories': [], 'spend': {}}
+        for period in PERIODS:
+            result[period] = {}
+        days = sorted(day for day, sums in daily.items() if any(income or expense for income, expense in sums.values()))
+        if not days:
+            return result
+        result['first'], result['last'] = days[0], days[-1]
+        categories = set()
+        spend = result['spend']
+        for day in days:
+            month = result['month'].setdefault(month_label(day), {})
+            week = result['week'].setdefault(week_label(day), {})
+            for category, (income, expense) in daily[day].items():
+                if not income and not expense:
+                    continue
+                categories.add(category)
+                for sums in (month.setdefault(category, [0.0, 0.0]), week.setdefault(category, [0.0, 0.0])):
+                    sums[0] += income
+                    sums[1] += expense
+                if expense:
+                    spend.setdefault(category, []).append((day, expense))
+        result['categories'] = sorted(categories)
+        return result
+
+    def series(self, period='month', category=None):
+        """[{'period', 'income', 'expenses', 'balance'}] по всем периодам подряд, пустые - нулями."""
+        if period not in PERIODS:
+            raise ValueError(f'Неизвестный период {period}')
+        return self.cached(('series', period, category), lambda: self._series(period, category))
+
+    def _series(self, period, category):
+        buckets = self.buckets()
+        if buckets['first'] is None:
+            return []
+        rows = []
+        for label in period_labels(buckets['first'], buckets['last'], period):
+            income, expense = sum_categories(buckets[period].get(label, {}), category)
+            rows.append({'period': label, 'income': round(income, 2), 'expenses': round(expense, 2),
+                         'balance': round(income - expense, 2)})
+        return rows
+
+    def deltas(self, period='month', category=None):
+        """Ряд series с изменением доходов и расходов к прошлому периоду; expenses_change - доля
+        (None, если в прошлом периоде расходов не было)."""
+        return self.cached(('deltas', period, category), lambda: self._deltas(period, category))
+
+    def _deltas(self, period, category):
+        rows = []
+        previous = None
+        for row in self.series(period, category):
+            row = dict(row, income_delta=None, expenses_delta=None, expenses_change=None)
+            if previous is not None:
+                row['income_delta'] = round(row['income'] - previous['income'], 2)
+                row['expenses_delta'] = round(row['expenses'] - previous['expenses'], 2)
+                if previous['expenses']:
+                    row['expenses_change'] = round(row['expenses_delta'] / previous['expenses'], 4)
+            rows.append(row)
+            previous = row
+        return rows
+
+    def rolling(self, window=30, category=None):
+        """Расходы за последние window дней на каждый день: [{'date', категория: сумма, ...}]."""
+        if window < 1:
+            raise ValueError('Окно должно быть не меньше дня')
+        return self.cached(('rolling', window, category), lambda: self._rolling(window, category))
+
+    def _rolling(self, window, category):
+        buckets = self.buckets()
+        if buckets['first'] is None:
+            return []
+        categories = [category] if category is not None else buckets['categories']
+        first, last = buckets['first'], buckets['last']
+        columns = {}
+        for name in categories:
+            # окно скользит по дням: день входит в сумму и через window дней выходит из неё
+            spend = buckets['spend'].get(name, [])
+            values = []
+            total = 0.0
+            head = tail = 0
+            for day in range(first, last + 1):
+                while head < len(spend) and spend[head][0] <= day:
+                    total += spend[head][1]
+                    head += 1
+                while tail < head and spend[tail][0] <= day - window:
+                    total -= spend[tail][1]
+                    tail += 1
+                values.append(round(total, 2) if tail < head else 0.0)
+            columns[name] = values
+        return [dict({'date': format_day(day)}, **{name: columns[name][i] for name in categories})
+                for i, day in enumerate(range(first, last + 1))]
+
+    def pivot(self, period='month', value='expenses'):
+        """Сводная таблица: строка на категорию, колонка на период. [{'category', период: сумма, ...}]"""
+        if period not in PERIODS:
+            raise ValueError(f'Неизвестный период {period}')
+        if value not in VALUES:
+            raise ValueError(f'Неизвестная величина {value}')
+        return self.cached(('pivot', period, value), lambda: self._pivot(period, value))
+
+    def _pivot(self, period, value):
+        buckets = self.buckets()
+        if buckets['first'] is None:
+            return []
+        labels = period_labels(buckets['first'], buckets['last'], period)
+        column = VALUES.index(value)
+        rows = []
+        for category in buckets['categories']:
+            row = {'category': category}
+            for label in labels:
+                row[label] = round(buckets[period].get(label, {}).get(category, (0.0, 0.0))[column], 2)
+            if any(row[label] for label in labels):
+                rows.append(row)
+        return rows
+
+    def dashboard(self, period='month'):
+        """Всё сразу для дашборда: ряд с изменениями, сводная таблица расходов и окна WINDOWS."""
+        return {'series': self.deltas(period), 'pivot': self.pivot(period),
+                'rolling': {str(window): self.rolling(window) for window in WINDOWS}}
+
+
+def to_csv(rows, filepath, compression=None):
+    """Сохраняет ряд или таблицу (список словарей с одинаковыми ключами) в CSV."""
+    fields = list(rows[0]) if rows else []
+    return export_csv(filepath, fields, ([row[name] for name in fields] for row in rows), compression)
+
+
+def to_json(result):
+    return json.dumps(result, ensure_ascii=False, indent=4)
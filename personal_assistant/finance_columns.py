@@ -0,0 +1,202 @@
+from ledger import build_report
+
+# numpy загружается только при создании колонок: он заметно замедляет запуск
+np = None
+
+NO_DAY = -1
+
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('Для колоночного хранения финансовых записей нужен numpy') from None
+        np = numpy
+    return np
+
+
+class FinanceColumns:
+    """Колоночное хранилище финансовых записей на массивах numpy.
+
+    Суммы лежат в float64, даты - порядковыми номерами дней в int32, категории -
+    кодами в int32 со справочником строк. Ведёт себя как словарь id -> запись,
+    записи FinanceRecord собираются из колонок при обращении. Отчёты считаются
+    векторно, поэтому объект заменяет и Ledger.
+    """
+
+    columns = ('ids', 'amounts', 'days', 'codes')
+    # on_scan(columns, число просмотренных записей) - для статистики (instrumentation.py)
+    on_scan = None
+
+    def __init__(self, record_type, capacity=1024):
+        load_numpy()
+        self.record_type = record_type
+        self.size = 0
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.amounts = np.empty(capacity, dtype=np.float64)
+        self.days = np.empty(capacity, dtype=np.int32)
+        self.codes = np.empty(capacity, dtype=np.int32)
+        self.descriptions = []
+        self.bad_dates = {}
+        self.categories = []
+        self.category_codes = {}
+        self.rows = {}
+        self.version = 0
+
+    def _grow(self, needed):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self.columns:
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def __setitem__(self, record_id, record):
+        self.version += 1
+        row = self.rows.get(record_id)
+        if row is None:
+            self._grow(self.size + 1)
+            row = self.rows[record_id] = self.size
+            self.size += 1
+            self.descriptions.append(record.description)
+        else:
+            self.descriptions[row] = record.description
+        self.ids[row] = record_id
+        self.amounts[row] = record.amount
+        self.codes[row] = self.code(record.category)
+        day = record.day
+        if day is None:
+            self.days[row] = NO_DAY
+            self.bad_dates[row] = record.date
+        else:
+            self.days[row] = day
+            self.bad_dates.pop(row, None)
+
+    def __delitem__(self, record_id):
+        # на место удалённой строки переносим последнюю
+        self.version += 1
+        row = self.rows.pop(record_id)
+        last = self.size - 1
+        self.bad_dates.pop(row, None)
+        if row != last:
+            for name in self.columns:
+                column = getattr(self, name)
+                column[row] = column[last]
+            self.descriptions[row] = self.descriptions[last]
+            if last in self.bad_dates:
+                self.bad_dates[row] = self.bad_dates.pop(last)
+            self.rows[int(self.ids[row])] = row
+        self.descriptions.pop()
+        self.size = last
+
+    def record(self, row):
+        day = int(self.days[row])
+        return self.record_type(int(self.ids[row]), float(self.amounts[row]), self.categories[self.codes[row]],
+                                self.bad_dates[row] if day == NO_DAY else day, self.descriptions[row])
+
+    def __getitem__(self, record_id):
+        return self.record(self.rows[record_id])
+
+    def get(self, record_id, default=None):
+        row = self.rows.get(record_id)
+        return default if row is None else self.record(row)
+
+    def __contains__(self, record_id):
+        return record_id in self.rows
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def values(self):
+        return RecordsView(self)
+
+    def as_variables(self):
+        """Колонки под именами полей записи для пакетных вычислений калькулятора."""
+        return {'id': self.ids[:self.size], 'amount': self.amounts[:self.size], 'day': self.days[:self.size]}
+
+    @property
+    def invalid(self):
+        return set(self.ids[:self.size][self.days[:self.size] == NO_DAY].tolist())
+
+    def _mask(self, start_day=None, end_day=None, category=None):
+        days = self.days[:self.size]
+        mask = days != NO_DAY
+        if start_day is not None:
+            mask &= days >= start_day
+        if end_day is not None:
+            mask &= days <= end_day
+        if category is not None:
+            code = self.category_codes.get(category)
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= self.codes[:self.size] == code
+        return mask
+
+    def select(self, start_day=None, end_day=None, category=None):
+        if self.on_scan is not None:
+            self.on_scan(self.size)
+        mask = self._mask(start_day, end_day, category)
+        order = np.argsort(self.days[:self.size][mask], kind='stable')
+        return self.ids[:self.size][mask][order].tolist()
+
+    def category_totals(self, start_day=None, end_day=None):
+        """{категория: (доходы, расходы)} за период, одним проходом bincount."""
+        mask = self._mask(start_day, end_day)
+        amounts = self.amounts[:self.size]
+        codes = self.codes[:self.size]
+        size = len(self.categories)
+        income = mask & (amounts >= 0)
+        expense = mask & (amounts < 0)
+        incomes = np.bincount(codes[income], weights=amounts[income], minlength=size)
+        expenses = np.bincount(codes[expense], weights=-amounts[expense], minlength=size)
+        counts = np.bincount(codes[mask], minlength=size)
+        return {self.categories[code]: (float(incomes[code]), float(expenses[code]))
+                for code in np.flatnonzero(counts).tolist()}
+
+    def report(self, start_day, end_day):
+        return build_report(self.category_totals(start_day, end_day))
+
+    def daily_totals(self):
+        """{день: {категория: (доходы, расходы)}}; суммы по дням и категориям - одним bincount."""
+        days = self.days[:self.size]
+        mask = days != NO_DAY
+        amounts = self.amounts[:self.size][mask]
+        size = max(len(self.categories), 1)
+        keys, groups = np.unique(days[mask].astype(np.int64) * size + self.codes[:self.size][mask],
+                                 return_inverse=True)
+        incomes = np.bincount(groups, weights=np.where(amounts >= 0, amounts, 0.0), minlength=len(keys))
+        expenses = np.bincount(groups, weights=np.where(amounts < 0, -amounts, 0.0), minlength=len(keys))
+        totals = {}
+        for key, income, expense in zip(keys.tolist(), incomes.tolist(), expenses.tolist()):
+            day, code = divmod(key, size)
+            totals.setdefault(day, {})[self.categories[code]] = (income, expense)
+        return totals
+
+
+class RecordsView:
+    """Аналог dict.values() для колонок: знает длину и собирает записи при обходе."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return self.columns.size
+
+    def __iter__(self):
+        return (self.columns.record(row) for row in range(self.columns.size))
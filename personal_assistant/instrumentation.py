@@ -0,0 +1,271 @@
+"""Сбор статистики производительности: времена операций менеджеров и калькулятора,
+счётчики загруженных и просмотренных записей, сохранений в хранилище и
+записанных байтов, cProfile и tracemalloc.
+
+Пока сбор выключен, код менеджеров не меняется и ничего не стоит: enable()
+подменяет методы классов обёртками с замером времени, disable() возвращает
+исходные.
+
+    python personal_assistant.py --stats [--profile] [--trace-memory]
+"""
+import cProfile
+import functools
+import io
+import math
+import os
+import pstats
+import time
+import tracemalloc
+
+import contact_index
+import finance_columns
+import ledger
+import note_search
+import sqlite_storage
+import storage
+import task_query
+
+# класс в модуле приложения -> методы, время которых меряется
+TARGETS = {
+    'NoteManager': ('load', 'save', 'create', 'update', 'delete', 'search_notes', 'save_search_index',
+                    'import_from_csv', 'export_to_csv'),
+    'TaskManager': ('load', 'save', 'create', 'update', 'delete', 'query', 'filter_tasks', 'overdue',
+                    'import_from_csv', 'export_to_csv'),
+    'ContactManager': ('load', 'save', 'create', 'update', 'delete', 'find_contact', 'find_contacts',
+                       'import_from_csv', 'export_to_csv'),
+    'FinanceManager': ('load', 'save', 'create', 'update', 'delete', 'filter_records',
+                       'category_totals', 'generate_report', 'import_from_csv', 'export_to_csv'),
+    'Calculator': ('evaluate', 'evaluate_batch', 'posterror'),
+}
+# индексы, через которые идут запросы, поиск и фильтры; сообщают, сколько записей просмотрели
+SCANNERS = (task_query.TaskIndex, note_search.NoteIndex, contact_index.ContactIndex, ledger.Ledger,
+            finance_columns.FinanceColumns)
+PERCENTILES = (0.5, 0.95, 0.99)
+# атрибута в классе не было - при выключении его нужно удалить
+MISSING = object()
+
+
+def process_written():
+    """Байты, переданные процессом в write() (wchar из /proc/self/io); None, если счётчика нет."""
+    try:
+        with open('/proc/self/io', 'rb') as file:
+            for line in file:
+                if line.startswith(b'wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def sqlite_size(db):
+    return sum(os.path.getsize(path) for path in (db.db_path, db.db_path + '-wal') if os.path.exists(path))
+
+
+class Histogram:
+    """Времена в логарифмических корзинах с шагом 2**(1/8) (около 9%): память не растёт
+    с числом вызовов, а перцентили точны до ширины корзины."""
+
+    STEPS = 8
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        key = int(math.log2(seconds * 1e9) * self.STEPS) if seconds > 1e-9 else 0
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попадает доля fraction вызовов, в секундах."""
+        rank = fraction * self.count
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return min(2 ** ((key + 1) / self.STEPS) / 1e9, self.max)
+        return self.max
+
+
+class Instrumentation:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.patches = []
+        self.started = None
+        self.profiler = None
+        self.profiling = False
+
+    @property
+    def enabled(self):
+        return bool(self.patches)
+
+    @property
+    def tracing_memory(self):
+        return tracemalloc.is_tracing()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def patch(self, owner, name, wrapper):
+        # метод может быть унаследован: возвращать нужно именно то, что лежало в классе
+        self.patches.append((owner, name, owner.__dict__.get(name, MISSING)))
+        setattr(owner, name, wrapper)
+
+    def timed(self, label, function):
+        histogram = self.histograms.setdefault(label, Histogram())
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(time.perf_counter() - started)
+        return wrapper
+
+    def enable(self, module, profile=False, memory=False):
+        """Включает замеры для классов из module (модуль personal_assistant)."""
+        if not self.enabled:
+            for class_name, methods in TARGETS.items():
+                cls = getattr(module, class_name)
+                for name in methods:
+                    self.patch(cls, name, self.timed(f'{class_name}.{name}', getattr(cls, name)))
+            self.patch_storage()
+            self.started = time.time()
+        if profile:
+            self.set_profile(True)
+        if memory:
+            self.set_memory(True)
+
+    def set_profile(self, on):
+        """cProfile на всю сессию; собранное сохраняется при выключении до reset()."""
+        if on:
+            self.profiler = self.profiler or cProfile.Profile()
+            self.profiler.enable()
+        elif self.profiler is not None:
+            self.profiler.disable()
+        self.profiling = on
+
+    def set_memory(self, on):
+        if on and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not on and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def patch_storage(self):
+        write = storage.atomic_write
+
+        def atomic_write(path, *args, **kwargs):
+            write(path, *args, **kwargs)
+            self.count('записано байт', os.path.getsize(path))
+        # note_search импортирует функцию по имени, поэтому подменять нужно в обоих модулях
+        for module in (storage, note_search):
+            self.patches.append((module, 'atomic_write', write))
+            module.atomic_write = atomic_write
+
+        commit = storage.JournalStorage.commit
+
+        def journal_commit(journal, *args, **kwargs):
+            before = os.path.getsize(journal.log_path) if os.path.exists(journal.log_path) else 0
+            commit(journal, *args, **kwargs)
+            after = os.path.getsize(journal.log_path) if os.path.exists(journal.log_path) else 0
+            # после сворачивания журнал пуст, а снимок уже посчитан в atomic_write
+            self.count('записано байт', max(after - before, 0))
+        self.patch(storage.JournalStorage, 'commit', journal_commit)
+
+        for name in ('save', 'commit'):
+            write_db = getattr(sqlite_storage.SqliteStorage, name)
+
+            def sqlite_write(db, *args, write_db=write_db, **kwargs):
+                # SQLite пишет страницы в WAL и переносит их в базу сам, а WAL после переноса
+                # используется заново, поэтому по размеру файлов запись видна не всегда
+                before, size = process_written(), sqlite_size(db)
+                write_db(db, *args, **kwargs)
+                after = process_written()
+                if before is not None and after is not None:
+                    self.count('записано байт', after - before)
+                else:
+                    self.count('записано байт', max(sqlite_size(db) - size, 0))
+            self.patch(sqlite_storage.SqliteStorage, name, sqlite_write)
+
+        bump_version = storage.Storage.bump_version
+
+        def counted_bump(source):
+            # каждая запись в хранилище - сохранение целиком, запись в журнал или
+            # транзакция SQLite - заканчивается ровно одним увеличением версии
+            bump_version(source)
+            self.count('сохранений')
+        self.patch(storage.Storage, 'bump_version', counted_bump)
+
+        for cls in (storage.Storage, storage.SnapshotStorage):
+            load_objects = cls.load_objects
+
+            def counted(source, factory, load_objects=load_objects):
+                records = load_objects(source, factory)
+                self.count('загружено записей', len(records))
+                return records
+            self.patch(cls, 'load_objects', counted)
+
+        def scanned(index, amount):
+            self.count('просмотрено записей', amount)
+        for cls in SCANNERS:
+            self.patch(cls, 'on_scan', scanned)
+
+    def disable(self):
+        for owner, name, original in reversed(self.patches):
+            if original is MISSING:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.patches = []
+        self.set_profile(False)
+        self.set_memory(False)
+
+    def reset(self):
+        self.histograms = {label: Histogram() for label in self.histograms}
+        self.counters = {}
+        self.started = time.time() if self.enabled else None
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler = None
+            if self.profiling:
+                self.set_profile(True)
+        if tracemalloc.is_tracing():
+            tracemalloc.clear_traces()
+
+    def report(self, top=15):
+        """Текст со временами операций (p50/p95/p99), счётчиками и, если включены, cProfile и tracemalloc."""
+        lines = [f"{'операция':<36} {'вызовов':>8} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'всего с':>9}"]
+        for label, histogram in sorted(self.histograms.items(), key=lambda item: -item[1].total):
+            if not histogram.count:
+                continue
+            p50, p95, p99 = (histogram.percentile(fraction) * 1000 for fraction in PERCENTILES)
+            lines.append(f'{label:<36} {histogram.count:>8} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f} '
+                         f'{histogram.total:>9.3f}')
+        if len(lines) == 1:
+            lines.append('Операций пока не было.')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{name}: {value}')
+        if self.started is not None:
+            minutes = max(time.time() - self.started, 1) / 60
+            lines.append(f"сохранений в минуту: {self.counters.get('сохранений', 0) / minutes:.1f}")
+        if self.profiler is not None:
+            text = io.StringIO()
+            pstats.Stats(self.profiler, stream=text).sort_stats('cumulative').print_stats(top)
+            lines.append(text.getvalue())
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f'память: сейчас {current / 2 ** 20:.1f} МБ, пик {peak / 2 ** 20:.1f} МБ')
+            for stat in tracemalloc.take_snapshot().statistics('lineno')[:top]:
+                lines.append(f'  {stat}')
+        return '\n'.join(lines)
+
+
+# одна статистика на процесс, как и менеджеры в get_manager
+stats = Instrumentation()
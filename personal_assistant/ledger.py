@@ -0,0 +1,262 @@
+import bisect
+import math
+import re
+from datetime import date
+from functools import lru_cache
+
+DAY_PATTERN = re.compile(r'[0-9]{2}-[0-9]{2}-[0-9]{4}')
+CLOCK_PATTERN = re.compile(r'([01][0-9]|2[0-3]):([0-5][0-9]):([0-5][0-9])')
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+# различных дат в данных немного, поэтому разбор и форматирование кэшируются
+@lru_cache(maxsize=1 << 16)
+def parse_day(date_str):
+    """'ДД-ММ-ГГГГ' -> порядковый номер дня (быстрее, чем datetime.strptime)."""
+    try:
+        day, month, year = date_str.split('-')
+        return date(int(year), int(month), int(day)).toordinal()
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f'Неверный формат даты: {date_str}') from None
+
+
+@lru_cache(maxsize=1 << 16)
+def format_day(day):
+    """Порядковый номер дня -> 'ДД-ММ-ГГГГ'."""
+    value = date.fromordinal(day)
+    return f'{value.day:02d}-{value.month:02d}-{value.year:04d}'
+
+
+@lru_cache(maxsize=1 << 16)
+def exact_day(date_str):
+    """Номер дня, только если строка ровно 'ДД-ММ-ГГГГ' и обратно получится такой же."""
+    if DAY_PATTERN.fullmatch(date_str):
+        try:
+            return parse_day(date_str)
+        except ValueError:
+            pass
+    return None
+
+
+@lru_cache(maxsize=1 << 17)
+def exact_clock(clock_str):
+    """'ЧЧ:ММ:СС' -> секунды от начала суток или None."""
+    match = CLOCK_PATTERN.fullmatch(clock_str)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def pack_day(value):
+    """Дата для хранения в записи: номер дня вместо строки 'ДД-ММ-ГГГГ'.
+
+    Строки в другом виде и пустые значения остаются как есть, чтобы при
+    сохранении вернуться без изменений.
+    """
+    if isinstance(value, str):
+        day = exact_day(value) if value else None
+        return value if day is None else day
+    if hasattr(value, 'toordinal'):
+        return value.toordinal()
+    return value
+
+
+def unpack_day(value):
+    """Обратно к строке 'ДД-ММ-ГГГГ' для вывода и сохранения."""
+    return format_day(value) if isinstance(value, int) else value
+
+
+def value_day(value):
+    """Номер дня упакованной даты или None, если дата пустая или неверная."""
+    if isinstance(value, int):
+        return value
+    try:
+        return parse_day(value) if value else None
+    except ValueError:
+        return None
+
+
+def pack_timestamp(value):
+    """'ДД-ММ-ГГГГ ЧЧ:ММ:СС' -> секунды от 01-01-1970 (без часового пояса).
+
+    Строка в другом виде остаётся как есть.
+    """
+    if isinstance(value, int):
+        return value
+    # дата и время разбираются отдельно: у обеих частей мало различных значений, и они кэшируются
+    if isinstance(value, str) and len(value) == 19 and value[10] == ' ':
+        day = exact_day(value[:10])
+        seconds = exact_clock(value[11:])
+        if day is not None and seconds is not None:
+            return (day - EPOCH_DAY) * 86400 + seconds
+    return value
+
+
+def unpack_timestamp(value):
+    if not isinstance(value, int):
+        return value
+    day, seconds = divmod(value, 86400)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{format_day(day + EPOCH_DAY)} {hours:02d}:{minutes:02d}:{seconds:02d}'
+
+
+def to_cents(amount):
+    return round(amount * 100)
+
+
+def build_report(totals):
+    """Данные отчёта generate_report из сумм {категория: (доходы, расходы)}."""
+    report_data = {'income': 0, 'expenses': 0, 'income_items': {}, 'expense_items': {}}
+    for category, (income, expense) in totals.items():
+        if income:
+            report_data['income_items'][category] = income
+        if expense:
+            report_data['expense_items'][category] = expense
+    # итоги без ошибки округления, накопленной от порядка сложения
+    report_data['income'] = math.fsum(report_data['income_items'].values())
+    report_data['expenses'] = math.fsum(report_data['expense_items'].values())
+    return report_data
+
+
+class Ledger:
+    """Индекс финансовых записей по дате.
+
+    Хранит записи, отсортированные по дню, суммы доходов и расходов по дням
+    и категориям, и префиксные суммы по дням для отчётов за любой период.
+    Префиксные суммы - целые копейки: разность больших дробных сумм дала бы
+    в отчёте за короткий период ошибку, растущую с размером леджера.
+    """
+
+    # on_scan(ledger, число просмотренных записей) - для статистики (instrumentation.py)
+    on_scan = None
+
+    def __init__(self):
+        self.keys = []
+        self.entries = {}
+        self.invalid = set()
+        self.days = {}
+        # число записей в каждой корзине (день, категория): пустая корзина удаляется,
+        # а не остаётся с остатком от вычитания дробных сумм
+        self.counts = {}
+        self.prefix_days = []
+        self.prefix = {}
+        # растёт при каждом изменении; по нему finance_analytics узнаёт, что кэш устарел
+        self.version = 0
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        self.version += 1
+        new_keys = []
+        for record in records:
+            try:
+                day = record.day
+                if day is None:
+                    raise ValueError(record.date)
+            except ValueError:
+                self.invalid.add(record.id)
+                continue
+            self.entries[record.id] = (day, record.category)
+            new_keys.append((day, record.id))
+            income, expense = (record.amount, 0.0) if record.amount >= 0 else (0.0, -record.amount)
+            bucket = self.days.setdefault(day, {}).setdefault(record.category, [0.0, 0.0])
+            bucket[0] += income
+            bucket[1] += expense
+            key = (day, record.category)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self._prefix_add(day, record.category, income, expense)
+        if len(new_keys) == 1:
+            bisect.insort(self.keys, new_keys[0])
+        elif new_keys:
+            self.keys.extend(new_keys)
+            self.keys.sort()
+
+    def remove(self, record):
+        self.version += 1
+        self.invalid.discard(record.id)
+        entry = self.entries.pop(record.id, None)
+        if entry is None:
+            return
+        day, category = entry
+        i = bisect.bisect_left(self.keys, (day, record.id))
+        del self.keys[i]
+        key = (day, category)
+        self.counts[key] -= 1
+        if self.counts[key]:
+            bucket = self.days[day][category]
+            if record.amount >= 0:
+                bucket[0] -= record.amount
+            else:
+                bucket[1] += record.amount
+        else:
+            del self.counts[key]
+            del self.days[day][category]
+            if not self.days[day]:
+                del self.days[day]
+        # префиксные суммы пересчитаются при следующем отчёте, уже без пустых корзин
+        self.prefix_days = None
+
+    def _prefix_add(self, day, category, income, expense):
+        if self.prefix_days is None:
+            return
+        if self.prefix_days and day < self.prefix_days[-1]:
+            # запись задним числом - префиксные суммы пересчитаются при следующем отчёте
+            self.prefix_days = None
+            return
+        if not self.prefix_days or day > self.prefix_days[-1]:
+            self.prefix_days.append(day)
+            for incomes, expenses in self.prefix.values():
+                incomes.append(incomes[-1])
+                expenses.append(expenses[-1])
+        sums = self.prefix.get(category)
+        if sums is None:
+            size = len(self.prefix_days) + 1
+            sums = self.prefix[category] = ([0] * size, [0] * size)
+        sums[0][-1] += to_cents(income)
+        sums[1][-1] += to_cents(expense)
+
+    def _build_prefix(self):
+        self.prefix_days = sorted(self.days)
+        categories = {category for bucket in self.days.values() for category in bucket}
+        self.prefix = {}
+        for category in categories:
+            incomes, expenses = [0], [0]
+            for day in self.prefix_days:
+                income, expense = self.days[day].get(category, (0.0, 0.0))
+                incomes.append(incomes[-1] + to_cents(income))
+                expenses.append(expenses[-1] + to_cents(expense))
+            self.prefix[category] = (incomes, expenses)
+
+    def select(self, start_day=None, end_day=None, category=None):
+        """id записей за период (границы включительно) в порядке дат."""
+        lo = 0 if start_day is None else bisect.bisect_left(self.keys, (start_day,))
+        hi = len(self.keys) if end_day is None else bisect.bisect_left(self.keys, (end_day + 1,))
+        if self.on_scan is not None:
+            self.on_scan(hi - lo)
+        if category is None:
+            return [record_id for day, record_id in self.keys[lo:hi]]
+        return [record_id for day, record_id in self.keys[lo:hi] if self.entries[record_id][1] == category]
+
+    def category_totals(self, start_day=None, end_day=None):
+        """{категория: (доходы, расходы)} за период."""
+        if self.prefix_days is None:
+            self._build_prefix()
+        lo = 0 if start_day is None else bisect.bisect_left(self.prefix_days, start_day)
+        hi = len(self.prefix_days) if end_day is None else bisect.bisect_right(self.prefix_days, end_day)
+        totals = {}
+        for category, (incomes, expenses) in self.prefix.items():
+            income = incomes[hi] - incomes[lo]
+            expense = expenses[hi] - expenses[lo]
+            if income or expense:
+                totals[category] = (income / 100, expense / 100)
+        return totals
+
+    def report(self, start_day, end_day):
+        return build_report(self.category_totals(start_day, end_day))
+
+    def daily_totals(self):
+        """{день: {категория: (доходы, расходы)}} по всем записям с верной датой; только для чтения."""
+        return self.days
@@ -0,0 +1,194 @@
+import json
+import math
+import re
+import zlib
+
+from storage import atomic_write
+
+WORD_RE = re.compile(r'\w+')
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+CYRILLIC_RE = re.compile('[а-я]')
+
+# окончания для лёгкого стемминга, длинные проверяются первыми
+ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'иях', 'ях', 'ах', 'ией', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ом', 'ем', 'ам',
+    'ям', 'ых', 'их', 'ия', 'ию', 'ться', 'ть', 'ет', 'ут', 'ют', 'ит', 'ат', 'ят', 'ешь', 'ишь',
+    'ла', 'ло', 'ли', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+], key=len, reverse=True)
+MIN_STEM = 3
+
+OR_WORDS = {'OR', 'ИЛИ'}
+AND_WORDS = {'AND', 'И'}
+
+
+def stem(word):
+    if not CYRILLIC_RE.search(word):
+        return word
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text, use_stem=True):
+    words = WORD_RE.findall(text.casefold().replace('ё', 'е'))
+    return [stem(word) for word in words] if use_stem else words
+
+
+def corpus_signature(notes):
+    """Контрольная сумма заметок: по ней видно, что сохранённый индекс устарел."""
+    crc = 0
+    for note in notes:
+        crc = zlib.crc32(f'{note.id}\0{note.timestamp}\0{note.title}\0{note.content}\0'.encode(), crc)
+    return crc
+
+
+class NoteIndex:
+    """Инвертированный индекс по заголовку и тексту заметок с ранжированием BM25."""
+
+    k1 = 1.2
+    b = 0.75
+    # on_scan(index, число оценённых заметок) - для статистики (instrumentation.py)
+    on_scan = None
+
+    def __init__(self, use_stem=True):
+        self.use_stem = use_stem
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_len = {}
+        self.total_len = 0
+
+    def _tokens(self, note):
+        # заголовок отделён от текста, чтобы фраза не склеивалась через границу
+        title = tokenize(note.title, self.use_stem)
+        return title + [None] + tokenize(note.content, self.use_stem)
+
+    def add(self, note):
+        tokens = self._tokens(note)
+        for position, term in enumerate(tokens):
+            if term is not None:
+                self.postings.setdefault(term, {}).setdefault(note.id, []).append(position)
+        self.doc_terms[note.id] = set(tokens) - {None}
+        self.doc_len[note.id] = len(tokens) - 1
+        self.total_len += len(tokens) - 1
+
+    def remove(self, note_id):
+        self.total_len -= self.doc_len.pop(note_id, 0)
+        for term in self.doc_terms.pop(note_id, ()):
+            docs = self.postings[term]
+            del docs[note_id]
+            if not docs:
+                del self.postings[term]
+
+    def update(self, note):
+        self.remove(note.id)
+        self.add(note)
+
+    def parse(self, query):
+        """Запрос -> список групп через OR; группа - список терминов и фраз (кортежей), все обязательны."""
+        groups = [[]]
+        for phrase, word in QUERY_RE.findall(query):
+            if word in OR_WORDS:
+                groups.append([])
+            elif word in AND_WORDS:
+                continue
+            elif phrase:
+                terms = tuple(tokenize(phrase, self.use_stem))
+                if len(terms) > 1:
+                    groups[-1].append(terms)
+                else:
+                    groups[-1].extend(terms)
+            else:
+                groups[-1].extend(tokenize(word, self.use_stem))
+        return [group for group in groups if group]
+
+    def _match(self, group):
+        words = []
+        for item in group:
+            words.extend(item if isinstance(item, tuple) else (item,))
+        if any(word not in self.postings for word in words):
+            return set()
+        rarest = min(words, key=lambda word: len(self.postings[word]))
+        docs = set(self.postings[rarest])
+        for word in words:
+            docs.intersection_update(self.postings[word])
+            if not docs:
+                return docs
+        for phrase in group:
+            if isinstance(phrase, tuple):
+                docs = {doc_id for doc_id in docs if self._has_phrase(doc_id, phrase)}
+        return docs
+
+    def _has_phrase(self, doc_id, phrase):
+        starts = set(self.postings[phrase[0]][doc_id])
+        for offset, word in enumerate(phrase[1:], 1):
+            positions = self.postings[word][doc_id]
+            starts &= {position - offset for position in positions}
+            if not starts:
+                return False
+        return True
+
+    def score(self, doc_id, words):
+        n = len(self.doc_len)
+        avg_len = self.total_len / n if n else 0
+        length = self.doc_len[doc_id]
+        result = 0.0
+        for word in words:
+            docs = self.postings.get(word)
+            if not docs or doc_id not in docs:
+                continue
+            tf = len(docs[doc_id])
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            result += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / (avg_len or 1)))
+        return result
+
+    def search(self, query, limit=20):
+        """Список пар (id, оценка) по убыванию оценки BM25."""
+        groups = self.parse(query)
+        docs = set()
+        words = set()
+        for group in groups:
+            docs |= self._match(group)
+            for item in group:
+                words.update(item if isinstance(item, tuple) else (item,))
+        if self.on_scan is not None:
+            self.on_scan(len(docs))
+        ranked = sorted(((doc_id, self.score(doc_id, words)) for doc_id in docs), key=lambda pair: (-pair[1], pair[0]))
+        return ranked[:limit]
+
+    def save(self, path, signature):
+        data = {
+            'signature': signature,
+            'stem': self.use_stem,
+            'postings': {term: list(docs.items()) for term, docs in self.postings.items()},
+            'doc_len': list(self.doc_len.items()),
+        }
+        atomic_write(path, lambda file: json.dump(data, file, ensure_ascii=False, separators=(',', ':')))
+
+    @classmethod
+    def load(cls, path, signature, use_stem=True):
+        """Индекс из файла или None, если файла нет или он не соответствует заметкам."""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if data.get('signature') != signature or data.get('stem') != use_stem:
+            return None
+        index = cls(use_stem)
+        index.postings = {term: dict((doc_id, positions) for doc_id, positions in docs)
+                          for term, docs in data['postings'].items()}
+        index.doc_len = dict((doc_id, length) for doc_id, length in data['doc_len'])
+        index.total_len = sum(index.doc_len.values())
+        for term, docs in index.postings.items():
+            for doc_id in docs:
+                index.doc_terms.setdefault(doc_id, set()).add(term)
+        return index
+
+    @classmethod
+    def build(cls, notes, use_stem=True):
+        index = cls(use_stem)
+        for note in notes:
+            index.add(note)
+        return index
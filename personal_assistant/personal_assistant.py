@@ -1,17 +1,49 @@
-import csv
+import glob
 import os
-from datetime import datetime
+import sys
+from datetime import date, datetime
 import json
 
+from changefeed import ChangeFeed
+from contact_index import ContactIndex
+from csv_export import export_csv
+from csv_import import CHUNK_SIZE, stream_import
+from expression import compile_expression
+from finance_analytics import FinanceAnalytics, to_csv
+from finance_columns import FinanceColumns
+from ledger import Ledger, pack_day, pack_timestamp, parse_day, unpack_day, unpack_timestamp, value_day
+from note_search import NoteIndex, corpus_signature
+from parallel_import import new_records, parse_files
+from sqlite_storage import SqlLedger
+from storage import IdAllocator, SaveGroup, make_storage
+from task_query import SQL_ORDER, TaskIndex, due_day
+
 TIMESTAMP_FORMAT = '%d-%m-%Y %H:%M:%S'
+# 'json' - переписывать файл целиком, 'journal' - дописывать изменения в журнал,
+# 'sqlite' - хранить всё в assistant.db (перенос данных: python sqlite_storage.py),
+# 'snapshot' - двоичный снимок по колонкам рядом с JSON-файлом (быстрая загрузка больших файлов).
+# Кодек JSON задаёт PA_CODEC: 'json', 'orjson' или 'auto' (см. serialization.py)
+STORAGE_MODE = os.environ.get('PA_STORAGE', 'json')
 
 
 class Note:
+    FIELDS = ('id', 'title', 'content', 'timestamp')
+    # время хранится числом секунд и превращается в строку только при выводе
+    __slots__ = ('id', 'title', 'content', '_timestamp')
+
     def __init__(self, id, title, content, timestamp=None):
         self.id = id
         self.title = title
         self.content = content
-        self.timestamp = timestamp if timestamp else datetime.now().strftime(TIMESTAMP_FORMAT)
+        self._timestamp = pack_timestamp(timestamp if timestamp else datetime.now().strftime(TIMESTAMP_FORMAT))
+
+    @property
+    def timestamp(self):
+        return unpack_timestamp(self._timestamp)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self._timestamp = pack_timestamp(value)
 
     def __repr__(self):
         return f'Note(id: {self.id}, title: {self.title}, content: {self.content}, timestamp: {self.timestamp})'
@@ -24,44 +56,219 @@ class Note:
             'timestamp': self.timestamp
         }
 
+    def csv_row(self):
+        return self.id, self.title, self.content, self.timestamp
 
-class NoteManager:
-    def __init__(self, notes_file='notes.json'):
-        self.notes_file = notes_file
-        self.load_notes()
+    @classmethod
+    def from_csv_row(cls, row):
+        return cls(int(row['id']), row['title'], row['content'], row['timestamp'])
+
+
+class RecordManager:
+    """Общее для менеджеров записей: хранилище, блокировка, сохранение изменений и импорт.
+
+    Подкласс задаёт класс записей (record_class), имя словаря с записями
+    (records_attribute), вид данных (kind - имя таблицы и ключ в
+    parallel_import.FIELDS), а также методы load() и insert(records).
+    """
+
+    record_class = None
+    records_attribute = None
+    kind = None
+    # «Импортировано заметок: 3»
+    plural = 'записей'
+
+    def __init__(self, data_file, storage=None):
+        self.data_file = data_file
+        self.storage = storage or make_storage(data_file, STORAGE_MODE, self.kind)
+        self.pending = None
+        self.changes = ChangeFeed()
 
-    def load_notes(self):
+    @property
+    def items(self):
+        return getattr(self, self.records_attribute)
+
+    def read_records(self):
+        """Записи из хранилища; пустой список, если файла нет или он повреждён."""
         try:
-            with open(self.notes_file, 'r') as file:
-                try:
-                    self.notes = [Note(**note_data) for note_data in json.load(file)]
-                except json.JSONDecodeError:
-                    print('Неверный формат файла notes.json')
-                    self.notes = []
+            return self.storage.load_objects(self.record_class)
+        except json.JSONDecodeError:
+            print(f'Неверный формат файла {os.path.basename(self.data_file)}')
         except FileNotFoundError:
             print('Файл не существует')
-            self.notes = []
+        return []
+
+    def transaction(self):
+        """Блокировка на время изменения; если данные изменил другой процесс, они сначала перечитываются."""
+        return self.storage.transaction(self.load)
+
+    def refresh(self):
+        self.storage.sync(self.load)
+
+    def batch(self):
+        """Изменения внутри with manager.batch() сохраняются одной записью в конце."""
+        return SaveGroup(self, self.save)
+
+    def rows(self):
+        return [record.to_dict() for record in self.items.values()]
+
+    def save(self, changed=(), deleted=()):
+        if self.pending is not None:
+            self.pending.add(changed, deleted)
+            return
+        self.ids.save()
+        if changed or deleted:
+            rows = [record.to_dict() for record in changed]
+            self.storage.commit(self.rows, rows, deleted)
+            self.changes.add(rows, deleted)
+        else:
+            self.storage.save(self.rows())
+
+    def import_records(self, records):
+        """Добавляет импортированные записи; возвращает (изменённые и новые записи, число слитых с сохранёнными)."""
+        self.insert(records)
+        return records, 0
+
+    def import_chunk(self, records, **options):
+        with self.transaction():
+            changed, merged = self.import_records(records, **options)
+            self.save(changed=changed)
+
+    def stream_csv(self, filepath, chunk_size=CHUNK_SIZE, **options):
+        """Потоковый импорт CSV порциями (csv_import.stream_import). Если хранилище при каждом
+        сохранении переписывает файл целиком, порции копятся в группе сохранения и
+        записываются реже, чем приходят, иначе импорт большого файла был бы квадратичным."""
+        convert = self.record_class.from_csv_row
+
+        def commit(records):
+            self.import_chunk(records, **options)
+        if not self.storage.rewrites:
+            return stream_import(filepath, convert, commit, chunk_size)
+        with self.batch() as group:
+            return stream_import(filepath, convert, commit, chunk_size, flush=group.flush)
+
+    def import_from_csv_files(self, paths, workers=None, **options):
+        """Импорт нескольких CSV-файлов (список или шаблон пути) в пуле процессов одним изменением."""
+        try:
+            shards = parse_files(paths, self.kind, workers)
+            with self.transaction():
+                records, skipped = new_records(shards, self.record_class, self.items.values())
+                changed, merged = self.import_records(records, **options)
+                self.save(changed=changed)
+            message = f'Импортировано {self.plural}: {len(records) - merged}, пропущено повторов: {skipped}'
+            if merged:
+                message += f', слито с похожими: {merged}'
+            print(message)
+        except FileNotFoundError as e:
+            print(f'Файл CSV не найден: {e}')
+        except Exception as e:
+            print(f'Ошибка при импорте из CSV: {e}')
+
 
-    def save_note(self):
-        with open(self.notes_file, 'w') as f:
-            json.dump([note.to_dict() for note in self.notes], f, indent=4)
+class NoteManager(RecordManager):
+    record_class = Note
+    records_attribute = 'notes'
+    kind = 'notes'
+    plural = 'заметок'
+
+    def __init__(self, notes_file='notes.json', storage=None, use_stem=True):
+        super().__init__(notes_file, storage)
+        self.notes_file = notes_file
+        self.index_file = notes_file + '.idx'
+        self.use_stem = use_stem
+        self.load()
+
+    def load(self):
+        loaded = self.read_records()
+        self.notes = {}
+        self.search_index = None
+        self.changes.reset()
+        self.ids = IdAllocator(self.storage, [note.id for note in loaded])
+        self.insert(loaded)
+        self.open_search_index()
+
+    def insert(self, notes):
+        for note in notes:
+            note.id = self.ids.take(note.id, self.notes)
+            self.notes[note.id] = note
+            if self.search_index is not None:
+                self.search_index.add(note)
+                self.index_dirty = True
+
+    def open_search_index(self):
+        signature = corpus_signature(self.notes.values())
+        self.search_index = NoteIndex.load(self.index_file, signature, self.use_stem)
+        self.index_dirty = self.search_index is None
+        if self.search_index is None:
+            self.search_index = NoteIndex.build(self.notes.values(), self.use_stem)
+            self.save_search_index()
+
+    def save_search_index(self):
+        if self.index_dirty:
+            self.search_index.save(self.index_file, corpus_signature(self.notes.values()))
+            self.index_dirty = False
+
+    # прежние имена методов
+    load_notes = load
+    insert_notes = insert
+    save_note = RecordManager.save
 
     def create_note(self):
         title = input('Введите заголовок заметки: ')
         if not title:
             return 'Заголовок не может быть пустым.'
         content = input('Введите содержимое заметки: ')
-        new_id = len(self.notes) + 1 if self.notes else 1
-        new_note = Note(new_id, title, content)
-        self.notes.append(new_note)
-        self.save_note()
+        self.create(title, content)
         return 'Заметка создана.'
 
+    def create(self, title, content=''):
+        """Создаёт заметку без вопросов пользователю и возвращает её."""
+        if not title:
+            raise ValueError('Заголовок не может быть пустым.')
+        with self.transaction():
+            note = Note(self.ids.take(), title, content)
+            self.notes[note.id] = note
+            self.search_index.add(note)
+            self.index_dirty = True
+            self.save(changed=[note])
+        return note
+
+    def update(self, note_id, title=None, content=None):
+        """Меняет переданные поля заметки; None, если заметки нет."""
+        with self.transaction():
+            note = self.find_note(note_id)
+            if not note:
+                return None
+            title = title or note.title
+            content = content or note.content
+            # ничего не изменилось - не пишем файл и не трогаем дату
+            if title == note.title and content == note.content:
+                return note
+            note.title = title
+            note.content = content
+            note.timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+            self.search_index.update(note)
+            self.index_dirty = True
+            self.save(changed=[note])
+        return note
+
+    def delete(self, note_id):
+        """Удаляет заметку; False, если её нет."""
+        with self.transaction():
+            note = self.find_note(note_id)
+            if not note:
+                return False
+            del self.notes[note.id]
+            self.search_index.remove(note.id)
+            self.index_dirty = True
+            self.save(deleted=[note.id])
+        return True
+
     def list_notes(self):
         if not self.notes:
             print('Список заметок пуст.')
             return
-        for note in self.notes:
+        for note in self.notes.values():
             print(f'ID: {note.id},\nЗаголовок: {note.title}, \nДата: {note.timestamp}\n ')
 
     def view_note(self):
@@ -75,61 +282,69 @@ class NoteManager:
     def edit_note(self):
         note_id = int(input("Введите id заметки: "))
         note = self.find_note(note_id)
-        if note:
-            note.title = input(f'Новый заголовок ({note.title}):') or note.title
-            note.content = input(f'Новое содержимое ({note.content}):') or note.content
-            note.timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
-            self.save_note()
+        if not note:
+            print("Заметка не найдена.")
+            return
+        title = input(f'Новый заголовок ({note.title}):')
+        content = input(f'Новое содержимое ({note.content}):')
+        # пока вводили, заметку мог удалить другой процесс
+        if self.update(note_id, title, content):
             print("Заметка обновлена.")
         else:
             print("Заметка не найдена.")
 
     def delete_note(self):
         note_id = int(input("Введите id заметки: "))
-        note = self.find_note(note_id)
-        if note:
-            self.notes.remove(note)
-            self.save_note()
+        if self.delete(note_id):
             print('Заметка удалена.')
         else:
             print("Заметка не найдена.")
 
     def find_note(self, note_id):
-        for note in self.notes:
-            if note.id == note_id:
-                return note
-        return None
+        return self.notes.get(note_id)
+
+    def search_notes(self, query, limit=20):
+        """Заметки по запросу, самые релевантные первыми.
+
+        Слова через пробел должны встречаться все, OR/ИЛИ объединяет варианты,
+        текст в кавычках ищется как фраза.
+        """
+        return [self.notes[note_id] for note_id, score in self.search_index.search(query, limit)]
+
+    def search_and_show_notes(self):
+        notes = self.search_notes(input("Введите поисковый запрос: "))
+        if not notes:
+            print("Заметки не найдены.")
+        for note in notes:
+            print(f'ID: {note.id},\nЗаголовок: {note.title}, \nДата: {note.timestamp}\n ')
 
-    def import_from_csv(self, filepath):
+    def import_from_csv(self, filepath, chunk_size=CHUNK_SIZE):
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    self.notes.append(Note(int(row['id']), row['title'], row['content'], row['timestamp']))
-            self.save_note()
+            self.stream_csv(filepath, chunk_size)
             print('Данные импортированы из CSV')
         except FileNotFoundError:
             print('Файл CSV не найден.')
         except Exception as e:
             print(f'Ошибка при импорте из CSV: {e}')
+        finally:
+            self.save_search_index()
 
-    def export_to_csv(self, filepath):
+    def import_from_csv_files(self, paths, workers=None):
+        super().import_from_csv_files(paths, workers)
+        self.save_search_index()
+
+    def export_to_csv(self, filepath, compression=None):
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file)
-                writer.writerow(['id', 'title', 'content', 'timestamp'])
-                for note in self.notes:
-                    writer.writerow([note.id, note.title, note.content, note.timestamp])
+            export_csv(filepath, Note.FIELDS, (note.csv_row() for note in self.notes.values()), compression)
             print('Данные экспортированы в CSV.')
         except Exception as e:
             print(f'Ошибка при экспорте в CSV: {e}')
 
 
-manager = NoteManager()
-
-
 def note_manager():
+    manager = get_manager('manager')
     while True:
+        manager.refresh()
         action = input("Выберите действие:\n"
                        "1. Создать заметку\n"
                        "2. Просмотреть список заметок\n"
@@ -138,6 +353,7 @@ def note_manager():
                        "5. Удалить заметку\n"
                        "6. Импорт из CSV\n"
                        "7. Экспорт в CSV\n"
+                       "8. Поиск заметок\n"
                        "0. Выход\n")
 
         if action == '1':
@@ -151,12 +367,15 @@ def note_manager():
         elif action == '5':
             manager.delete_note()
         elif action == '6':
-            filepath = input("Введите путь к CSV-файлу для импорта: ")
-            manager.import_from_csv(filepath)
+            filepath = input("Введите путь к CSV-файлу для импорта (несколько файлов - шаблоном или через ';'): ")
+            import_csv(manager, filepath)
         elif action == '7':
             filepath = input("Введите путь к CSV-файлу для экспорта: ")
             manager.export_to_csv(filepath)
+        elif action == '8':
+            manager.search_and_show_notes()
         elif action == '0':
+            manager.save_search_index()
             break
         else:
             print("Неверное действие.")
@@ -166,13 +385,39 @@ DATE_FORMAT = '%d-%m-%Y'
 
 
 class Task:
+    FIELDS = ('id', 'title', 'description', 'done', 'priority', 'due_date')
+    # срок хранится номером дня, приоритет - одной общей строкой на все задачи
+    __slots__ = ('id', 'title', 'description', 'done', '_priority', '_due')
+
     def __init__(self, id, title, description="", done=False, priority="Средний", due_date=None):
         self.id = id
         self.title = title
         self.description = description
         self.done = done
-        self.priority = priority
-        self.due_date = due_date
+        # при загрузке атрибуты заполняются напрямую, без свойств
+        self._priority = sys.intern(priority) if isinstance(priority, str) else priority
+        self._due = pack_day(due_date)
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @priority.setter
+    def priority(self, value):
+        self._priority = sys.intern(value) if isinstance(value, str) else value
+
+    @property
+    def due_date(self):
+        return unpack_day(self._due)
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due = pack_day(value)
+
+    @property
+    def due_day(self):
+        """Срок как порядковый номер дня или None."""
+        return value_day(self._due)
 
     def __repr__(self):
         return f"Task(id={self.id}, title='{self.title}', done={self.done}, priority='{self.priority}', due_date='{self.due_date}')"
@@ -187,27 +432,57 @@ class Task:
             "due_date": self.due_date
         }
 
+    def csv_row(self):
+        return self.id, self.title, self.description, self.done, self.priority, self.due_date
 
-class TaskManager:
-    def __init__(self, tasks_file='tasks.json'):
-        self.tasks_file = tasks_file
-        self.load_task()
+    @classmethod
+    def from_csv_row(cls, row):
+        return cls(int(row['id']), row['title'], row['description'], row['done'] == 'True', row['priority'],
+                   row['due_date'])
 
-    def load_task(self):
-        try:
-            with open(self.tasks_file, 'r') as file:
-                try:
-                    self.tasks = [Task(**task_data) for task_data in json.load(file)]
-                except json.JSONDecodeError:
-                    print('Неверный формат файла tasks.json')
-                    self.tasks = []
-        except FileNotFoundError:
-            print('Файл не существует')
-            self.tasks = []
 
-    def save_tasks(self):
-        with open(self.tasks_file, 'w', encoding='utf-8') as f:
-            json.dump([task.to_dict() for task in self.tasks], f, indent=4)
+class TaskManager(RecordManager):
+    record_class = Task
+    records_attribute = 'tasks'
+    kind = 'tasks'
+    plural = 'задач'
+
+    def __init__(self, tasks_file='tasks.json', storage=None):
+        super().__init__(tasks_file, storage)
+        self.tasks_file = tasks_file
+        # подписчики на изменения задач: listener(событие 'put' или 'delete', задача)
+        self.listeners = []
+        self.tasks = {}
+        self.load()
+
+    def load(self):
+        loaded = self.read_records()
+        # при повторной загрузке подписчики забывают старые задачи
+        for task in self.tasks.values():
+            self.notify('delete', task)
+        self.tasks = {}
+        self.index = TaskIndex()
+        self.changes.reset()
+        self.ids = IdAllocator(self.storage, [task.id for task in loaded])
+        self.insert(loaded)
+
+    def insert(self, tasks):
+        for task in tasks:
+            task.id = self.ids.take(task.id, self.tasks)
+            self.tasks[task.id] = task
+        self.index.add_many(tasks)
+        if self.listeners:
+            for task in tasks:
+                self.notify('put', task)
+
+    def notify(self, event, task):
+        for listener in self.listeners:
+            listener(event, task)
+
+    # прежние имена методов
+    load_task = load
+    insert_tasks = insert
+    save_tasks = RecordManager.save
 
     def add_task(self):
         title = input("Введите название задачи: ")
@@ -217,47 +492,134 @@ class TaskManager:
         description = input("Введите описание задачи (можно оставить пустым): ")
         priority = input("Установите приоритет ('Высокий', 'Средний', 'Низкий'): ") or "Средний"
         due_date_str = input("Введите срок выполнения задачи (ДД-ММ-ГГГГ, можно оставить пустым): ")
-        due_date = datetime.strptime(due_date_str, DATE_FORMAT).date() if due_date_str else None
-
-        new_id = len(self.tasks) + 1 if self.tasks else 1
-        new_task = Task(new_id, title, description, priority=priority, due_date=due_date)
-        self.tasks.append(new_task)
-        self.save_tasks()
+        try:
+            self.create(title, description, priority, due_date_str)
+        except ValueError as e:
+            print(e)
+            return
         print("Задача добавлена.")
 
-    def list_tasks(self, filter_status=None, filter_priority=None, filter_due_date=None):
-        filtered_tasks = self.filter_tasks(filter_status, filter_priority, filter_due_date)
-
-        if not filtered_tasks:
-            print("Список задач пуст.")
+    def create(self, title, description='', priority='Средний', due_date=None):
+        """Создаёт задачу без вопросов пользователю и возвращает её."""
+        if not title:
+            raise ValueError("Название задачи не может быть пустым.")
+        if due_date and due_day(due_date) is None:
+            raise ValueError("Неверный формат даты.")
+        with self.transaction():
+            task = Task(self.ids.take(), title, description, priority=priority or 'Средний', due_date=due_date or None)
+            self.tasks[task.id] = task
+            self.index.add(task)
+            self.notify('put', task)
+            self.save(changed=[task])
+        return task
+
+    def update(self, task_id, title=None, description=None, priority=None, due_date=None, done=None):
+        """Меняет переданные поля задачи; None, если задачи нет."""
+        if due_date and due_day(due_date) is None:
+            raise ValueError("Неверный формат даты.")
+        with self.transaction():
+            task = self.find_task(task_id)
+            if not task:
+                return None
+            before = task.to_dict()
+            task.title = title or task.title
+            task.description = description or task.description
+            task.priority = priority or task.priority
+            task.due_date = due_date or task.due_date
+            if done is not None:
+                task.done = bool(done)
+            # например, отметка уже выполненной задачи: сохранять нечего
+            if task.to_dict() == before:
+                return task
+            self.index.update(task)
+            self.notify('put', task)
+            self.save(changed=[task])
+        return task
+
+    def delete(self, task_id):
+        """Удаляет задачу; False, если её нет."""
+        with self.transaction():
+            task = self.find_task(task_id)
+            if not task:
+                return False
+            del self.tasks[task.id]
+            self.index.remove(task.id)
+            self.notify('delete', task)
+            self.save(deleted=[task.id])
+        return True
+
+    def list_tasks(self, filter_status=None, filter_priority=None, filter_due_date=None, page_size=20):
+        """Печатает задачи по страницам, сначала более приоритетные и с более ранним сроком."""
+        filters = self.task_filters(filter_status, filter_priority, filter_due_date)
+        if filters is None:
             return
-        for task in filtered_tasks:
-            status = "Выполнено" if task.done else "Не выполнено"
-            print(
-                f"ID: {task.id}, Название: {task.title}, Статус: {status}, Приоритет: {task.priority}, Срок: {task.due_date}")
+        self.show_tasks(filters, page_size)
+
+    def show_tasks(self, filters, page_size=20):
+        offset = 0
+        while True:
+            tasks = self.query(**filters, sort=True, limit=page_size, offset=offset)
+            if not tasks:
+                if not offset:
+                    print("Список задач пуст.")
+                return
+            for task in tasks:
+                status = "Выполнено" if task.done else "Не выполнено"
+                print(
+                    f"ID: {task.id}, Название: {task.title}, Статус: {status}, Приоритет: {task.priority}, Срок: {task.due_date}")
+            if len(tasks) < page_size or input("Показать ещё? (д/н): ").lower() != 'д':
+                return
+            offset += page_size
+
+    def task_filters(self, status=None, priority=None, due_date=None):
+        """Фильтры из меню ('Все' = без фильтра) -> аргументы query; None при неверной дате."""
+        filters = {}
+        if status and status != 'Все':
+            filters['done'] = status == 'Выполнено'
+        if priority and priority != 'Все':
+            filters['priority'] = priority
+        if due_date and due_date != 'Все':
+            day = due_day(due_date)
+            if day is None:
+                print("Неверный формат даты.")
+                return None
+            filters['due_from'] = filters['due_to'] = day
+        return filters
 
     def filter_tasks(self, status=None, priority=None, due_date=None):
-        filtered_tasks = self.tasks
-        if status:
-            filtered_tasks = [task for task in filtered_tasks if
-                              (task.done and status == 'Выполнено') or (not task.done and status == 'Не выполнено')]
-        if priority:
-            filtered_tasks = [task for task in filtered_tasks if task.priority == priority]
-        if due_date:
-            try:
-                due_date_obj = datetime.strptime(due_date, DATE_FORMAT).date()
-                filtered_tasks = [task for task in filtered_tasks if task.due_date == due_date_obj]
-            except ValueError:
-                print("Неверный формат даты.")
-                return []
-        return filtered_tasks
+        filters = self.task_filters(status, priority, due_date)
+        return [] if filters is None else self.query(**filters)
+
+    def query(self, done=None, priority=None, due_from=None, due_to=None, sort=False, limit=None, offset=0):
+        """Задачи по статусу, приоритету и диапазону сроков (номера дней, включительно).
+
+        sort=True упорядочивает по приоритету, затем по сроку; limit/offset - постранично.
+        """
+        if self.storage.queryable:
+            equal = {}
+            if done is not None:
+                equal['done'] = bool(done)
+            if priority is not None:
+                equal['priority'] = priority
+            ranges = {'due_day': (due_from, due_to)} if due_from is not None or due_to is not None else None
+            task_ids = self.storage.select_ids(equal, ranges, SQL_ORDER if sort else 'id', limit, offset)
+        else:
+            task_ids = self.index.query(done, priority, due_from, due_to, sort, limit, offset)
+        return [self.tasks[task_id] for task_id in task_ids]
+
+    def overdue(self, today=None):
+        """Невыполненные задачи со сроком раньше сегодняшнего дня."""
+        today = (today or date.today()).toordinal()
+        return self.query(done=False, due_to=today - 1, sort=True)
+
+    def due_within(self, days, today=None):
+        """Невыполненные задачи со сроком от сегодня до сегодня + days."""
+        today = (today or date.today()).toordinal()
+        return self.query(done=False, due_from=today, due_to=today + days, sort=True)
 
     def mark_as_done(self):
         task_id = int(input("Введите ID задачи для отметки как выполненной: "))
-        task = self.find_task(task_id)
-        if task:
-            task.done = True
-            self.save_tasks()
+        if self.update(task_id, done=True):
             print("Задача отмечена как выполненная.")
         else:
             print("Задача не найдена.")
@@ -266,67 +628,55 @@ class TaskManager:
         """Редактирует существующую задачу."""
         task_id = int(input("Введите ID задачи для редактирования: "))
         task = self.find_task(task_id)
-        if task:
-            task.title = input(f"Новое название ({task.title}): ") or task.title
-            task.description = input(f"Новое описание ({task.description}): ") or task.description
-            task.priority = input(f"Новый приоритет ({task.priority}): ") or task.priority
-            due_date_str = input(f"Новый срок (ДД-ММ-ГГГГ, оставьте пустым для сохранения текущего срока): ")
-            task.due_date = due_date_str if due_date_str else task.due_date
-            self.save_tasks()
+        if not task:
+            print("Задача не найдена.")
+            return
+        title = input(f"Новое название ({task.title}): ")
+        description = input(f"Новое описание ({task.description}): ")
+        priority = input(f"Новый приоритет ({task.priority}): ")
+        due_date_str = input(f"Новый срок (ДД-ММ-ГГГГ, оставьте пустым для сохранения текущего срока): ")
+        if due_date_str and due_day(due_date_str) is None:
+            print("Неверный формат даты, срок не изменён.")
+            due_date_str = None
+        # пока вводили, задачу мог удалить другой процесс
+        if self.update(task_id, title, description, priority, due_date_str):
             print("Задача обновлена.")
         else:
             print("Задача не найдена.")
 
     def delete_task(self):
         task_id = int(input("Введите ID задачи для удаления: "))
-        task = self.find_task(task_id)
-        if task:
-            self.tasks.remove(task)
-            self.save_tasks()
+        if self.delete(task_id):
             print("Задача удалена.")
         else:
             print("Задача не найдена.")
 
     def find_task(self, task_id):
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        return None
+        return self.tasks.get(task_id)
 
-    def import_from_csv(self, filepath):
-        import csv
+    def import_from_csv(self, filepath, chunk_size=CHUNK_SIZE):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    new_task = Task(int(row['id']), row['title'], row['description'], row['done'] == 'True',
-                                    row['priority'], row['due_date'])
-                    self.tasks.append(new_task)
-            self.save_tasks()
+            self.stream_csv(filepath, chunk_size)
             print("Данные импортированы из CSV.")
         except FileNotFoundError:
             print(f"Ошибка: файл {filepath} не найден.")
         except Exception as e:
             print(f"Ошибка при импорте из CSV: {e}")
 
-    def export_to_csv(self, filepath):
-        import csv
+    def export_to_csv(self, filepath, filter_status=None, filter_priority=None, filter_due_date=None,
+                      compression=None):
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["id", "title", "description", "done", "priority", "due_date"])
-                for task in self.tasks:
-                    writer.writerow([task.id, task.title, task.description, task.done, task.priority, task.due_date])
+            tasks = self.filter_tasks(filter_status, filter_priority, filter_due_date)
+            export_csv(filepath, Task.FIELDS, (task.csv_row() for task in tasks), compression)
             print("Данные экспортированы в CSV.")
         except Exception as e:
             print(f"Ошибка при экспорте в CSV: {e}")
 
 
-task = TaskManager()
-
-
 def task_manager():
+    task = get_manager('task')
     while True:
+        task.refresh()
         choice = int(input("Выберите действие:\n"
                            "1. Добавить задачу\n"
                            "2. Посмотреть список задач\n"
@@ -335,6 +685,8 @@ def task_manager():
                            "5. Удалить задачу\n"
                            "6. Импорт из CSV\n"
                            "7. Экспорт в CSV\n"
+                           "8. Просроченные задачи\n"
+                           "9. Задачи на ближайшие 7 дней\n"
                            "0. Выход\n"))
         if choice == 1:
             task.add_task()
@@ -350,11 +702,16 @@ def task_manager():
         elif choice == 5:
             task.delete_task()
         elif choice == 6:
-            filepath = input("Введите путь к CSV-файлу для импорта: ")
-            task.import_from_csv(filepath)
+            filepath = input("Введите путь к CSV-файлу для импорта (несколько файлов - шаблоном или через ';'): ")
+            import_csv(task, filepath)
         elif choice == 7:
             filepath = input("Введите путь к CSV-файлу для экспорта: ")
             task.export_to_csv(filepath)
+        elif choice == 8:
+            task.show_tasks({'done': False, 'due_to': date.today().toordinal() - 1})
+        elif choice == 9:
+            today = date.today().toordinal()
+            task.show_tasks({'done': False, 'due_from': today, 'due_to': today + 7})
         elif choice == 0:
             break
         else:
@@ -362,6 +719,9 @@ def task_manager():
 
 
 class Contact:
+    FIELDS = ('id', 'name', 'phone', 'email')
+    __slots__ = FIELDS
+
     def __init__(self, id, name, phone=None, email=None):
         self.id = id
         self.name = name
@@ -379,23 +739,43 @@ class Contact:
             "email": self.email
         }
 
+    def csv_row(self):
+        return self.id, self.name, self.phone, self.email
 
-class ContactManager:
-    def __init__(self, contacts_file='contacts.json'):
-        self.contacts_file = contacts_file
-        self.load_task()
+    @classmethod
+    def from_csv_row(cls, row):
+        return cls(int(row['id']), row['name'], row['phone'], row['email'])
 
-    def load_task(self):
-        try:
-            with open(self.contacts_file, 'r') as file:
-                try:
-                    self.contacts = [Contact(**contact_data) for contact_data in json.load(file)]
-                except json.JSONDecodeError:
-                    print('Неверный формат файла tasks.json')
-                    self.contacts = []
-        except FileNotFoundError:
-            print('Файл не существует')
-            self.contacts = []
+
+class ContactManager(RecordManager):
+    record_class = Contact
+    records_attribute = 'contacts'
+    kind = 'contacts'
+    plural = 'контактов'
+
+    def __init__(self, contacts_file='contacts.json', storage=None):
+        super().__init__(contacts_file, storage)
+        self.contacts_file = contacts_file
+        self.load()
+
+    def load(self):
+        loaded = self.read_records()
+        self.contacts = {}
+        self.index = ContactIndex()
+        self.changes.reset()
+        self.ids = IdAllocator(self.storage, [contact.id for contact in loaded])
+        self.insert(loaded)
+
+    def insert(self, contacts):
+        for contact in contacts:
+            contact.id = self.ids.take(contact.id, self.contacts)
+            self.contacts[contact.id] = contact
+        self.index.add_many(contacts)
+
+    # прежние имена методов
+    load_task = load
+    insert_contacts = insert
+    save_contact = RecordManager.save
 
     def add_contact(self):
         name = input('Введите имя контакта: ')
@@ -403,82 +783,203 @@ class ContactManager:
             return 'Имя не может быть пустым.'
         phone = input('Введите номер телефона: ')
         email = input("Введите email контакта:")
-        new_id = len(self.contacts) + 1 if self.contacts else 1
-        new_contact = Contact(new_id, name, phone, email)
-        self.contacts.append(new_contact)
-        self.save_contact()
+        self.create(name, phone, email)
         return 'Контакт создан.'
 
-    def save_contact(self):
-        with open(self.contacts_file, 'w', encoding='utf-8') as file:
-            json.dump([contact.to_dict() for contact in self.contacts], file, indent=4)
+    def create(self, name, phone=None, email=None):
+        """Создаёт контакт без вопросов пользователю и возвращает его."""
+        if not name:
+            raise ValueError('Имя не может быть пустым.')
+        with self.transaction():
+            contact = Contact(self.ids.take(), name, phone, email)
+            self.contacts[contact.id] = contact
+            self.index.add(contact)
+            self.save(changed=[contact])
+        return contact
+
+    def update(self, contact_id, name=None, phone=None, email=None):
+        """Меняет переданные поля контакта; None, если контакта нет."""
+        with self.transaction():
+            contact = self.contacts.get(contact_id)
+            if not contact:
+                return None
+            before = contact.to_dict()
+            contact.name = name or contact.name
+            contact.phone = phone or contact.phone
+            contact.email = email or contact.email
+            if contact.to_dict() == before:
+                return contact
+            self.index.update(contact)
+            self.save(changed=[contact])
+        return contact
+
+    def delete(self, contact_id):
+        """Удаляет контакт по id; False, если его нет."""
+        with self.transaction():
+            contact = self.contacts.get(contact_id)
+            if not contact:
+                return False
+            del self.contacts[contact.id]
+            self.index.remove(contact.id)
+            self.save(deleted=[contact.id])
+        return True
 
     def edit_contact(self):
-        contact_id = (input("Введите имя или номер контакта: "))
-        contact = self.find_contact(contact_id)
-        if contact:
-            contact.name = input(f'Новое имя ({contact.name}):') or contact.name
-            contact.phone = input(f'Новый номер телефона ({contact.phone}):') or contact.phone
-            contact.email = input(f'Новый email ({contact.email}):') or contact.email
-            self.save_contact()
+        contact = self.choose_contact(input("Введите имя или номер контакта: "))
+        if not contact:
+            print("Контакт не найден.")
+            return
+        name = input(f'Новое имя ({contact.name}):')
+        phone = input(f'Новый номер телефона ({contact.phone}):')
+        email = input(f'Новый email ({contact.email}):')
+        # пока вводили, контакт мог удалить другой процесс
+        if self.update(contact.id, name, phone, email):
             print("Контакт обновлен.")
         else:
             print("Контакт не найден.")
 
     def delete_contact(self):
-        contact_id = (input("Введите имя или номер контакта: "))
-        contact = self.find_contact(contact_id)
-        if contact:
-            self.contacts.remove(contact)
-            self.save_contact()
+        contact = self.choose_contact(input("Введите имя или номер контакта: "))
+        # пока выбирали, контакт мог удалить другой процесс
+        if contact and self.delete(contact.id):
             print('Контакт удален.')
         else:
             print("Контакт не найден.")
 
+    def find_exact(self, query):
+        """Контакты с точно таким номером или именем (без учёта регистра); начало имени не подходит."""
+        return [self.contacts[contact_id] for contact_id in self.index.exact(query)]
+
     def find_contact(self, contact_name):
-        for сontact in self.contacts:
-            if сontact.name == contact_name or сontact.phone == contact_name:
-                return contact
+        for contact in self.find_exact(contact_name):
+            return contact
         return None
 
+    def choose_contact(self, query):
+        """Контакт для изменения или удаления: только точное совпадение, а если их несколько -
+        пользователь выбирает нужный."""
+        contacts = self.find_exact(query)
+        if len(contacts) <= 1:
+            return contacts[0] if contacts else None
+        for number, contact in enumerate(contacts, 1):
+            print(f"{number}. {contact.name}, {contact.phone}, {contact.email}")
+        choice = input(f"Выберите контакт (1-{len(contacts)}): ")
+        if not choice.isdigit() or not 1 <= int(choice) <= len(contacts):
+            return None
+        return contacts[int(choice) - 1]
+
+    def find_contacts(self, query, page=1, per_page=20):
+        """Страница контактов по имени, началу имени или номеру, самые точные совпадения первыми."""
+        return [self.contacts[contact_id] for contact_id in self.index.page(query, page, per_page)]
+
+    def find_similar(self, name, limit=20):
+        """Контакты с похожим именем: с опечатками или другим порядком слов, самые похожие первыми."""
+        return [self.contacts[contact_id] for contact_id in self.index.similar(name, limit)]
+
+    def find_duplicates(self):
+        """Группы контактов, похожих на одного человека; в каждой первым идёт контакт с меньшим id."""
+        return [[self.contacts[contact_id] for contact_id in group] for group in self.index.duplicates()]
+
+    @staticmethod
+    def fill(contact, other):
+        """Дополняет контакт телефоном и email другого контакта того же человека; True, если что-то изменилось."""
+        before = contact.to_dict()
+        contact.phone = contact.phone or other.phone
+        contact.email = contact.email or other.email
+        return contact.to_dict() != before
+
+    def merge_duplicates(self):
+        """Сливает каждую группу повторов в контакт с меньшим id; возвращает число удалённых контактов."""
+        with self.transaction():
+            changed, deleted = [], []
+            for first, *rest in self.find_duplicates():
+                if any([self.fill(first, contact) for contact in rest]):
+                    changed.append(first)
+                for contact in rest:
+                    del self.contacts[contact.id]
+                    self.index.remove(contact.id)
+                    deleted.append(contact.id)
+            for contact in changed:
+                self.index.update(contact)
+            if changed or deleted:
+                self.save(changed=changed, deleted=deleted)
+        return len(deleted)
+
+    def merge_found_duplicates(self):
+        groups = self.find_duplicates()
+        if not groups:
+            print("Повторов не найдено.")
+            return
+        for group in groups:
+            print(' | '.join(f"{contact.name}, {contact.phone}, {contact.email}" for contact in group))
+        if input(f"Объединить группы повторов ({len(groups)})? (д/н): ").lower() == 'д':
+            print(f"Удалено повторов: {self.merge_duplicates()}")
+
+    def merge_contacts(self, contacts):
+        """Добавляет контакты, а повторы сохранённых сливает с ними; возвращает (изменённые и новые, число слитых)."""
+        changed = {}
+        merged = 0
+        for contact in contacts:
+            contact_id = self.index.match(contact)
+            if contact_id is None:
+                self.insert([contact])
+                changed[contact.id] = contact
+                continue
+            merged += 1
+            existing = self.contacts[contact_id]
+            if self.fill(existing, contact):
+                self.index.update(existing)
+                changed[existing.id] = existing
+        return list(changed.values()), merged
+
     def find_and_show_contact(self):
-        contact_id = (input("Введите имя или номер контакта: "))
-        сontact = self.find_contact(contact_id)
-        if сontact:
-            print(f"Имя: {сontact.name}\nНомер: {contact.phone}\nemail: {contact.email}\n")
-        else:
-            print("Контакт не найден.")
+        query = input("Введите имя или номер контакта: ")
+        page = 1
+        while True:
+            contacts = self.find_contacts(query, page)
+            if not contacts and page == 1:
+                contacts = self.find_similar(query)
+                if contacts:
+                    print("Точных совпадений нет, похожие контакты:")
+            if not contacts:
+                if page == 1:
+                    print("Контакт не найден.")
+                return
+            for contact in contacts:
+                print(f"Имя: {contact.name}\nНомер: {contact.phone}\nemail: {contact.email}\n")
+            if len(contacts) < 20 or input("Показать ещё? (д/н): ").lower() != 'д':
+                return
+            page += 1
+
+    def import_records(self, contacts, merge=False):
+        """merge=True: контакты, похожие на сохранённые, дополняют их, а не добавляются заново."""
+        if merge:
+            return self.merge_contacts(contacts)
+        return super().import_records(contacts)
 
-    def import_from_csv(self, filepath):
+    def import_from_csv(self, filepath, chunk_size=CHUNK_SIZE, merge=False):
+        """merge=True: строки, похожие на сохранённые контакты, дополняют их, а не добавляются заново."""
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    self.contacts.append(Contact(int(row['id']), row['name'], row['phone'], row['email']))
-            self.save_contact()
+            self.stream_csv(filepath, chunk_size, merge=merge)
             print('Данные импортированы из CSV')
         except FileNotFoundError:
             print('Файл CSV не найден.')
         except Exception as e:
             print(f'Ошибка при импорте из CSV: {e}')
 
-    def export_to_csv(self, filepath):
+    def export_to_csv(self, filepath, compression=None):
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file)
-                writer.writerow(['id', 'name', 'phone', 'email'])
-                for contact in self.contacts:
-                    writer.writerow([contact.id, contact.name, contact.phone, contact.email])
+            export_csv(filepath, Contact.FIELDS, (contact.csv_row() for contact in self.contacts.values()),
+                       compression)
             print('Данные экспортированы в CSV.')
         except Exception as e:
             print(f'Ошибка при экспорте в CSV: {e}')
 
 
-contact = ContactManager()
-
-
 def contact_manager():
+    contact = get_manager('contact')
     while True:
+        contact.refresh()
         action = int(input("Выберите действие:\n"
                            "1. Создать контакт\n"
                            "2. Редактировать контакт\n"
@@ -486,6 +987,7 @@ def contact_manager():
                            "4. Импорт из CSV\n"
                            "5. Экспорт в CSV\n"
                            '6. Поиск контакта по имени или номеру телефона\n'
+                           "7. Найти и объединить повторы\n"
                            "0. Выход\n"))
 
         if action == 1:
@@ -495,14 +997,17 @@ def contact_manager():
         elif action == 3:
             contact.delete_contact()
         elif action == 4:
-            filepath = input("Введите путь к CSV-файлу для импорта: ")
-            contact.import_from_csv(filepath)
+            filepath = input("Введите путь к CSV-файлу для импорта (несколько файлов - шаблоном или через ';'): ")
+            merge = input("Объединять с похожими контактами? (д/н): ").lower() == 'д'
+            import_csv(contact, filepath, merge=merge)
         elif action == 5:
             filepath = input("Введите путь к CSV-файлу для экспорта: ")
             contact.export_to_csv(filepath)
         elif action == 6:
             #name = input('Введите имя или номер телефона контакта:\n')
             contact.find_and_show_contact()
+        elif action == 7:
+            contact.merge_found_duplicates()
         elif action == 0:
             break
         else:
@@ -513,13 +1018,37 @@ DATE_FORMAT = '%d-%m-%Y'
 
 
 class FinanceRecord:
+    FIELDS = ('id', 'amount', 'category', 'date', 'description')
+    __slots__ = ('id', 'amount', '_category', '_date', 'description')
+
     def __init__(self, id, amount, category, date, description=""):
         self.id = id
         self.amount = amount
-        self.category = category
-        self.date = date
+        self._category = sys.intern(category) if isinstance(category, str) else category
+        self._date = pack_day(date)
         self.description = description
 
+    @property
+    def category(self):
+        return self._category
+
+    @category.setter
+    def category(self, value):
+        self._category = sys.intern(value) if isinstance(value, str) else value
+
+    @property
+    def date(self):
+        return unpack_day(self._date)
+
+    @date.setter
+    def date(self, value):
+        self._date = pack_day(value)
+
+    @property
+    def day(self):
+        """Дата как порядковый номер дня или None, если она неверная."""
+        return value_day(self._date)
+
     def __repr__(self):
         return f"FinanceRecord(id={self.id}, amount={self.amount}, category='{self.category}', date='{self.date}', description='{self.description}')"
 
@@ -532,56 +1061,125 @@ class FinanceRecord:
             "description": self.description
         }
 
+    def csv_row(self):
+        return self.id, self.amount, self.category, self.date, self.description
 
-class FinanceManager:
-    def __init__(self, finance_file='finance.json'):
-        self.finance_file = finance_file
-        self.load_records()
+    @classmethod
+    def from_csv_row(cls, row):
+        return cls(int(row['id']), float(row['amount']), row['category'], row['date'], row['description'])
 
-    def load_records(self):
-        try:
-            with open(self.finance_file, 'r') as file:
-                try:
-                    self.records = [FinanceRecord(**finance_data) for finance_data in json.load(file)]
-                except json.JSONDecodeError:
-                    print('Неверный формат файла finance.json')
-                self.records = []
-        except FileNotFoundError:
-            print('Файл не существует')
-        self.records = []
 
-    def save_records(self):
-        with open(self.finance_file, 'w') as f:
-            json.dump([record.to_dict() for record in self.records], f, indent=4)
+class FinanceManager(RecordManager):
+    record_class = FinanceRecord
+    records_attribute = 'records'
+    kind = 'finance'
+
+    def __init__(self, finance_file='finance.json', storage=None, columnar=False):
+        super().__init__(finance_file, storage)
+        self.finance_file = finance_file
+        self.columnar = columnar
+        # ряды по месяцам и неделям, скользящие суммы и сводные таблицы (finance_analytics.py)
+        self.analytics = FinanceAnalytics(self)
+        self.load()
+
+    def load(self):
+        loaded = self.read_records()
+        self.changes.reset()
+        if self.columnar:
+            # колонки сами отвечают на запросы по датам и категориям
+            self.records = self.ledger = FinanceColumns(FinanceRecord)
+        elif self.storage.queryable:
+            self.records = {}
+            self.ledger = SqlLedger(self.storage)
+        else:
+            self.records = {}
+            self.ledger = Ledger()
+        self.ids = IdAllocator(self.storage, [record.id for record in loaded])
+        self.insert(loaded)
+
+    def insert(self, records):
+        for record in records:
+            record.id = self.ids.take(record.id, self.records)
+            self.records[record.id] = record
+        if self.ledger is not self.records:
+            self.ledger.add_many(records)
+
+    # прежние имена методов
+    load_records = load
+    insert_records = insert
+    save_records = RecordManager.save
 
     def add_record(self):
         amount = float(input("Введите сумму операции (положительное для дохода, отрицательное для расхода): "))
         category = input("Введите категорию операции: ")
         date_str = input("Введите дату операции (ДД-ММ-ГГГГ): ")
         description = input("Введите описание операции (необязательно): ")
-        new_id = len(self.records) + 1
         try:
-            record = FinanceRecord(new_id, amount, category, date_str, description)
-            self.records.append(record)
-            self.save_records()
+            self.create(amount, category, date_str, description)
             print("Запись добавлена.")
         except ValueError as e:
             print(f"Ошибка: {e}")
 
-    def list_records(self, filter_date=None, filter_category=None):
-        filtered_records = self.records
-
-        if filter_date:
-            try:
-                filter_date_obj = datetime.strptime(filter_date, DATE_FORMAT).date()
-                filtered_records = [record for record in filtered_records if record.date == filter_date_obj]
-            except ValueError:
-                print("Неверный формат даты.")
-                return
-
-        if filter_category:
-            filtered_records = [record for record in filtered_records if record.category == filter_category]
+    def create(self, amount, category, date, description=''):
+        """Добавляет запись без вопросов пользователю и возвращает её."""
+        parse_day(date)
+        with self.transaction():
+            record = FinanceRecord(None, float(amount), category, date, description)
+            self.insert([record])
+            self.save(changed=[record])
+        return record
+
+    def update(self, record_id, amount=None, category=None, date=None, description=None):
+        """Меняет переданные поля записи; None, если записи нет."""
+        if date:
+            parse_day(date)
+        with self.transaction():
+            old = self.find_record(record_id)
+            if old is None:
+                return None
+            record = FinanceRecord(old.id, old.amount if amount is None else float(amount), category or old.category,
+                                   date or old.date, old.description if description is None else description)
+            if record.to_dict() == old.to_dict():
+                return old
+            if self.ledger is not self.records:
+                self.ledger.remove(old)
+                self.ledger.add(record)
+            self.records[record.id] = record
+            self.save(changed=[record])
+        return record
+
+    def delete(self, record_id):
+        """Удаляет запись; False, если её нет."""
+        with self.transaction():
+            record = self.find_record(record_id)
+            if record is None:
+                return False
+            if self.ledger is not self.records:
+                self.ledger.remove(record)
+            del self.records[record_id]
+            self.save(deleted=[record_id])
+        return True
+
+    def find_record(self, record_id):
+        return self.records.get(record_id)
+
+    def category_totals(self, start_date_str=None, end_date_str=None):
+        start_day = parse_day(start_date_str) if start_date_str else None
+        end_day = parse_day(end_date_str) if end_date_str else None
+        return self.ledger.category_totals(start_day, end_day)
+
+    def filter_records(self, filter_date=None, filter_category=None):
+        if not filter_date and not filter_category:
+            return self.records.values()
+        try:
+            day = parse_day(filter_date) if filter_date else None
+        except ValueError:
+            print("Неверный формат даты.")
+            return []
+        return [self.records[record_id] for record_id in self.ledger.select(day, day, filter_category or None)]
 
+    def list_records(self, filter_date=None, filter_category=None):
+        filtered_records = self.filter_records(filter_date, filter_category)
         if not filtered_records:
             print("Список записей пуст.")
             return
@@ -601,25 +1199,9 @@ class FinanceManager:
             print("Дата начала не может быть позже даты окончания.")
             return
 
-        report_data = {'income': 0, 'expenses': 0, 'income_items': {}, 'expense_items': {}}
-
-        for record in self.records:
-            try:
-                record_date = datetime.strptime(record.date, DATE_FORMAT).date()
-            except ValueError:
-                print(f"Ошибка: Неверный формат даты в записи с ID {record.id}.")
-                continue
-
-            if start_date <= record_date <= end_date:
-                if record.amount >= 0:
-                    report_data['income'] += record.amount
-                    report_data['income_items'][record.category] = report_data['income_items'].get(record.category,
-                                                                                                   0) + record.amount
-                else:
-                    report_data['expenses'] += abs(record.amount)
-                    report_data['expense_items'][record.category] = report_data['expense_items'].get(record.category,
-                                                                                                     0) + abs(
-                        record.amount)
+        for record_id in sorted(self.ledger.invalid):
+            print(f"Ошибка: Неверный формат даты в записи с ID {record_id}.")
+        report_data = self.ledger.report(start_date.toordinal(), end_date.toordinal())
 
         print("\nОтчет о финансовой активности:")
         print(f"Период: {start_date_str} - {end_date_str}")
@@ -641,46 +1223,54 @@ class FinanceManager:
 
         print(f"\nБаланс: {report_data['income'] - report_data['expenses']}")
 
-    def import_from_csv(self, filepath):
-        import csv
+    def show_analytics(self, period='month', filepath=None):
+        """Печатает ряд по месяцам или неделям с изменениями к прошлому периоду; filepath - ещё и
+        сводная таблица расходов по категориям в CSV."""
+        rows = self.analytics.deltas(period)
+        if not rows:
+            print("Записей нет.")
+            return
+        for row in rows:
+            change = row['expenses_change']
+            change = f" ({change:+.1%})" if change is not None else ''
+            print(f"{row['period']}: доходы {row['income']}, расходы {row['expenses']}{change}, "
+                  f"баланс {row['balance']}")
+        if filepath:
+            try:
+                to_csv(self.analytics.pivot(period), filepath)
+                print('Сводная таблица сохранена в CSV.')
+            except Exception as e:
+                print(f'Ошибка при экспорте в CSV: {e}')
+
+    def import_from_csv(self, filepath, chunk_size=CHUNK_SIZE):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    new_record = FinanceRecord(int(row['id']), float(row['amount']), row['category'], row['date'],
-                                               row['description'])
-                    self.records.append(new_record)
-            self.save_records()
+            self.stream_csv(filepath, chunk_size)
             print("Данные импортированы из CSV.")
         except FileNotFoundError:
             print(f"Ошибка: файл {filepath} не найден.")
         except Exception as e:
             print(f"Ошибка при импорте из CSV: {e}")
 
-    def export_to_csv(self, filepath):
-        import csv
+    def export_to_csv(self, filepath, filter_date=None, filter_category=None, compression=None):
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["id", "amount", "category", "date", "description"])
-                for record in self.records:
-                    writer.writerow([record.id, record.amount, record.category, record.date, record.description])
+            records = self.filter_records(filter_date, filter_category)
+            export_csv(filepath, FinanceRecord.FIELDS, (record.csv_row() for record in records), compression)
             print("Данные экспортированы в CSV.")
         except Exception as e:
             print(f"Ошибка при экспорте в CSV: {e}")
 
 
-finance = FinanceManager()
-
-
 def finance_manager():
+    finance = get_manager('finance')
     while True:
+        finance.refresh()
         action = int(input("Выберите действие:\n"
                            "1. Добавить запись\n"
                            "2. Просмотреть список записей\n"
                            "3. Сгенерировать отчет\n"
                            "4. Импорт из CSV\n"
                            "5. Экспорт в CSV\n"
+                           "6. Аналитика по месяцам или неделям\n"
                            "0. Выход\n"))
 
         if action == 1:
@@ -692,13 +1282,17 @@ def finance_manager():
         elif action == 3:
             start_date = input("Введите начальную дату отчета (ДД-ММ-ГГГГ): ")
             end_date = input("Введите конечную дату отчета (ДД-ММ-ГГГГ): ")
-            manager.generate_report(start_date, end_date)
+            finance.generate_report(start_date, end_date)
         elif action == 4:
-            filepath = input("Введите путь к CSV-файлу для импорта: ")
-            finance.import_from_csv(filepath)
+            filepath = input("Введите путь к CSV-файлу для импорта (несколько файлов - шаблоном или через ';'): ")
+            import_csv(finance, filepath)
         elif action == 5:
             filepath = input("Введите путь к CSV-файлу для экспорта: ")
             finance.export_to_csv(filepath)
+        elif action == 6:
+            period = 'week' if input("По неделям? (д/н): ").lower() == 'д' else 'month'
+            filepath = input("CSV-файл для сводной таблицы (оставить пустым для пропуска): ")
+            finance.show_analytics(period, filepath or None)
         elif action == 0:
             break
         else:
@@ -706,9 +1300,24 @@ def finance_manager():
 
 
 class Calculator:
+    def evaluate(self, expression, variables=None, **kwargs):
+        """Значение выражения; разобранные выражения кэшируются, переменные передаются отдельно."""
+        return compile_expression(expression).evaluate(variables, **kwargs)
+
+    def evaluate_batch(self, expression, variables=None, **kwargs):
+        """Выражение над массивами numpy или колонками FinanceColumns -> (значения, маска ошибок).
+
+        Например: calculator.evaluate_batch('amount * (1 - tax)', finance.records, tax=0.13).
+        """
+        if isinstance(variables, FinanceColumns):
+            variables = variables.as_variables()
+        return compile_expression(expression).evaluate_array(variables, **kwargs)
+
     def posterror(self, expression):
         try:
-            print(eval(expression))
+            result = self.evaluate(expression)
+            print(result)
+            return result
         except ValueError as e:
             raise ValueError(f"Ошибка: {e}. Пожалуйста, введите выражение в формате 'число оператор число'.") from None
         except ZeroDivisionError as e:
@@ -717,10 +1326,58 @@ class Calculator:
             raise Exception(f"Произошла неизвестная ошибка: {e}") from None
 
 
-calculator = Calculator()
+# менеджеры создаются при первом обращении: импорт модуля не читает файлы данных
+MANAGERS = {
+    'manager': NoteManager,
+    'task': TaskManager,
+    'contact': ContactManager,
+    'finance': FinanceManager,
+    'calculator': Calculator,
+}
+DATA_FILES = {
+    'manager': ('notes.json', 'notes'),
+    'task': ('tasks.json', 'tasks'),
+    'contact': ('contacts.json', 'contacts'),
+    'finance': ('finance.json', 'finance'),
+}
+_instances = {}
+
+
+def get_manager(name):
+    if name not in _instances:
+        _instances[name] = MANAGERS[name]()
+    return _instances[name]
+
+
+def __getattr__(name):
+    # personal_assistant.manager, .task и т.д. по-прежнему доступны снаружи
+    if name in MANAGERS:
+        return get_manager(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def peek_counts():
+    """Число записей в каждом файле данных без разбора JSON."""
+    counts = {}
+    for name, (filename, table) in DATA_FILES.items():
+        try:
+            counts[name] = make_storage(filename, STORAGE_MODE, table).count()
+        except (FileNotFoundError, ValueError):
+            counts[name] = 0
+    return counts
+
+
+def import_csv(manager, filepath, **options):
+    # шаблон пути или несколько файлов импортируются параллельно одним изменением
+    paths = [path.strip() for path in filepath.split(';') if path.strip()]
+    if len(paths) > 1 or glob.has_magic(filepath):
+        manager.import_from_csv_files(paths, **options)
+    else:
+        manager.import_from_csv(filepath, **options)
 
 
 def calculate():
+    calculator = get_manager('calculator')
     while True:
         try:
             expression = input("Введите арифметическое выражение (или 'exit' для выхода): ")
@@ -731,7 +1388,67 @@ def calculate():
             print(e)
 
 
+def stats_menu():
+    # импорт здесь: пока статистика не нужна, модуль не загружается
+    from instrumentation import stats
+    while True:
+        action = input(f"Сбор статистики {'включён' if stats.enabled else 'выключен'}.\n"
+                       "Выберите действие:\n"
+                       "1. Показать статистику (p50/p95/p99)\n"
+                       "2. Включить/выключить сбор\n"
+                       f"3. cProfile: {'выключить' if stats.profiling else 'включить'}\n"
+                       f"4. tracemalloc: {'выключить' if stats.tracing_memory else 'включить'}\n"
+                       "5. Сбросить статистику\n"
+                       "0. Выход\n")
+
+        if action == '1':
+            print(stats.report())
+        elif action == '2':
+            if stats.enabled:
+                stats.disable()
+            else:
+                stats.enable(sys.modules[__name__])
+        elif action == '3':
+            if not stats.enabled:
+                stats.enable(sys.modules[__name__])
+            stats.set_profile(not stats.profiling)
+        elif action == '4':
+            if not stats.enabled:
+                stats.enable(sys.modules[__name__])
+            stats.set_memory(not stats.tracing_memory)
+        elif action == '5':
+            stats.reset()
+        elif action == '0':
+            break
+        else:
+            print("Неверное действие.")
+
+
+def start_stats(argv):
+    """Убирает из argv флаги статистики; если они были, включает сбор и печатает итог в stderr при выходе."""
+    flags = {'--stats', '--profile', '--trace-memory'}
+    given = flags.intersection(argv)
+    if given:
+        import atexit
+        from instrumentation import stats
+        stats.enable(sys.modules[__name__], profile='--profile' in given, memory='--trace-memory' in given)
+        atexit.register(lambda: print(stats.report(), file=sys.stderr))
+    return [arg for arg in argv if arg not in flags]
+
+
 if __name__ == "__main__":
+    sys.argv = start_stats(sys.argv)
+    if sys.argv[1:2] == ['--batch']:
+        # команды JSON-строками из файла или stdin ('-'), формат описан в batch.py
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:], get_manager))
+    if sys.argv[1:2] == ['--serve']:
+        # локальный HTTP/JSON API, параметры и пути описаны в server.py
+        from server import main as server_main
+        sys.exit(server_main(sys.argv[2:], get_manager))
+    counts = peek_counts()
+    print(f"Заметок: {counts['manager']}, задач: {counts['task']}, контактов: {counts['contact']}, "
+          f"финансовых записей: {counts['finance']}")
     while True:
         action = int(input('Добро пожаловать в Персональный помощник!\n'
                            'Выберите действие:\n'
@@ -740,6 +1457,7 @@ if __name__ == "__main__":
                            '3. Управление контактами\n'
                            '4. Управление финансовыми записями\n'
                            '5. Калькулятор\n'
+                           '6. Статистика производительности\n'
                            '0. Выход\n'))
 
         if action == 1:
@@ -752,6 +1470,8 @@ if __name__ == "__main__":
             finance_manager()
         elif action == 5:
             calculate()
+        elif action == 6:
+            stats_menu()
         elif action == 0:
             break
         else:
@@ -0,0 +1,90 @@
+import asyncio
+import heapq
+from datetime import date, datetime, timedelta
+
+
+class DeadlineScheduler:
+    """Мин-куча невыполненных задач по сроку.
+
+    Подписывается на изменения TaskManager. Изменённые и удалённые задачи не
+    ищутся в куче: их старые элементы просто пропускаются при извлечении.
+    """
+
+    def __init__(self, task_manager):
+        self.task_manager = task_manager
+        self.current = {}
+        for task in task_manager.tasks.values():
+            day = task.due_day
+            if not task.done and day is not None:
+                self.current[task.id] = day
+        self.heap = [(day, task_id) for task_id, day in self.current.items()]
+        heapq.heapify(self.heap)
+        self.wakeup = None
+        self.loop = None
+        task_manager.listeners.append(self.on_change)
+
+    def close(self):
+        self.task_manager.listeners.remove(self.on_change)
+
+    def on_change(self, event, task):
+        day = task.due_day
+        if event == 'delete' or task.done or day is None:
+            self.current.pop(task.id, None)
+            return
+        if self.current.get(task.id) == day:
+            return
+        self.current[task.id] = day
+        heapq.heappush(self.heap, (day, task.id))
+        if len(self.heap) > 2 * len(self.current) + 64:
+            self.heap = [(day, task_id) for task_id, day in self.current.items()]
+            heapq.heapify(self.heap)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _take(self, stop):
+        """Извлекает актуальные элементы, пока stop(день, число взятых) ложно, и возвращает их в кучу."""
+        taken = []
+        seen = set()
+        while self.heap and not stop(self.heap[0][0], len(taken)):
+            day, task_id = heapq.heappop(self.heap)
+            if self.current.get(task_id) == day and task_id not in seen:
+                seen.add(task_id)
+                taken.append((day, task_id))
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [self.task_manager.tasks[task_id] for day, task_id in taken]
+
+    def next_due(self, n=1):
+        """n невыполненных задач с самым ранним сроком."""
+        return self._take(lambda day, count: count >= n)
+
+    def overdue(self, today=None):
+        """Невыполненные задачи, срок которых уже прошёл."""
+        today = (today or date.today()).toordinal()
+        return self._take(lambda day, count: day >= today)
+
+    async def run(self, callback, clock=datetime.now):
+        """Вызывает callback(task) один раз для каждой задачи, чей срок прошёл.
+
+        Срок истекает в полночь после дня срока, поэтому цикл спит до ближайшей
+        полуночи или до изменения задач, а не опрашивает список.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        notified = {}
+        try:
+            while True:
+                self.wakeup.clear()
+                now = clock()
+                for task in self.overdue(now.date()):
+                    day = self.current[task.id]
+                    if notified.get(task.id) != day:
+                        notified[task.id] = day
+                        callback(task)
+                midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), (midnight - now).total_seconds())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.loop = None
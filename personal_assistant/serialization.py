@@ -0,0 +1,264 @@
+"""Форматы файлов данных: JSON (стандартный модуль или orjson) и двоичный снимок по колонкам.
+
+Кодек выбирается переменной окружения PA_CODEC: 'json', 'orjson' или 'auto'
+(orjson, если он установлен). Небольшие файлы пишутся с отступами, как
+раньше, большие - компактно, без пробелов.
+
+Снимок - файл с колонками: у каждого поля свой участок файла, числа лежат
+массивами, строки - одним блоком через '\\0', а повторяющиеся значения
+(приоритеты, категории, даты) - номерами в таблице. Файл отображается в
+память (mmap), и колонка разбирается только при первом обращении к ней.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# файлы с меньшим числом записей остаются читаемыми: с отступами, как раньше
+PRETTY_LIMIT = 1000
+
+MAGIC = b'PASNAP1\n'
+HEADER = struct.Struct('<Q')
+ALIGN = 8
+# значений в таблице колонки 'dict' не больше, чем помещается в номер 'H'
+MAX_DICT_SIZE = 1 << 16
+
+
+class JsonCodec:
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, rows):
+        if len(rows) < PRETTY_LIMIT:
+            return json.dumps(rows, indent=4).encode('utf-8')
+        return json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson: разбор в 2 раза быстрее, запись - в 5-10 раз."""
+
+    name = 'orjson'
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError('Для кодека orjson установите пакет orjson: pip install orjson') from None
+        self.orjson = orjson
+
+    def loads(self, data):
+        # orjson.JSONDecodeError - подкласс json.JSONDecodeError
+        return self.orjson.loads(data)
+
+    def dumps(self, rows):
+        if len(rows) < PRETTY_LIMIT:
+            return super().dumps(rows)
+        try:
+            return self.orjson.dumps(rows)
+        except self.orjson.JSONEncodeError:
+            # например, целые больше 64 бит
+            return super().dumps(rows)
+
+
+CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+}
+
+
+def get_codec(name=None):
+    name = name or os.environ.get('PA_CODEC', 'auto')
+    if name == 'auto':
+        try:
+            return OrjsonCodec()
+        except ImportError:
+            return JsonCodec()
+    return CODECS[name]()
+
+
+class SnapshotError(json.JSONDecodeError):
+    """Повреждённый снимок. Подкласс JSONDecodeError, чтобы менеджеры сообщали о нём
+    так же, как о неверном JSON."""
+
+    def __init__(self, message, doc='', pos=0):
+        super().__init__(message, doc, pos)
+
+    def __str__(self):
+        return self.msg
+
+
+def encode_column(values):
+    """Значения одного поля -> (описание колонки, участки данных в байтах)."""
+    types = set(map(type, values))
+    if types == {int}:
+        try:
+            return {'kind': 'int'}, [array('q', values).tobytes()]
+        except OverflowError:
+            pass
+    if types == {float}:
+        return {'kind': 'float'}, [array('d', values).tobytes()]
+    if types == {bool}:
+        return {'kind': 'bool'}, [bytes(values)]
+    if types <= {str, type(None)}:
+        distinct = set(values)
+        if len(distinct) < MAX_DICT_SIZE and len(distinct) * 4 <= len(values):
+            table = sorted(distinct, key=lambda value: (value is None, value or ''))
+            codes = {value: code for code, value in enumerate(table)}
+            return {'kind': 'dict', 'table': table}, [array('H', map(codes.__getitem__, values)).tobytes()]
+        nulls = None
+        if type(None) in types:
+            nulls = bytes(value is None for value in values)
+            values = ['' if value is None else value for value in values]
+        text = '\0'.join(values)
+        if text.count('\0') == len(values) - 1:
+            column = {'kind': 'text', 'nulls': nulls is not None}
+            return column, [text.encode('utf-8', 'surrogatepass')] + ([nulls] if nulls is not None else [])
+    # всё остальное - каждое значение своим JSON (в нём '\0' всегда экранирован)
+    text = '\0'.join(json.dumps(value, ensure_ascii=False) for value in values)
+    return {'kind': 'json'}, [text.encode('utf-8', 'surrogatepass')]
+
+
+def write_snapshot(file, rows, fields):
+    """Пишет записи (словари с ключами fields) снимком в двоичный файл file."""
+    columns = []
+    parts = []
+    offset = 0
+    for name in fields:
+        column, blocks = encode_column([row.get(name) for row in rows])
+        column['name'] = name
+        column['blocks'] = []
+        for block in blocks:
+            column['blocks'].append([offset, len(block)])
+            parts.append(block)
+            padding = -len(block) % ALIGN
+            if padding:
+                parts.append(bytes(padding))
+            offset += len(block) + padding
+        columns.append(column)
+    header = json.dumps({'count': len(rows), 'byteorder': sys.byteorder, 'columns': columns}).encode('ascii')
+    header += b' ' * (-(len(MAGIC) + HEADER.size + len(header)) % ALIGN)
+    file.write(MAGIC + HEADER.pack(len(header)) + header)
+    for part in parts:
+        file.write(part)
+
+
+class Snapshot:
+    """Снимок, открытый для чтения. Колонки разбираются при первом обращении.
+
+        with Snapshot(path) as snapshot:
+            titles = snapshot.column('title')
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # пустой файл нельзя отобразить в память
+            self.file.close()
+            raise SnapshotError(f'Пустой файл снимка: {path}') from None
+        try:
+            if self.data[:len(MAGIC)] != MAGIC:
+                raise SnapshotError(f'Файл {path} - не снимок')
+            start = len(MAGIC) + HEADER.size
+            (size,) = HEADER.unpack_from(self.data, len(MAGIC))
+            header = json.loads(self.data[start:start + size])
+            self.base = start + size
+            self.count = header['count']
+            self.swap = header['byteorder'] != sys.byteorder
+            self.columns = {column['name']: column for column in header['columns']}
+        except (ValueError, KeyError, struct.error) as e:
+            self.close()
+            if isinstance(e, SnapshotError):
+                raise
+            raise SnapshotError(f'Повреждённый заголовок снимка {path}') from None
+        self.cache = {}
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def fields(self):
+        return list(self.columns)
+
+    def block(self, column, number):
+        offset, size = column['blocks'][number]
+        start = self.base + offset
+        if start + size > len(self.data):
+            raise SnapshotError(f'Снимок обрезан в колонке {column["name"]}')
+        return self.data[start:start + size]
+
+    def numbers(self, column, typecode):
+        values = array(typecode)
+        values.frombytes(self.block(column, 0))
+        if self.swap:
+            values.byteswap()
+        if len(values) != self.count:
+            raise SnapshotError(f'Неверная длина колонки {column["name"]}')
+        return values.tolist()
+
+    def column(self, name):
+        """Все значения поля списком; повторные вызовы не разбирают колонку заново."""
+        if name in self.cache:
+            return self.cache[name]
+        try:
+            values = self.decode(self.columns[name])
+        except SnapshotError:
+            raise
+        except (ValueError, IndexError, TypeError):
+            raise SnapshotError(f'Повреждённая колонка {name} в снимке') from None
+        self.cache[name] = values
+        return values
+
+    def decode(self, column):
+        kind = column['kind']
+        if kind == 'int':
+            values = self.numbers(column, 'q')
+        elif kind == 'float':
+            values = self.numbers(column, 'd')
+        elif kind == 'bool':
+            values = list(map(bool, self.block(column, 0)))
+        elif kind == 'dict':
+            values = list(map(column['table'].__getitem__, self.numbers(column, 'H')))
+        elif self.count == 0:
+            values = []
+        else:
+            values = self.block(column, 0).decode('utf-8', 'surrogatepass').split('\0')
+            if kind == 'json':
+                values = list(map(json.loads, values))
+            elif column['nulls']:
+                nulls = self.block(column, 1)
+                values = [None if null else value for value, null in zip(values, nulls)]
+        if len(values) != self.count:
+            raise SnapshotError(f'Неверная длина колонки {column["name"]}')
+        return values
+
+    def __getitem__(self, row):
+        """Одна запись словарём; разбирает только нужные колонки."""
+        return {name: self.column(name)[row] for name in self.columns}
+
+    def rows(self):
+        columns = [self.column(name) for name in self.columns]
+        return [dict(zip(self.columns, values)) for values in zip(*columns)]
+
+    def objects(self, factory):
+        """Записи объектами factory(*значения factory.FIELDS), без промежуточных словарей."""
+        if not set(factory.FIELDS) <= set(self.columns):
+            # снимок старого формата без части полей: недостающие получат значения по умолчанию
+            return [factory(**row) for row in self.rows()]
+        return list(map(factory, *(self.column(name) for name in factory.FIELDS)))
+
+    def close(self):
+        self.cache = {}
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
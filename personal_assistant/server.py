@@ -0,0 +1,234 @@
+"""Локальный HTTP/JSON API помощника на asyncio, без сторонних зависимостей.
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--flush-interval 1.0]
+    python personal_assistant.py --serve
+
+Пути (коллекции: notes, tasks, contacts, finance):
+    GET    /tasks?done=false&priority=Высокий   запрос с фильтрами, как query в batch.py
+    GET    /tasks/1                            одна запись
+    POST   /tasks                              создать, тело - JSON с полями
+    PATCH  /tasks/1                            изменить переданные поля (PUT - так же)
+    DELETE /tasks/1                            удалить
+    GET    /finance/report?start=01-01-2024&end=31-01-2024
+    GET    /finance/analytics?kind=pivot&period=month     см. finance_analytics.py
+    GET    /tasks/changes?since=10&epoch=...   изменения после номера since (changefeed.py)
+
+Ответ: {"ok": true, "result": ...} или {"ok": false, "error": "..."}.
+Соединения keep-alive, запросы можно отправлять конвейером. Данные держатся
+в памяти, изменения записываются на диск пачкой раз в flush_interval секунд
+или после max_pending изменений. Пока сервер работает, о задачах с истёкшим
+сроком пишется напоминание в stderr (отключается --no-reminders).
+"""
+import argparse
+import asyncio
+import json
+import sys
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from batch import MANAGERS, execute, to_json
+from scheduler import DeadlineScheduler
+
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 1000
+MAX_BODY = 1 << 20
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+METHODS = {'POST': 'create', 'PATCH': 'update', 'PUT': 'update', 'DELETE': 'delete', 'GET': 'get'}
+INT_PARAMS = {'limit', 'offset', 'page', 'per_page', 'since', 'window'}
+BOOL_PARAMS = {'done', 'sort'}
+WRITE_OPS = {'create', 'update', 'delete'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def query_args(query):
+    args = {}
+    for name, value in parse_qsl(query):
+        if name in INT_PARAMS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise HttpError(400, f'{name} должно быть числом') from None
+        elif name in BOOL_PARAMS:
+            value = value.lower() in ('1', 'true', 'да')
+        args[name] = value
+    return args
+
+
+class AssistantServer:
+    """Разбирает HTTP-запросы и выполняет их над менеджерами из get_manager.
+
+    Изменения копятся в группах сохранения менеджеров (manager.batch()) и
+    записываются фоновой задачей, а не на каждый запрос.
+    """
+
+    def __init__(self, get_manager, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING, reminders=True):
+        self.get_manager = get_manager
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.reminders = reminders
+        self.groups = {}
+        self.pending = 0
+
+    def route(self, method, target, body):
+        """(метод, путь, тело) -> результат для JSON; ошибки - исключениями."""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        if not parts or parts[0] not in MANAGERS or len(parts) > 2:
+            raise HttpError(404, 'Нет такого пути')
+        kind = parts[0]
+        if method not in METHODS:
+            raise HttpError(405, f'Метод {method} не поддерживается')
+        args = query_args(url.query)
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HttpError(400, 'Тело запроса - не JSON') from None
+            if not isinstance(data, dict):
+                raise HttpError(400, 'Тело запроса должно быть JSON-объектом')
+            args.update(data)
+
+        if len(parts) == 1:
+            op = {'GET': 'query', 'POST': 'create'}.get(method)
+        elif kind == 'finance' and parts[1] in ('report', 'analytics') and method == 'GET':
+            op = parts[1]
+        elif parts[1] == 'changes' and method == 'GET':
+            op = 'changes'
+        else:
+            op = METHODS[method] if method != 'POST' else None
+            try:
+                args['id'] = int(parts[1])
+            except ValueError:
+                raise HttpError(404, 'id должен быть числом') from None
+        if op is None:
+            raise HttpError(405, f'Метод {method} не поддерживается для {url.path}')
+
+        name, attribute = MANAGERS[kind]
+        manager = self.get_manager(name)
+        if kind not in self.groups:
+            if op in WRITE_OPS:
+                self.groups[kind] = manager.batch().__enter__()
+            else:
+                # данные мог изменить другой процесс; пока в группе есть несохранённые
+                # изменения, перечитывать нельзя - запись перед изменением сверится сама
+                manager.refresh()
+        result = execute(manager, getattr(manager, attribute), kind, op, args)
+        if op in WRITE_OPS:
+            self.pending += 1
+            if self.pending >= self.max_pending:
+                self.flush()
+        return to_json(result)
+
+    def respond(self, method, target, body):
+        try:
+            return 200, {'ok': True, 'result': self.route(method, target, body)}
+        except HttpError as e:
+            return e.status, {'ok': False, 'error': str(e)}
+        except KeyError as e:
+            return 404, {'ok': False, 'error': e.args[0] if e.args else 'Не найдено'}
+        except (ValueError, TypeError) as e:
+            return 400, {'ok': False, 'error': str(e)}
+        except Exception as e:
+            return 500, {'ok': False, 'error': str(e) or type(e).__name__}
+
+    def flush(self):
+        """Записывает накопленные изменения всех менеджеров."""
+        groups, self.groups = self.groups, {}
+        self.pending = 0
+        for group in groups.values():
+            group.__exit__(None, None, None)
+        if 'notes' in groups:
+            self.get_manager('manager').save_search_index()
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.groups:
+                self.flush()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {'ok': False, 'error': 'Слишком большое тело запроса'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = self.respond(method.upper(), target, body)
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                head = (f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                        f'Content-Type: application/json; charset=utf-8\r\n'
+                        f'Content-Length: {len(data)}\r\n'
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def remind(self, task):
+        print(f'Срок задачи истёк: {task.title} (id {task.id}, срок {task.due_date})', file=sys.stderr)
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        tasks = [asyncio.create_task(self.flush_loop())]
+        scheduler = None
+        if self.reminders:
+            # планировщик следит за изменениями задач и будит цикл только к полуночи или при правке
+            scheduler = DeadlineScheduler(self.get_manager('task'))
+            tasks.append(asyncio.create_task(scheduler.run(self.remind)))
+        print(f'Сервер запущен на http://{host}:{port}', file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if scheduler is not None:
+                scheduler.close()
+            self.flush()
+
+
+def main(argv=None, get_manager=None):
+    parser = argparse.ArgumentParser(description='Локальный HTTP/JSON API персонального помощника')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL)
+    parser.add_argument('--no-reminders', action='store_true', help='не напоминать о задачах с истёкшим сроком')
+    args = parser.parse_args(argv)
+    if get_manager is None:
+        from personal_assistant import get_manager
+    server = AssistantServer(get_manager, args.flush_interval, reminders=not args.no_reminders)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import sys
+
+from ledger import build_report, parse_day
+from storage import IdAllocator, JsonStorage, Storage
+
+
+def to_day(value):
+    if not value:
+        return None
+    if hasattr(value, 'toordinal'):
+        return value.toordinal()
+    try:
+        return parse_day(value)
+    except ValueError:
+        return None
+
+
+SCHEMAS = {
+    'notes': {
+        'file': 'notes.json',
+        'columns': ('id', 'title', 'content', 'timestamp'),
+        'derived': {},
+        'indexes': (),
+    },
+    'tasks': {
+        'file': 'tasks.json',
+        'columns': ('id', 'title', 'description', 'done', 'priority', 'due_date'),
+        'derived': {'due_day': lambda row: to_day(row['due_date'])},
+        'indexes': ('priority', 'done', 'due_day'),
+    },
+    'contacts': {
+        'file': 'contacts.json',
+        'columns': ('id', 'name', 'phone', 'email'),
+        'derived': {},
+        'indexes': ('name', 'phone'),
+    },
+    'finance': {
+        'file': 'finance.json',
+        'columns': ('id', 'amount', 'category', 'date', 'description'),
+        'derived': {'day': lambda row: to_day(row['date'])},
+        'indexes': ('day', 'category', 'day, category'),
+    },
+}
+BOOL_COLUMNS = {'done'}
+DB_FILE = 'assistant.db'
+
+
+class SqliteStorage(Storage):
+    """Хранит записи одного менеджера в таблице SQLite (режим WAL).
+
+    Изменения пишутся построчно, без перезаписи всей таблицы. Вычисляемые
+    колонки (номер дня для дат) и индексы позволяют выполнять фильтры в SQL.
+    """
+
+    queryable = True
+
+    def __init__(self, db_path, table):
+        super().__init__(f'{db_path}.{table}.lock')
+        self.db_path = db_path
+        self.table = table
+        schema = SCHEMAS[table]
+        self.columns = schema['columns']
+        self.derived = schema['derived']
+        self.all_columns = self.columns + tuple(self.derived)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        column_defs = ', '.join(['id INTEGER PRIMARY KEY'] + [name for name in self.all_columns if name != 'id'])
+        with self.connection:
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table} ({column_defs})')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            for columns in schema['indexes']:
+                name = f"{table}_{columns.replace(', ', '_')}"
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+        placeholders = ', '.join('?' * len(self.all_columns))
+        self.upsert_sql = f"INSERT OR REPLACE INTO {table} ({', '.join(self.all_columns)}) VALUES ({placeholders})"
+        self.delete_sql = f'DELETE FROM {table} WHERE id = ?'
+        self.select_sql = f"SELECT {', '.join(self.columns)} FROM {table} ORDER BY rowid"
+
+    def _values(self, row):
+        return [row[name] for name in self.columns] + [compute(row) for compute in self.derived.values()]
+
+    def _row(self, values):
+        row = dict(zip(self.columns, values))
+        for name in BOOL_COLUMNS.intersection(row):
+            row[name] = bool(row[name])
+        return row
+
+    def load(self):
+        with self.lock:
+            self.version = self.read_version()
+            return [self._row(values) for values in self.connection.execute(self.select_sql)]
+
+    def save(self, rows):
+        with self.lock:
+            with self.connection:
+                self.connection.execute(f'DELETE FROM {self.table}')
+                self.connection.executemany(self.upsert_sql, map(self._values, rows))
+            self.bump_version()
+
+    def commit(self, rows, changed=(), deleted=()):
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(self.upsert_sql, map(self._values, changed))
+                self.connection.executemany(self.delete_sql, [(row_id,) for row_id in deleted])
+            self.bump_version()
+
+    def count(self):
+        return self.connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def load_meta(self):
+        found = self.connection.execute('SELECT value FROM meta WHERE name = ?', (self.table,)).fetchone()
+        return json.loads(found[0]) if found else {}
+
+    def save_meta(self, meta):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)',
+                                    (self.table, json.dumps(meta)))
+
+    def _where(self, equal=None, ranges=None):
+        clauses, params = [], []
+        for name, value in (equal or {}).items():
+            if name not in self.all_columns:
+                raise ValueError(f'Нет колонки {name}')
+            if value is None:
+                clauses.append(f'{name} IS NULL')
+            else:
+                clauses.append(f'{name} = ?')
+                params.append(value)
+        for name, (low, high) in (ranges or {}).items():
+            if name not in self.all_columns:
+                raise ValueError(f'Нет колонки {name}')
+            clauses.append(f'{name} IS NOT NULL')
+            if low is not None:
+                clauses.append(f'{name} >= ?')
+                params.append(low)
+            if high is not None:
+                clauses.append(f'{name} <= ?')
+                params.append(high)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def select_ids(self, equal=None, ranges=None, order_by='rowid', limit=None, offset=0):
+        """id строк, где колонки из equal равны значениям, а колонки из ranges лежат в (от, до)."""
+        if self.before_query is not None:
+            self.before_query()
+        where, params = self._where(equal, ranges)
+        sql = f'SELECT id FROM {self.table}{where} ORDER BY {order_by} LIMIT ? OFFSET ?'
+        params += [-1 if limit is None else limit, offset]
+        return [row_id for row_id, in self.connection.execute(sql, params)]
+
+    def totals(self, group, value, equal=None, ranges=None):
+        """{группа: (сумма положительных, сумма модулей отрицательных)}; группа из нескольких
+        колонок ('day, category') - кортеж."""
+        if self.before_query is not None:
+            self.before_query()
+        where, params = self._where(equal, ranges)
+        sql = (f'SELECT {group}, SUM(CASE WHEN {value} >= 0 THEN {value} ELSE 0 END), '
+               f'SUM(CASE WHEN {value} < 0 THEN -{value} ELSE 0 END) FROM {self.table}{where} GROUP BY {group}')
+        totals = {}
+        for *key, positive, negative in self.connection.execute(sql, params):
+            totals[key[0] if len(key) == 1 else tuple(key)] = (positive, negative)
+        return totals
+
+
+class SqlLedger:
+    """Интерфейс Ledger поверх таблицы finance: выборки и отчёты считает SQLite."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.version = 0
+
+    def add_many(self, records):
+        # строки попадают в таблицу при сохранении менеджера
+        self.version += 1
+
+    def add(self, record):
+        self.version += 1
+
+    def remove(self, record):
+        self.version += 1
+
+    @property
+    def invalid(self):
+        return set(self.storage.select_ids(equal={'day': None}))
+
+    def select(self, start_day=None, end_day=None, category=None):
+        equal = {'category': category} if category is not None else None
+        return self.storage.select_ids(equal, {'day': (start_day, end_day)}, order_by='day, id')
+
+    def category_totals(self, start_day=None, end_day=None):
+        return self.storage.totals('category', 'amount', ranges={'day': (start_day, end_day)})
+
+    def report(self, start_day, end_day):
+        return build_report(self.category_totals(start_day, end_day))
+
+    def daily_totals(self):
+        totals = {}
+        for (day, category), sums in self.storage.totals('day, category', 'amount',
+                                                         ranges={'day': (None, None)}).items():
+            totals.setdefault(day, {})[category] = sums
+        return totals
+
+
+def migrate_json_to_sqlite(directory='.', db_path=None):
+    """Переносит notes.json, tasks.json, contacts.json и finance.json в базу SQLite."""
+    db_path = db_path or os.path.join(directory, DB_FILE)
+    for table, schema in SCHEMAS.items():
+        source = JsonStorage(os.path.join(directory, schema['file']))
+        try:
+            rows = source.load()
+        except FileNotFoundError:
+            print(f"Файл {schema['file']} не найден, пропускаем.")
+            continue
+        except json.JSONDecodeError:
+            print(f"Неверный формат файла {schema['file']}, пропускаем.")
+            continue
+        # повторные id (их оставляла старая выдача id) получают новые, как при загрузке
+        # менеджером, иначе INSERT OR REPLACE молча оставил бы одну запись из нескольких
+        ids = IdAllocator(source, [row['id'] for row in rows if row['id'] is not None])
+        used = set()
+        for row in rows:
+            row['id'] = ids.take(row['id'], used)
+            used.add(row['id'])
+        target = SqliteStorage(db_path, table)
+        target.save(rows)
+        target.save_meta(dict(target.load_meta(), last_id=ids.last_id))
+        print(f"{schema['file']}: перенесено записей - {target.count()}")
+
+
+if __name__ == '__main__':
+    migrate_json_to_sqlite(*sys.argv[1:2])
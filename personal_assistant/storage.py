@@ -0,0 +1,402 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from serialization import Snapshot, get_codec, write_snapshot
+
+try:
+    import fcntl
+except ImportError:
+    # на Windows блокировка действует только внутри процесса
+    fcntl = None
+
+
+def atomic_write(path, write, binary=False):
+    """Пишет через write(file) во временный файл рядом с path и подменяет им path.
+
+    При сбое посреди записи на месте остаётся прежняя версия файла целиком.
+    """
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, 'wb') if binary else open(temp_path, 'w', encoding='utf-8') as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def renumber_duplicates(rows, last_id=0):
+    """Даёт новые id строкам, чей id уже встречался раньше (такие файлы оставляла старая
+    выдача id), так же, как IdAllocator при загрузке: после last_id и всех id в rows.
+    Возвращает число изменённых строк."""
+    top = max([last_id, *(row['id'] for row in rows)])
+    seen = set()
+    renumbered = 0
+    for row in rows:
+        if row['id'] in seen:
+            top += 1
+            row['id'] = top
+            renumbered += 1
+        seen.add(row['id'])
+    return renumbered
+
+
+class FileLock:
+    """Блокировка между процессами (fcntl.flock на файле path) и потоками (RLock).
+
+    Повторный вход из того же потока не блокирует: файл блокируется при первом
+    входе и освобождается при последнем выходе.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                self.file = open(self.path, 'a')
+                if fcntl is not None:
+                    fcntl.flock(self.file, fcntl.LOCK_EX)
+            except BaseException:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            # закрытие файла снимает flock
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
+
+
+class Storage:
+    """Общее для хранилищ: блокировка и счётчик версий в метаданных.
+
+    Каждая запись увеличивает версию. Процесс помнит версию, с которой прочитал
+    данные; если в файле она другая, данные изменил кто-то ещё, и перед
+    изменением их нужно перечитать, а не затирать своими.
+    """
+
+    queryable = False
+    # сохранение переписывает все данные, а не дописывает изменения (см. csv_import.stream_import)
+    rewrites = False
+
+    def __init__(self, lock_path):
+        self.lock = FileLock(lock_path)
+        self.version = 0
+        self.before_query = None
+
+    def read_version(self):
+        return self.load_meta().get('version', 0)
+
+    def stale(self):
+        return self.read_version() != self.version
+
+    def bump_version(self):
+        meta = self.load_meta()
+        meta['version'] = self.version = meta.get('version', 0) + 1
+        self.save_meta(meta)
+
+    @contextmanager
+    def transaction(self, reload):
+        """Блокирует хранилище на время изменения; устаревшие данные сначала перечитываются через reload()."""
+        with self.lock:
+            # во вложенной транзакции данные уже проверены внешней
+            if self.lock.depth == 1 and self.stale():
+                reload()
+            yield
+
+    def sync(self, reload):
+        """Перечитывает данные через reload(), если их изменил другой процесс."""
+        if self.stale():
+            with self.transaction(reload):
+                pass
+
+    def load_objects(self, factory):
+        """Загружает записи сразу объектами factory (Note, Task, ...)."""
+        return [factory(**row) for row in self.load()]
+
+
+class SaveGroup:
+    """Копит изменения менеджера и сохраняет их одной записью при выходе из with.
+
+    Всё время группы менеджер держит транзакцию, поэтому другие процессы ждут,
+    а не перемешивают свои изменения с незаписанными.
+    """
+
+    def __init__(self, manager, save):
+        self.manager = manager
+        self.save = save
+        self.changed = {}
+        self.deleted = set()
+        self.full = False
+
+    def add(self, changed=(), deleted=()):
+        if not changed and not deleted:
+            self.full = True
+        for record in changed:
+            self.changed[record.id] = record
+            self.deleted.discard(record.id)
+        for record_id in deleted:
+            self.changed.pop(record_id, None)
+            self.deleted.add(record_id)
+
+    def flush(self):
+        """Записывает накопленное, не выходя из группы."""
+        self.manager.pending = None
+        try:
+            if self.full:
+                self.save()
+            elif self.changed or self.deleted:
+                self.save(list(self.changed.values()), list(self.deleted))
+        finally:
+            self.changed = {}
+            self.deleted = set()
+            self.full = False
+            self.manager.pending = self
+
+    def __enter__(self):
+        self.transaction = self.manager.transaction()
+        self.transaction.__enter__()
+        self.manager.pending = self
+        # запросы, которые выполняет само хранилище (SQL), должны видеть накопленное
+        self.manager.storage.before_query = self.flush
+        return self
+
+    def __exit__(self, *exc_info):
+        self.manager.storage.before_query = None
+        try:
+            self.flush()
+        finally:
+            self.manager.pending = None
+            self.transaction.__exit__(*exc_info)
+
+
+class JsonStorage(Storage):
+    """Хранит все записи одним JSON-файлом и переписывает его целиком."""
+
+    rewrites = True
+
+    def __init__(self, path, codec=None):
+        super().__init__(path + '.lock')
+        self.path = path
+        self.codec = codec or get_codec()
+
+    def read(self):
+        with open(self.path, 'rb') as file:
+            return self.codec.loads(file.read())
+
+    def load(self):
+        with self.lock:
+            self.version = self.read_version()
+            return self.read()
+
+    def save(self, rows):
+        with self.lock:
+            data = self.codec.dumps(rows)
+            atomic_write(self.path, lambda file: file.write(data), binary=True)
+            self.bump_version()
+
+    def commit(self, rows, changed=(), deleted=()):
+        self.save(rows())
+
+    def count(self):
+        """Число записей без разбора JSON: считаем ключи "id" потоком по блокам."""
+        pattern = b'"id":'
+        total = 0
+        tail = b''
+        with open(self.path, 'rb') as file:
+            while True:
+                block = file.read(1 << 20)
+                if not block:
+                    return total
+                chunk = tail + block
+                total += chunk.count(pattern)
+                # хвост короче шаблона не может содержать его целиком, поэтому не посчитается дважды
+                tail = chunk[-(len(pattern) - 1):]
+
+    def load_meta(self):
+        try:
+            with open(self.path + '.meta', 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_meta(self, meta):
+        atomic_write(self.path + '.meta', lambda file: json.dump(meta, file))
+
+
+class JournalStorage(JsonStorage):
+    """Снимок в JSON плюс журнал изменений рядом с ним (одна строка JSON на операцию).
+
+    Изменения дописываются в журнал, а после compact_every операций журнал
+    сворачивается в новый снимок.
+    """
+
+    rewrites = False
+
+    def __init__(self, path, compact_every=1000):
+        super().__init__(path)
+        self.log_path = path + '.log'
+        self.compact_every = compact_every
+        self.pending = 0
+
+    def read(self):
+        try:
+            rows = super().read()
+        except FileNotFoundError:
+            if not os.path.exists(self.log_path):
+                raise
+            rows = []
+        entries = []
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # недописанная строка после сбоя - дальше журнала нет
+                        break
+        except FileNotFoundError:
+            pass
+        used = [entry['row']['id'] if entry['op'] == 'put' else entry['id'] for entry in entries]
+        if renumber_duplicates(rows, max([self.load_meta().get('last_id', 0), *used])):
+            # новые id сразу записываются в снимок, иначе при следующем чтении они
+            # могли бы получиться другими, а журнал - ссылаться не на ту запись
+            with self.lock:
+                super().save(rows)
+        by_id = {row['id']: row for row in rows}
+        for entry in entries:
+            if entry['op'] == 'put':
+                by_id[entry['row']['id']] = entry['row']
+            else:
+                by_id.pop(entry['id'], None)
+        self.pending = len(entries)
+        return list(by_id.values())
+
+    def save(self, rows):
+        with self.lock:
+            super().save(rows)
+            # снимок уже содержит всё из журнала, повторное применение журнала безопасно
+            open(self.log_path, 'w').close()
+            self.pending = 0
+
+    def commit(self, rows, changed=(), deleted=()):
+        with self.lock:
+            with open(self.log_path, 'a', encoding='utf-8') as log:
+                for row in changed:
+                    log.write(json.dumps({'op': 'put', 'row': row}) + '\n')
+                for row_id in deleted:
+                    log.write(json.dumps({'op': 'del', 'id': row_id}) + '\n')
+            self.pending += len(changed) + len(deleted)
+            if self.pending >= self.compact_every:
+                self.compact(rows())
+            else:
+                self.bump_version()
+
+    def compact(self, rows):
+        self.save(rows)
+
+    def count(self):
+        return len(self.read())
+
+
+class SnapshotStorage(JsonStorage):
+    """Записи в двоичном снимке по колонкам (serialization.Snapshot) рядом с JSON-файлом.
+
+    Пока снимка нет, данные читаются из JSON-файла, а первое сохранение
+    создаёт снимок. Загрузка строит объекты прямо из колонок, без разбора
+    JSON и промежуточных словарей.
+    """
+
+    def __init__(self, path, codec=None):
+        super().__init__(path, codec)
+        self.snapshot_path = path + '.snap'
+
+    def read(self):
+        if not os.path.exists(self.snapshot_path):
+            return super().read()
+        with Snapshot(self.snapshot_path) as snapshot:
+            return snapshot.rows()
+
+    def load_objects(self, factory):
+        with self.lock:
+            self.version = self.read_version()
+            if not os.path.exists(self.snapshot_path):
+                return [factory(**row) for row in super().read()]
+            with Snapshot(self.snapshot_path) as snapshot:
+                return snapshot.objects(factory)
+
+    def save(self, rows):
+        with self.lock:
+            fields = list(rows[0]) if rows else []
+            atomic_write(self.snapshot_path, lambda file: write_snapshot(file, rows, fields), binary=True)
+            self.bump_version()
+
+    def count(self):
+        if not os.path.exists(self.snapshot_path):
+            return super().count()
+        with Snapshot(self.snapshot_path) as snapshot:
+            return len(snapshot)
+
+
+class IdAllocator:
+    """Выдаёт возрастающие id. Максимальный выданный id хранится в метаданных хранилища,
+    поэтому id удалённых записей не переиспользуются."""
+
+    def __init__(self, storage, used_ids=()):
+        self.storage = storage
+        self.saved_id = storage.load_meta().get('last_id', 0)
+        self.last_id = max([self.saved_id, *used_ids])
+
+    def take(self, record_id=None, used=()):
+        if record_id is None or record_id in used:
+            self.last_id += 1
+            return self.last_id
+        self.last_id = max(self.last_id, record_id)
+        return record_id
+
+    def next_id(self):
+        record_id = self.take()
+        self.save()
+        return record_id
+
+    def save(self):
+        if self.last_id != self.saved_id:
+            with self.storage.lock:
+                meta = self.storage.load_meta()
+                meta['last_id'] = self.last_id
+                self.storage.save_meta(meta)
+            self.saved_id = self.last_id
+
+
+STORAGES = {
+    'json': JsonStorage,
+    'journal': JournalStorage,
+    'snapshot': SnapshotStorage,
+}
+
+
+def make_storage(path, mode='json', table=None):
+    if mode == 'sqlite':
+        # все таблицы лежат в одной базе рядом с файлом данных
+        from sqlite_storage import DB_FILE, SqliteStorage
+        return SqliteStorage(os.path.join(os.path.dirname(path), DB_FILE), table)
+    return STORAGES[mode](path)
@@ -0,0 +1,154 @@
+import bisect
+import heapq
+from itertools import chain, count, islice
+
+from ledger import parse_day
+
+PRIORITIES = ('Высокий', 'Средний', 'Низкий')
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+# задачи без срока при сортировке идут после всех задач со сроком
+NO_DUE = 10 ** 9
+SQL_ORDER = ('CASE priority ' + ' '.join(f"WHEN '{priority}' THEN {rank}" for priority, rank in PRIORITY_RANK.items())
+             + f' ELSE {len(PRIORITIES)} END, due_day IS NULL, due_day, id')
+
+
+def priority_rank(priority):
+    """Место приоритета при сортировке; неизвестные приоритеты идут после 'Низкий'."""
+    return PRIORITY_RANK.get(priority, len(PRIORITIES))
+
+
+def due_day(value):
+    """Срок задачи (строка ДД-ММ-ГГГГ или date) -> порядковый номер дня или None."""
+    if not value:
+        return None
+    if hasattr(value, 'toordinal'):
+        return value.toordinal()
+    try:
+        return parse_day(value)
+    except ValueError:
+        return None
+
+
+class TaskIndex:
+    """Вторичные индексы задач: по статусу, по приоритету, отсортированный по сроку
+    и отсортированный в порядке вывода (приоритет, срок, id)."""
+
+    # on_scan(index, число просмотренных задач) - для статистики (instrumentation.py)
+    on_scan = None
+
+    def __init__(self):
+        self.keys = {}
+        self.by_done = {True: set(), False: set()}
+        self.by_priority = {}
+        self.due = []
+        # ранг приоритета -> отсортированный список (срок или NO_DUE, id)
+        self.ordered = {}
+
+    def add(self, task):
+        self.add_many([task])
+
+    def add_many(self, tasks):
+        new_due = []
+        new_ordered = {}
+        # при загрузке сюда попадают все задачи сразу, поэтому цикл без лишних вызовов
+        keys = self.keys
+        by_done = self.by_done
+        by_priority = self.by_priority
+        for task in tasks:
+            task_id = task.id
+            done = bool(task.done)
+            priority = task.priority
+            day = task.due_day
+            keys[task_id] = (done, priority, day)
+            by_done[done].add(task_id)
+            ids = by_priority.get(priority)
+            if ids is None:
+                ids = by_priority[priority] = set()
+            ids.add(task_id)
+            if day is None:
+                day_key = NO_DUE
+            else:
+                day_key = day
+                new_due.append((day, task_id))
+            rank = PRIORITY_RANK.get(priority, len(PRIORITIES))
+            entries = new_ordered.get(rank)
+            if entries is None:
+                entries = new_ordered[rank] = []
+            entries.append((day_key, task_id))
+        if len(new_due) == 1:
+            bisect.insort(self.due, new_due[0])
+        elif new_due:
+            self.due.extend(new_due)
+            self.due.sort()
+        for rank, entries in new_ordered.items():
+            ordered = self.ordered.setdefault(rank, [])
+            if len(entries) == 1:
+                bisect.insort(ordered, entries[0])
+            else:
+                ordered.extend(entries)
+                ordered.sort()
+
+    def remove(self, task_id):
+        rank, day_key, task_id = self.sort_key(task_id)
+        ordered = self.ordered[rank]
+        del ordered[bisect.bisect_left(ordered, (day_key, task_id))]
+        done, priority, day = self.keys.pop(task_id)
+        self.by_done[done].discard(task_id)
+        ids = self.by_priority[priority]
+        ids.discard(task_id)
+        if not ids:
+            del self.by_priority[priority]
+        if day is not None:
+            i = bisect.bisect_left(self.due, (day, task_id))
+            del self.due[i]
+
+    def update(self, task):
+        self.remove(task.id)
+        self.add(task)
+
+    def sort_key(self, task_id):
+        done, priority, day = self.keys[task_id]
+        return priority_rank(priority), NO_DUE if day is None else day, task_id
+
+    def query(self, done=None, priority=None, due_from=None, due_to=None, sort=False, limit=None, offset=0):
+        """id задач по фильтрам; сроки - порядковые номера дней, границы включительно.
+
+        Перебираются только задачи из самого узкого подходящего индекса,
+        а не весь список.
+        """
+        if sort and due_from is None and due_to is None:
+            # обходим задачи уже в порядке вывода и останавливаемся на нужной странице
+            ranks = sorted(self.ordered) if priority is None else [priority_rank(priority)]
+            entries = chain.from_iterable(self.ordered.get(rank, ()) for rank in ranks)
+            # zip берёт из scanned по одному номеру на каждую просмотренную задачу
+            scanned = count()
+            matching = (task_id for (day_key, task_id), _ in zip(entries, scanned)
+                        if (done is None or self.keys[task_id][0] == bool(done))
+                        and (priority is None or self.keys[task_id][1] == priority))
+            result = list(islice(matching, offset, None if limit is None else offset + limit))
+            if self.on_scan is not None:
+                self.on_scan(next(scanned))
+            return result
+        if due_from is not None or due_to is not None:
+            lo = 0 if due_from is None else bisect.bisect_left(self.due, (due_from,))
+            hi = len(self.due) if due_to is None else bisect.bisect_left(self.due, (due_to + 1,))
+            candidates = [task_id for day, task_id in self.due[lo:hi]]
+        else:
+            buckets = []
+            if done is not None:
+                buckets.append(self.by_done[bool(done)])
+            if priority is not None:
+                buckets.append(self.by_priority.get(priority, set()))
+            candidates = sorted(min(buckets, key=len)) if buckets else self.keys
+        if self.on_scan is not None:
+            self.on_scan(len(candidates))
+        result = [task_id for task_id in candidates
+                  if (done is None or self.keys[task_id][0] == bool(done))
+                  and (priority is None or self.keys[task_id][1] == priority)]
+        if sort:
+            if limit is not None:
+                result = heapq.nsmallest(offset + limit, result, key=self.sort_key)
+            else:
+                result.sort(key=self.sort_key)
+        end = None if limit is None else offset + limit
+        return result[offset:end]
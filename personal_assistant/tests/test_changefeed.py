@@ -0,0 +1,23 @@
+from changefeed import ChangeFeed
+
+
+def test_changes_since():
+    feed = ChangeFeed(history=3)
+    feed.add([{'id': 1}, {'id': 2}], deleted=[3])
+    assert [change.id for change in feed.changes_since(1)] == [2, 3]
+    assert feed.changes_since(3) == []
+    feed.add([{'id': 4}])
+    # первое изменение вытеснено из истории
+    assert feed.changes_since(0) is None
+
+
+def test_restarted_feed_asks_for_full_resync():
+    old = ChangeFeed()
+    old.add([{'id': 1}, {'id': 2}])
+    seq, epoch = old.seq, old.epoch
+    restarted = ChangeFeed()
+    assert restarted.changes_since(seq) is None
+    restarted.add([{'id': 3}, {'id': 4}, {'id': 5}])
+    # номер снова дорос до сохранённого, но epoch другой
+    assert restarted.changes_since(seq, epoch) is None
+    assert [change.id for change in restarted.changes_since(seq, restarted.epoch)] == [5]
@@ -0,0 +1,52 @@
+from contact_dedup import ContactBlocks, is_duplicate, jaro_winkler
+
+
+def blocks(keys):
+    return ContactBlocks(keys)
+
+
+def test_jaro_winkler():
+    assert jaro_winkler('марта', 'марта') == 1.0
+    assert jaro_winkler('', 'марта') == 0.0
+    assert round(jaro_winkler('martha', 'marhta'), 3) == 0.961
+
+
+def test_typo_in_name_with_same_phone_is_duplicate():
+    assert is_duplicate(('иван петров', '100', ''), ('иван петро', '100', ''))
+    assert is_duplicate(('петров иван', '', 'a@b.c'), ('иван петров', '', 'a@b.c'))
+
+
+def test_namesakes_with_different_phones_are_not_duplicates():
+    assert not is_duplicate(('иван петров', '100', ''), ('иван петров', '200', ''))
+
+
+def test_duplicates_groups():
+    keys = {
+        1: ('иван петров', '100', ''),
+        2: ('иван петро', '100', ''),
+        3: ('петров иван', '', 'ivan@mail.ru'),
+        4: ('анна смирнова', '300', ''),
+        5: ('анна смирнова', '', ''),
+    }
+    assert blocks(keys).duplicates(keys) == [[1, 2, 3], [4, 5]]
+
+
+def test_anonymous_namesake_does_not_join_different_phones():
+    # контакт без телефона похож на обоих тёзок, но склеить их между собой не должен
+    keys = {
+        1: ('иван петров', '100', ''),
+        2: ('иван петров', '', ''),
+        3: ('иван петров', '200', ''),
+    }
+    groups = blocks(keys).duplicates(keys)
+    assert len(groups) == 1 and len(groups[0]) == 2 and 2 in groups[0]
+
+
+def test_match_and_remove():
+    keys = {1: ('иван петров', '100', ''), 2: ('анна смирнова', '300', '')}
+    found = blocks(keys)
+    assert found.match(('иван петрв', '100', ''), keys) == 1
+    assert found.match(('олег сидоров', '', ''), keys) is None
+    found.remove(1, keys[1])
+    assert found.match(('иван петров', '100', ''), keys) is None
+    assert [contact_id for score, contact_id in found.similar('анна смирнов', keys)] == [2]
@@ -0,0 +1,19 @@
+from personal_assistant import Contact
+from contact_index import ContactIndex
+
+
+def make_index():
+    index = ContactIndex()
+    index.add_many([Contact(1, 'Иван', '123'), Contact(2, 'Иван Петров', '8 900 111-22-33'), Contact(3, 'иван', '')])
+    return index
+
+
+def test_exact_ignores_name_prefix():
+    index = make_index()
+    assert index.exact('Ив') == []
+    assert index.exact('ИВАН') == [1, 3]
+    assert index.exact('+7 900 111 22 33') == [2]
+
+
+def test_search_ranks_exact_before_prefix():
+    assert list(make_index().search('иван')) == [1, 3, 2]
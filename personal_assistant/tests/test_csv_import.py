@@ -0,0 +1,84 @@
+import pytest
+
+from csv_import import stream_import
+
+
+def write_csv(path, values):
+    path.write_text('value\n' + ''.join(f'{value}\n' for value in values), encoding='utf-8')
+
+
+def run(path, committed):
+    return stream_import(str(path), lambda row: int(row['value']), committed.extend, chunk_size=2, progress=None)
+
+
+def test_resumes_after_fixing_bad_row(tmp_path):
+    path = tmp_path / 'data.csv'
+    write_csv(path, [1, 2, 3, 'x', 5])
+    committed = []
+    with pytest.raises(ValueError):
+        run(path, committed)
+    assert committed == [1, 2]
+    # исправление строки меняет размер файла, но импортированное не повторяется
+    write_csv(path, [1, 2, 3, 40, 5])
+    assert run(path, committed) == 3
+    assert committed == [1, 2, 3, 40, 5]
+    assert not (tmp_path / 'data.csv.checkpoint').exists()
+
+
+def test_refuses_to_resume_when_imported_rows_changed(tmp_path):
+    path = tmp_path / 'data.csv'
+    write_csv(path, [1, 2, 'x'])
+    committed = []
+    with pytest.raises(ValueError):
+        run(path, committed)
+    write_csv(path, [10, 2, 3])
+    with pytest.raises(ValueError, match='изменились'):
+        run(path, committed)
+    assert committed == [1, 2]
+    (tmp_path / 'data.csv.checkpoint').unlink()
+    assert run(path, committed) == 3
+
+
+class Staged:
+    """commit копит порции, flush записывает их - как группа сохранения менеджера."""
+
+    def __init__(self):
+        self.staged = []
+        self.saved = []
+        self.flushes = 0
+
+    def commit(self, records):
+        self.staged.extend(records)
+
+    def flush(self):
+        self.saved.extend(self.staged)
+        self.staged = []
+        self.flushes += 1
+
+
+def run_staged(path, target):
+    return stream_import(str(path), lambda row: int(row['value']), target.commit, chunk_size=1, progress=None,
+                         flush=target.flush)
+
+
+def test_staged_import_rewrites_logarithmically(tmp_path):
+    path = tmp_path / 'data.csv'
+    write_csv(path, range(64))
+    target = Staged()
+    assert run_staged(path, target) == 64
+    assert target.saved == list(range(64))
+    # записи после 1, 2, 4, ... 64 строк, а не после каждой
+    assert target.flushes == 7
+
+
+def test_staged_import_saves_whole_chunks_before_bad_row(tmp_path):
+    path = tmp_path / 'data.csv'
+    write_csv(path, [0, 1, 2, 3, 4, 'x', 6])
+    target = Staged()
+    with pytest.raises(ValueError):
+        run_staged(path, target)
+    # строка 5 не записана, но отметка стоит сразу за записанными строками
+    assert target.saved == [0, 1, 2, 3, 4]
+    write_csv(path, [0, 1, 2, 3, 4, 5, 6])
+    assert run_staged(path, target) == 2
+    assert target.saved == list(range(7))
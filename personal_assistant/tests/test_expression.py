@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from expression import ExpressionError, compile_expression, evaluate
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('2 + 3 * 4', 14),
+    ('(2 + 3) * 4', 20),
+    ('2 ** 3 ** 2', 512),
+    ('-2 ** 2', -4),
+    ('2 ** -1', 0.5),
+    ('7 // 2 + 7 % 2', 4),
+    ('10 - 4 - 3', 3),
+    ('max(1, 2 * 3, 4) + abs(-1)', 7),
+    ('pi * 0', 0.0),
+])
+def test_precedence(source, expected):
+    assert evaluate(source) == expected
+
+
+def test_variables():
+    expression = compile_expression('amount * (1 - tax)')
+    assert expression.variables == {'amount', 'tax'}
+    assert expression(amount=100, tax=0.25) == 75
+
+
+@pytest.mark.parametrize('source', ['2 +', '(1 + 2', '1 2', 'foo(1)', 'sqrt', '2 $ 3', ''])
+def test_syntax_errors(source):
+    with pytest.raises(ExpressionError):
+        compile_expression(source)
+
+
+def test_unknown_variable():
+    with pytest.raises(ExpressionError):
+        evaluate('x + 1')
+
+
+@pytest.mark.parametrize('source', ['1 / 0', '1 // 0', '1 % 0', 'x / 0'])
+def test_division_by_zero(source):
+    with pytest.raises(ZeroDivisionError):
+        evaluate(source, x=1)
+
+
+@pytest.mark.parametrize('source', [
+    '(9 ** 10000) ** 10000',
+    '9 ** 9 ** 9',
+    '2 ** 2 ** 2 ** 2 ** 2',
+    '(2 ** 60000) ** 2',
+    'x ** 100000',
+])
+def test_huge_powers_are_rejected_quickly(source):
+    started = time.perf_counter()
+    with pytest.raises(ExpressionError):
+        evaluate(source, x=3)
+    assert time.perf_counter() - started < 1
+
+
+def test_allowed_powers():
+    assert evaluate('2 ** 1000') == 1 << 1000
+    assert evaluate('1 ** 10') == 1
+    assert evaluate('2.0 ** 0.5') == pytest.approx(1.41421356)
+
+
+def test_huge_literal():
+    with pytest.raises(ExpressionError):
+        compile_expression('9' * 5000)
+    assert evaluate('9' * 100 + ' % 10') == 9
+
+
+@pytest.mark.parametrize('source', ['round(1, -(10 ** 7))', 'round(1, -10 ** 4000)', 'round(x, 10 ** 6)'])
+def test_huge_rounding_is_rejected_quickly(source):
+    started = time.perf_counter()
+    with pytest.raises(ExpressionError):
+        evaluate(source, x=1.5)
+    assert time.perf_counter() - started < 1
+
+
+def test_rounding():
+    assert evaluate('round(2.567, 2)') == 2.57
+    assert evaluate('round(1234, -2)') == 1200
+    assert evaluate('round(2.5)') == 2
+    with pytest.raises(ExpressionError):
+        compile_expression('round(1, -21)')
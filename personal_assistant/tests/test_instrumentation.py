@@ -0,0 +1,49 @@
+import personal_assistant
+from instrumentation import Instrumentation
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+from task_query import TaskIndex
+
+
+def run_with_stats(action):
+    stats = Instrumentation()
+    stats.enable(personal_assistant)
+    try:
+        action()
+    finally:
+        stats.disable()
+    return stats.counters
+
+
+def test_saves_count_storage_commits_not_queued_calls(tmp_path):
+    tasks = personal_assistant.TaskManager(storage=JsonStorage(str(tmp_path / 'tasks.json')))
+
+    def action():
+        with tasks.batch():
+            for number in range(5):
+                tasks.create(f'задача {number}')
+        tasks.create('ещё одна')
+    counters = run_with_stats(action)
+    assert counters['сохранений'] == 2
+    assert counters['записано байт'] > 0
+
+
+def test_sqlite_writes_are_counted(tmp_path):
+    storage = SqliteStorage(str(tmp_path / 'assistant.db'), 'tasks')
+    tasks = personal_assistant.TaskManager(storage=storage)
+    counters = run_with_stats(lambda: tasks.create('задача'))
+    assert counters['сохранений'] == 1
+    assert counters['записано байт'] > 0
+
+
+def test_records_scanned_by_query(tmp_path):
+    tasks = personal_assistant.TaskManager(storage=JsonStorage(str(tmp_path / 'tasks.json')))
+    with tasks.batch():
+        for number in range(10):
+            tasks.create(f'задача {number}', priority='Высокий' if number < 3 else 'Низкий')
+    counters = run_with_stats(lambda: tasks.query(priority='Высокий'))
+    # просмотрены только задачи из индекса по приоритету, а не все десять
+    assert counters['просмотрено записей'] == 3
+    counters = run_with_stats(lambda: tasks.query(sort=True, limit=2))
+    assert counters['просмотрено записей'] == 2
+    assert TaskIndex.on_scan is None
@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+
+from ledger import Ledger
+
+
+class Record:
+    def __init__(self, id, amount, category, day):
+        self.id = id
+        self.amount = amount
+        self.category = category
+        self.day = day
+        self.date = None
+
+
+DAY = date(2024, 3, 1).toordinal()
+
+
+def test_removing_all_records_leaves_no_residue():
+    ledger = Ledger()
+    records = [Record(1, 0.1, 'x', DAY), Record(2, 0.2, 'x', DAY)]
+    ledger.add_many(records)
+    assert ledger.category_totals()['x'][0] == pytest.approx(0.3)
+    for record in records:
+        ledger.remove(record)
+    assert ledger.category_totals() == {}
+    assert ledger.report(DAY, DAY)['income'] == 0
+    assert ledger.daily_totals() == {}
+
+
+def test_add_remove_symmetry():
+    ledger = Ledger()
+    kept = [Record(1, 100.0, 'Зарплата', DAY), Record(2, -30.0, 'Кафе', DAY + 1)]
+    extra = [Record(3, -0.7, 'Кафе', DAY + 1), Record(4, 0.1, 'Кэшбэк', DAY - 5), Record(5, -12.5, 'Такси', DAY + 9)]
+    ledger.add_many(kept)
+    before = (ledger.category_totals(), ledger.select(), dict(ledger.days))
+    ledger.add_many(extra)
+    ledger.category_totals()
+    for record in extra:
+        ledger.remove(record)
+    assert (ledger.category_totals(), ledger.select(), dict(ledger.days)) == before
+
+
+def test_report_ranges_and_invalid_dates():
+    ledger = Ledger()
+    ledger.add_many([Record(1, -10.0, 'a', DAY), Record(2, -5.0, 'a', DAY + 2), Record(3, 7.0, 'b', DAY + 2),
+                     Record(4, -1.0, 'a', None)])
+    assert ledger.invalid == {4}
+    assert ledger.category_totals(DAY + 1, DAY + 2) == {'a': (0.0, 5.0), 'b': (7.0, 0.0)}
+    assert ledger.select(DAY, DAY + 2, 'a') == [1, 2]
+    # запись задним числом после построения префиксных сумм
+    ledger.add(Record(5, -3.0, 'a', DAY - 1))
+    assert ledger.category_totals(None, DAY) == {'a': (0.0, 13.0)}
+
+
+def test_short_range_after_large_balance_has_no_cancellation_error():
+    ledger = Ledger()
+    ledger.add_many([Record(1, 100000.0, 'x', DAY), Record(2, 0.1, 'x', DAY + 1), Record(3, 0.2, 'x', DAY + 1)])
+    report = ledger.report(DAY + 1, DAY + 1)
+    assert report['income'] == 0.3
+    assert report['income_items'] == {'x': 0.3}
+    # то же после пересчёта префиксных сумм (запись задним числом)
+    ledger.add(Record(4, -5.55, 'y', DAY - 1))
+    assert ledger.report(DAY + 1, DAY + 1)['income'] == 0.3
+    assert ledger.category_totals(DAY - 1, DAY - 1) == {'y': (0.0, 5.55)}
@@ -0,0 +1,25 @@
+from parallel_import import new_records, parse_file
+from personal_assistant import FinanceRecord
+
+
+def write_csv(path, lines):
+    path.write_text('id,amount,category,date,description\n' + ''.join(line + '\n' for line in lines),
+                    encoding='utf-8')
+
+
+def test_equal_rows_with_different_ids_are_kept(tmp_path):
+    path = tmp_path / 'bank.csv'
+    write_csv(path, ['1,-150,Кафе,01-02-2024,Кофе', '2,-150,Кафе,01-02-2024,Кофе'])
+    records, skipped = new_records([parse_file('finance', str(path))], FinanceRecord)
+    assert [record.id for record in records] == [1, 2]
+    assert skipped == 0
+
+
+def test_same_rows_imported_again_are_skipped(tmp_path):
+    path = tmp_path / 'bank.csv'
+    write_csv(path, ['1,-150,Кафе,01-02-2024,Кофе', '2,-150,Кафе,01-02-2024,Кофе'])
+    shard = parse_file('finance', str(path))
+    existing = [FinanceRecord(1, -150.0, 'Кафе', '01-02-2024', 'Кофе')]
+    records, skipped = new_records([shard, shard], FinanceRecord, existing)
+    assert [record.id for record in records] == [2]
+    assert skipped == 3
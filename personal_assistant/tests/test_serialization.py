@@ -0,0 +1,70 @@
+import pytest
+
+from serialization import Snapshot, SnapshotError, encode_column, write_snapshot
+
+ROWS = [
+    {'id': 1, 'amount': 10.5, 'done': True, 'category': 'еда', 'title': 'хлеб', 'extra': {'a': 1}},
+    {'id': 2, 'amount': -3.25, 'done': False, 'category': 'еда', 'title': None, 'extra': [1, 2]},
+    {'id': 3, 'amount': 0.0, 'done': False, 'category': 'еда', 'title': 'молоко\nи сыр', 'extra': None},
+    {'id': 4, 'amount': 1e9, 'done': True, 'category': 'еда', 'title': '', 'extra': 'текст'},
+]
+FIELDS = list(ROWS[0])
+
+
+def write(path, rows, fields=FIELDS):
+    with open(path, 'wb') as file:
+        write_snapshot(file, rows, fields)
+
+
+def test_columns_use_expected_kinds():
+    kinds = {name: encode_column([row[name] for row in ROWS])[0]['kind'] for name in FIELDS}
+    assert kinds == {'id': 'int', 'amount': 'float', 'done': 'bool', 'category': 'dict', 'title': 'text',
+                     'extra': 'json'}
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / 'rows.snap'
+    write(path, ROWS)
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == len(ROWS)
+        assert snapshot.fields == FIELDS
+        assert snapshot.rows() == ROWS
+        assert snapshot[1] == ROWS[1]
+
+
+def test_snapshot_round_trip_of_large_ints_and_empty(tmp_path):
+    path = tmp_path / 'rows.snap'
+    rows = [{'id': 2 ** 70}, {'id': 1}]
+    write(path, rows, ['id'])
+    with Snapshot(path) as snapshot:
+        assert snapshot.rows() == rows
+    write(path, [], ['id'])
+    with Snapshot(path) as snapshot:
+        assert snapshot.rows() == []
+
+
+def test_snapshot_objects(tmp_path):
+    class Row:
+        FIELDS = ('id', 'title')
+
+        def __init__(self, id, title=None, **rest):
+            self.id, self.title = id, title
+    path = tmp_path / 'rows.snap'
+    write(path, ROWS)
+    with Snapshot(path) as snapshot:
+        assert [(row.id, row.title) for row in snapshot.objects(Row)] == [(row['id'], row['title']) for row in ROWS]
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: b'',
+    lambda data: b'NOTSNAP' + data[7:],
+    lambda data: data[:20],
+    lambda data: data[:-40],
+])
+def test_corrupted_snapshot_raises(tmp_path, damage):
+    path = tmp_path / 'rows.snap'
+    write(path, ROWS)
+    path.write_bytes(damage(path.read_bytes()))
+    with pytest.raises(SnapshotError):
+        with Snapshot(path) as snapshot:
+            snapshot.rows()
@@ -0,0 +1,52 @@
+import asyncio
+
+from personal_assistant import NoteManager, Task, TaskManager
+from server import AssistantServer
+from storage import JsonStorage
+
+
+def test_serve_reminds_about_overdue_tasks(tmp_path, capsys):
+    tasks = TaskManager(storage=JsonStorage(str(tmp_path / 'tasks.json')))
+    tasks.insert([Task(1, 'старая', due_date='01-01-2020'), Task(2, 'сделанная', done=True, due_date='01-01-2020'),
+                        Task(3, 'будущая', due_date='01-01-2999')])
+    server = AssistantServer({'task': tasks}.__getitem__)
+
+    async def run():
+        serving = asyncio.create_task(server.serve(port=0))
+        await asyncio.sleep(0.1)
+        serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+    asyncio.run(run())
+    reminders = [line for line in capsys.readouterr().err.splitlines() if line.startswith('Срок задачи истёк')]
+    assert reminders == ['Срок задачи истёк: старая (id 1, срок 01-01-2020)']
+    # после остановки планировщик отписан от изменений задач
+    assert tasks.listeners == []
+
+
+def test_reads_see_changes_from_other_processes(tmp_path):
+    path = str(tmp_path / 'tasks.json')
+    tasks = TaskManager(storage=JsonStorage(path))
+    server = AssistantServer({'task': tasks}.__getitem__)
+    assert server.route('GET', '/tasks', b'') == []
+    TaskManager(storage=JsonStorage(path)).create('из другого процесса')
+    assert [task['title'] for task in server.route('GET', '/tasks', b'')] == ['из другого процесса']
+    # своя несохранённая запись не теряется при чтении
+    server.route('POST', '/tasks', '{"title": "своя"}'.encode())
+    assert len(server.route('GET', '/tasks', b'')) == 2
+    server.flush()
+    assert len(TaskManager(storage=JsonStorage(path)).tasks) == 2
+
+
+def test_notes_query_is_paged(tmp_path):
+    notes = NoteManager(storage=JsonStorage(str(tmp_path / 'notes.json')))
+    with notes.batch():
+        for number in range(10):
+            notes.create(f'заметка {number}', 'текст')
+    server = AssistantServer({'manager': notes}.__getitem__)
+    assert [note['title'] for note in server.route('GET', '/notes?limit=3&offset=2', b'')] == \
+        ['заметка 2', 'заметка 3', 'заметка 4']
+    assert len(server.route('GET', '/notes', b'')) == 10
+    assert len(server.route('GET', '/notes?text=заметка&limit=4&offset=8', b'')) == 2
@@ -0,0 +1,15 @@
+import json
+
+from sqlite_storage import SqliteStorage, migrate_json_to_sqlite
+
+
+def test_migration_keeps_rows_with_duplicate_ids(tmp_path, capsys):
+    rows = [{'id': 2, 'title': 'B', 'content': '', 'timestamp': '01-01-2024 10:00:00'},
+            {'id': 2, 'title': 'C', 'content': '', 'timestamp': '01-01-2024 10:00:00'}]
+    with open(tmp_path / 'notes.json', 'w', encoding='utf-8') as file:
+        json.dump(rows, file)
+    migrate_json_to_sqlite(str(tmp_path))
+    assert 'notes.json: перенесено записей - 2' in capsys.readouterr().out
+    storage = SqliteStorage(str(tmp_path / 'assistant.db'), 'notes')
+    assert [(row['id'], row['title']) for row in storage.load()] == [(2, 'B'), (3, 'C')]
+    assert storage.load_meta()['last_id'] == 3
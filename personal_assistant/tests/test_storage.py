@@ -0,0 +1,78 @@
+import json
+import os
+
+from storage import IdAllocator, JournalStorage, JsonStorage
+
+
+def write_json(path, rows):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(rows, file)
+
+
+def test_journal_keeps_rows_with_duplicate_ids(tmp_path):
+    path = str(tmp_path / 'notes.json')
+    write_json(path, [{'id': 2, 'title': 'B'}, {'id': 2, 'title': 'C'}])
+    storage = JournalStorage(path)
+    rows = storage.load()
+    # как в режиме json: повтор получает следующий свободный id
+    assert [(row['id'], row['title']) for row in rows] == [(2, 'B'), (3, 'C')]
+    # новые id записаны в снимок и не меняются при следующем чтении
+    assert JsonStorage(path).load() == rows
+    storage.commit(lambda: rows, changed=[{'id': 3, 'title': 'C2'}])
+    assert [(row['id'], row['title']) for row in JournalStorage(path).load()] == [(2, 'B'), (3, 'C2')]
+
+
+def test_journal_renumbers_after_ids_used_in_log(tmp_path):
+    path = str(tmp_path / 'notes.json')
+    write_json(path, [{'id': 1, 'title': 'A'}, {'id': 1, 'title': 'B'}])
+    with open(path + '.log', 'w', encoding='utf-8') as log:
+        log.write(json.dumps({'op': 'put', 'row': {'id': 2, 'title': 'new'}}) + '\n')
+    rows = JournalStorage(path).load()
+    assert sorted((row['id'], row['title']) for row in rows) == [(1, 'A'), (2, 'new'), (3, 'B')]
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    path = str(tmp_path / 'notes.json')
+    storage = JournalStorage(path)
+    storage.save([{'id': 1, 'title': 'A'}])
+    storage.commit(lambda: [], changed=[{'id': 2, 'title': 'B'}], deleted=[1])
+    with open(path + '.log', 'a', encoding='utf-8') as log:
+        log.write('{"op": "put", "row": {"id": 3, "ti')
+    storage = JournalStorage(path)
+    assert storage.load() == [{'id': 2, 'title': 'B'}]
+    assert storage.pending == 2
+
+
+def test_journal_compacts_into_snapshot(tmp_path):
+    path = str(tmp_path / 'notes.json')
+    storage = JournalStorage(path, compact_every=3)
+    rows = []
+    for record_id in (1, 2):
+        rows.append({'id': record_id, 'title': str(record_id)})
+        storage.commit(lambda: rows, changed=[rows[-1]])
+    assert not os.path.exists(path)
+    rows.append({'id': 3, 'title': '3'})
+    storage.commit(lambda: rows, changed=[rows[-1]])
+    # журнал свёрнут: снимок содержит все записи, а журнал пуст
+    assert JsonStorage(path).load() == rows
+    assert os.path.getsize(path + '.log') == 0
+    assert storage.pending == 0
+    assert JournalStorage(path).load() == rows
+
+
+def test_ids_are_not_reused_after_delete(tmp_path):
+    storage = JsonStorage(str(tmp_path / 'notes.json'))
+    ids = IdAllocator(storage, [1, 2, 3])
+    assert ids.next_id() == 4
+    # запись 4 удалена, но её id не выдаётся снова, в том числе после перезапуска
+    assert ids.next_id() == 5
+    assert IdAllocator(storage, [1, 2]).next_id() == 6
+
+
+def test_ids_follow_used_ids_above_saved(tmp_path):
+    storage = JsonStorage(str(tmp_path / 'notes.json'))
+    ids = IdAllocator(storage)
+    assert ids.take(10) == 10
+    assert ids.take(10, used={10}) == 11
+    ids.save()
+    assert IdAllocator(storage).take() == 12